@@ -1,6 +1,102 @@
-from typing import Any
+import builtins
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from typing import Any, Protocol, TypeVar, final, overload
 
 from typing_extensions import Buffer
 
-def bdecode(b: Buffer, /) -> Any: ...
+class _Writer(Protocol):
+    def write(self, b: Buffer, /) -> object: ...
+
+_T = TypeVar("_T")
+
+@overload
+def bdecode(b: Buffer, /, *, zero_copy: bool = False, threads: int = 1) -> Any: ...
+@overload
+def bdecode(
+    b: Buffer,
+    /,
+    *,
+    zero_copy: bool = False,
+    type: builtins.type[_T],
+    threads: int = 1,
+) -> _T: ...
+def bdecode_lazy(b: Buffer, /) -> Any: ...
+def bdecode_many(values: Iterable[Buffer], /) -> list[Any]: ...
+def bdecode_path(b: Buffer, path: Iterable[bytes | int], /) -> Any: ...
+def bdecode_paths(
+    b: Buffer, paths: Iterable[Iterable[bytes | int]], /
+) -> list[Any]: ...
+def bdecode_span(b: Buffer, key: bytes, /) -> tuple[Any, tuple[int, int] | None]: ...
+def iterparse(b: Buffer, /) -> Iterator[tuple[str, Any, int]]: ...
+def bvalidate(b: Buffer, /) -> None: ...
+def bstats(b: Buffer, /) -> dict[str, int]: ...
 def bencode(v: Any, /) -> bytes: ...
+def bencode_into(v: Any, buffer: Buffer, /, offset: int = 0) -> int: ...
+def bencode_many(values: Iterable[Any], /) -> list[bytes | Exception]: ...
+def bencode_to(v: Any, fp: _Writer, /, chunk_size: int = 65536) -> int: ...
+def bencoded_size(v: Any, /) -> int: ...
+def configure_buffers(
+    *, pool_size: int | None = None, max_buffer_size: int | None = None
+) -> dict[str, int]: ...
+def trim_buffers() -> None: ...
+def buffer_stats() -> dict[str, dict[str, int]]: ...
+def get_max_decode_depth() -> int: ...
+def set_max_decode_depth(depth: int, /) -> None: ...
+def pack_peers(peers: Iterable[tuple[str, int]], /) -> bytes: ...
+def unpack_peers(b: Buffer, /, *, ipv6: bool = False) -> list[tuple[str, int]]: ...
+
+class StreamDecoder:
+    def feed(self, data: Buffer, /) -> list[Any]: ...
+    def close(self) -> None: ...
+
+@final
+class Decoder:
+    def __init__(
+        self,
+        *,
+        max_depth: int | None = None,
+        max_size: int | None = None,
+        max_string: int | None = None,
+        max_items: int | None = None,
+    ) -> None: ...
+    @property
+    def max_depth(self) -> int | None: ...
+    @property
+    def max_size(self) -> int | None: ...
+    @property
+    def max_string(self) -> int | None: ...
+    @property
+    def max_items(self) -> int | None: ...
+    def decode(self, b: Buffer, /) -> Any: ...
+
+@final
+class Encoder:
+    def __init__(
+        self, *, max_depth: int | None = None, max_size: int | None = None
+    ) -> None: ...
+    @property
+    def max_depth(self) -> int | None: ...
+    @property
+    def max_size(self) -> int | None: ...
+    def encode(self, v: Any, /) -> bytes: ...
+
+@final
+class Raw:
+    def __init__(self, value: Buffer, /) -> None: ...
+    @property
+    def value(self) -> bytes: ...
+    def __eq__(self, other: object, /) -> bool: ...
+    def __hash__(self) -> int: ...
+
+class LazyList(Sequence[Any]):
+    def __len__(self) -> int: ...
+    @overload
+    def __getitem__(self, i: int, /) -> Any: ...
+    @overload
+    def __getitem__(self, i: slice, /) -> list[Any]: ...
+
+class LazyDict(Mapping[bytes, Any]):
+    def __len__(self) -> int: ...
+    def __getitem__(self, key: bytes, /) -> Any: ...
+    def __iter__(self) -> Iterator[bytes]: ...
+    def span(self, key: bytes, /) -> tuple[int, int]: ...
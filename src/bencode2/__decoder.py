@@ -1,9 +1,29 @@
 from __future__ import annotations
 
-from typing import Any, Final
+import builtins
+import mmap
+import operator
+import socket
+import struct
+import sys
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from typing import Any, Final, NoReturn, TypeVar, final, overload
 
 from typing_extensions import Buffer
 
+from .__schema import (
+    KIND_ANY,
+    KIND_BOOL,
+    KIND_BYTES,
+    KIND_DATACLASS,
+    KIND_DICT,
+    KIND_INT,
+    KIND_LIST,
+    KIND_STR,
+    compile_plan,
+)
+
 char_l: Final = ord("l")
 char_i: Final = ord("i")
 char_e: Final = ord("e")
@@ -13,33 +33,791 @@ char_9: Final = ord("9")
 char_dash: Final = ord("-")
 char_colon: Final = ord(":")
 
-_MAX_DECODE_DEPTH: Final = 4096
+_T = TypeVar("_T")
+
+# changed by `set_max_decode_depth`
+_max_decode_depth = 4096
+
+# bytes values not longer than this are interned, like dict keys
+_INTERN_MAX_LENGTH: Final = 16
+
+# scanner state of StreamDecoder
+_STATE_VALUE: Final = 0
+_STATE_INT: Final = 1
+_STATE_LENGTH: Final = 2
+_STATE_STRING: Final = 3
 
 
 class BencodeDecodeError(ValueError):
     """Bencode decode error."""
 
 
-def bdecode(value: Buffer, /) -> Any:
-    """Decode bencode formatted bytes to python value."""
-    return Decoder(memoryview(value).cast("B")).decode()
+@overload
+def bdecode(value: Buffer, /, *, zero_copy: bool = False, threads: int = 1) -> Any: ...
+
+
+@overload
+def bdecode(
+    value: Buffer,
+    /,
+    *,
+    zero_copy: bool = False,
+    type: builtins.type[_T],
+    threads: int = 1,
+) -> _T: ...
+
+
+def bdecode(
+    value: Buffer,
+    /,
+    *,
+    zero_copy: bool = False,
+    type: Any = None,
+    threads: int = 1,
+) -> Any:
+    """Decode bencode formatted bytes to python value.
+
+    With `zero_copy=True`, string values are returned as read-only memoryview
+    of the input buffer instead of bytes, dict keys are still bytes.
+
+    With `type`, value is decoded as an instance of it, see `__schema.py` for
+    supported types.
+
+    `threads` is only used by the compiled extension, value is always decoded
+    on current thread here.
+    """
+    if threads <= 0:
+        raise ValueError("threads must be positive")
+
+    if zero_copy:
+        data = _Decoder(
+            memoryview(value).cast("B").toreadonly(), zero_copy=True
+        ).decode()
+    else:
+        data = _Decoder(memoryview(value).cast("B")).decode()
+
+    if type is None:
+        return data
+
+    return _convert(data, compile_plan(type))
+
+
+def _convert(value: Any, plan: tuple[Any, ...]) -> Any:
+    # iterative like `_Decoder`, containers being converted are kept in `stack`, as
+    # [kind, list or dict plan or dataclass input, items, result, key or field name, cls]
+    stack: list[list[Any]] = []
+
+    while True:
+        kind = plan[0]
+
+        if kind == KIND_ANY:
+            pass
+        elif kind == KIND_INT or kind == KIND_BOOL:
+            if not isinstance(value, int):
+                raise BencodeDecodeError(
+                    f"invalid type, expecting int, found {_type_name(value)}"
+                )
+            if kind == KIND_BOOL:
+                if value not in (0, 1):
+                    raise BencodeDecodeError(f"invalid bool value {value}")
+                value = bool(value)
+        elif kind == KIND_BYTES or kind == KIND_STR:
+            if not isinstance(value, (bytes, memoryview)):
+                raise BencodeDecodeError(
+                    f"invalid type, expecting bytes, found {_type_name(value)}"
+                )
+            if kind == KIND_STR:
+                value = _to_str(value)
+        elif kind == KIND_LIST:
+            if not isinstance(value, list):
+                raise BencodeDecodeError(
+                    f"invalid type, expecting list, found {_type_name(value)}"
+                )
+            stack.append([kind, plan, iter(value), [], None, None])
+            value = _missing
+        else:
+            if not isinstance(value, dict):
+                raise BencodeDecodeError(
+                    f"invalid type, expecting dict, found {_type_name(value)}"
+                )
+            if kind == KIND_DICT:
+                stack.append([kind, plan, iter(value.items()), {}, None, None])
+            else:
+                # KIND_DATACLASS, extra keys are ignored
+                cls = plan[1]()
+                if cls is None:
+                    raise TypeError("dataclass of decode plan is garbage collected")
+                stack.append([kind, value, iter(plan[2]), {}, None, cls])
+            value = _missing
+
+        # add converted value to its container and finish containers,
+        # until next value to convert is found.
+        while True:
+            if value is not _missing:
+                if not stack:
+                    return value
+                top = stack[-1]
+                if top[0] == KIND_LIST:
+                    top[3].append(value)
+                else:
+                    top[3][top[4]] = value
+
+            top = stack[-1]
+            kind = top[0]
+
+            if kind == KIND_LIST:
+                value = next(top[2], _missing)
+                if value is not _missing:
+                    plan = top[1][1]
+                    break
+            elif kind == KIND_DICT:
+                item = next(top[2], None)
+                if item is not None:
+                    dict_plan = top[1]
+                    top[4] = _to_str(item[0]) if dict_plan[1] else item[0]
+                    value = item[1]
+                    plan = dict_plan[2]
+                    break
+            else:
+                for key, name, field_plan, required in top[2]:
+                    value = top[1].get(key, _missing)
+                    if value is not _missing:
+                        top[4] = name
+                        plan = field_plan
+                        break
+                    if required:
+                        raise BencodeDecodeError(
+                            f"missing field {name!r} of {top[5].__qualname__}"
+                        )
+                else:
+                    value = _missing
+                if value is not _missing:
+                    break
 
+            stack.pop()
+            value = top[3] if kind != KIND_DATACLASS else top[5](**top[3])
 
+
+def _to_str(value: bytes | memoryview) -> str:
+    try:
+        return str(value, "utf-8")
+    except UnicodeDecodeError as e:
+        raise BencodeDecodeError(f"invalid utf-8 string: {e}") from None
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, list):
+        return "list"
+    if isinstance(value, dict):
+        return "dict"
+    return "bytes"
+
+
+def get_max_decode_depth() -> int:
+    """Maximum nesting depth of decoded value."""
+    return _max_decode_depth
+
+
+def set_max_decode_depth(depth: int, /) -> None:
+    """Set maximum nesting depth of decoded value, deeper input raise `BencodeDecodeError`."""
+    global _max_decode_depth
+    if depth <= 0:
+        raise ValueError("max decode depth must be positive")
+    _max_decode_depth = depth
+
+
+@final
 class Decoder:
+    """Decoder with its own resource limits, kept between `decode` calls.
+
+    `max_depth` can only lower the limit of `set_max_decode_depth`, `max_size` is
+    the input length, `max_string` is the length of any string and `max_items` is
+    the total number of values and dict keys. Input crossing a limit raise
+    `BencodeDecodeError` as soon as it's found, before the value is built.
+    """
+
+    __slots__ = ("__max_depth", "__max_items", "__max_size", "__max_string")
+
+    def __init__(
+        self,
+        *,
+        max_depth: int | None = None,
+        max_size: int | None = None,
+        max_string: int | None = None,
+        max_items: int | None = None,
+    ) -> None:
+        self.__max_depth = _limit("max_depth", max_depth)
+        self.__max_size = _limit("max_size", max_size)
+        self.__max_string = _limit("max_string", max_string)
+        self.__max_items = _limit("max_items", max_items)
+
+    @property
+    def max_depth(self) -> int | None:
+        return self.__max_depth
+
+    @property
+    def max_size(self) -> int | None:
+        return self.__max_size
+
+    @property
+    def max_string(self) -> int | None:
+        return self.__max_string
+
+    @property
+    def max_items(self) -> int | None:
+        return self.__max_items
+
+    def decode(self, value: Buffer, /) -> Any:
+        """Decode bencode formatted bytes to python value, like `bdecode`."""
+        view = memoryview(value).cast("B")
+        if self.__max_size is not None and len(view) > self.__max_size:
+            raise BencodeDecodeError(
+                f"input size {len(view)} exceeds max_size {self.__max_size}"
+            )
+
+        decoder = _Decoder(view)
+        if (
+            self.__max_depth is not None
+            or self.__max_string is not None
+            or self.__max_items is not None
+        ):
+            decoder.skip(
+                self.__max_depth,
+                max_string=_or_max(self.__max_string),
+                max_items=_or_max(self.__max_items),
+            )
+            if decoder.index != decoder.size:
+                raise BencodeDecodeError(
+                    "invalid bencode value (data after valid prefix)"
+                )
+            decoder.index = 0
+
+        return decoder.decode()
+
+    def __repr__(self) -> str:
+        return (
+            f"Decoder(max_depth={self.__max_depth}, max_size={self.__max_size}, "
+            f"max_string={self.__max_string}, max_items={self.__max_items})"
+        )
+
+
+def _limit(name: str, value: int | None) -> int | None:
+    if value is None:
+        return None
+    value = operator.index(value)
+    if value <= 0:
+        raise ValueError(f"{name} must be positive")
+    return value
+
+
+def _or_max(value: int | None) -> int:
+    return sys.maxsize if value is None else value
+
+
+def _string_too_long(length: int, max_string: int, index: int) -> NoReturn:
+    raise BencodeDecodeError(
+        f"string length {length} exceeds max_string {max_string}, index {index}"
+    )
+
+
+def unpack_peers(value: Buffer, /, *, ipv6: bool = False) -> list[tuple[str, int]]:
+    """Unpack compact peers into (ip, port) pairs, IPv4 peers unless `ipv6` is true."""
+    family, fmt = (socket.AF_INET6, "!16sH") if ipv6 else (socket.AF_INET, "!4sH")
+    with memoryview(value) as m, m.cast("B") as view:
+        record = struct.calcsize(fmt)
+        if len(view) % record:
+            raise ValueError(
+                f"compact peers length {len(view)} is not a multiple of {record}"
+            )
+
+        return [
+            (socket.inet_ntop(family, ip), port)
+            for ip, port in struct.iter_unpack(fmt, view)
+        ]
+
+
+def bdecode_path(value: Buffer, path: Iterable[bytes | int], /) -> Any:
+    """Decode only the value at `path`, a list of dict keys and list indexes.
+
+    Return `None` if path doesn't exist.
+    """
+    return bdecode_paths(value, [path])[0]
+
+
+def bdecode_paths(
+    value: Buffer, paths: Iterable[Iterable[bytes | int]], /
+) -> list[Any]:
+    """Decode only the values at `paths`, `None` for paths that don't exist.
+
+    Values not on any path are skipped without building python object, and a
+    container is left as soon as all its paths are found or passed, data after
+    that is not checked.
+    """
+    decoder = _Decoder(memoryview(value).cast("B"))
+    parsed = [_path(p) for p in paths]
+    results: list[Any] = [None] * len(parsed)
+    _find_paths(decoder, 0, 0, parsed, list(range(len(parsed))), results)
+    return results
+
+
+def _path(path: Iterable[bytes | int]) -> tuple[bytes | int, ...]:
+    items = tuple(path)
+    for item in items:
+        if not isinstance(item, (bytes, int)) or isinstance(item, bool):
+            raise TypeError(
+                f"path item must be bytes or int, not {type(item).__name__}"
+            )
+    return items
+
+
+def _find_paths(
+    decoder: _Decoder,
+    index: int,
+    level: int,
+    paths: list[tuple[bytes | int, ...]],
+    ids: list[int],
+    results: list[Any],
+) -> None:
+    """Find values of paths in `ids`, they share first `level` items and value at index match them."""
+    rest: list[int] = []
+    whole: Any = _missing
+    for i in ids:
+        if len(paths[i]) != level:
+            rest.append(i)
+            continue
+        if whole is _missing:
+            whole = decoder.decode_at(index, level)
+        results[i] = whole
+
+    data = decoder._data
+    c = data[index]
+    if not rest or (c != char_l and c != char_d):
+        return
+
+    if level + 1 > _max_decode_depth:
+        raise BencodeDecodeError("exceeded maximum decode depth")
+
+    # dict keys in path of a list, or list indexes in path of a dict, don't exist.
+    is_dict = c == char_d
+    rest = [i for i in rest if isinstance(paths[i][level], bytes) == is_dict]
+    rest.sort(key=lambda i: paths[i][level])
+
+    size = decoder.size
+    start_index = index
+    index += 1
+    last_key: bytes | None = None
+    count = 0
+    r = 0
+
+    while r < len(rest):
+        if index >= size:
+            what = "bytes" if is_dict else "array"
+            raise BencodeDecodeError(
+                f"buffer overflow when decoding {what}, index {index}"
+            )
+
+        c = data[index]
+        if c == char_e:
+            break
+
+        current: bytes | int
+        if is_dict:
+            if not (char_0 <= c <= char_9):
+                raise BencodeDecodeError(
+                    f"directory only allow str as keys, "
+                    f"found unexpected char "
+                    f"'{c:c}', index {index}"
+                )
+            start, index = _parse_bytes(data, index, size)
+            current = data[start:index]
+            if last_key is not None and current <= last_key:
+                _check_sorted([(last_key, None), (current, None)], start_index)
+            last_key = current
+            if index >= size:
+                raise BencodeDecodeError(
+                    f"buffer overflow when decoding bytes, index {index}"
+                )
+        else:
+            current = count
+            count += 1
+
+        # items are sorted, paths before current item don't exist.
+        while r < len(rest) and paths[rest[r]][level] < current:  # type: ignore[operator]
+            r += 1
+
+        matched: list[int] = []
+        while r < len(rest) and paths[rest[r]][level] == current:
+            matched.append(rest[r])
+            r += 1
+
+        if matched:
+            _find_paths(decoder, index, level + 1, paths, matched, results)
+            if r == len(rest):
+                break
+
+        decoder.index = index
+        decoder._depth = level + 1
+        decoder.skip()
+        index = decoder.index
+
+
+def iterparse(value: Buffer, /) -> Iterator[tuple[str, Any, int]]:
+    """Iterate `(event, value, offset)` parse events of a buffer.
+
+    See `iterparse` in `__file.py`.
+    """
+    return _iterparse(memoryview(value).cast("B").toreadonly())
+
+
+def _iterparse(view: memoryview) -> Iterator[tuple[str, Any, int]]:
+    decoder = _Decoder(view)
+    data = decoder._data
+    size = decoder.size
+    index = 0
+    # `None` for list, `[start index, last key, expect key]` for dict
+    stack: list[list[Any] | None] = []
+
+    while True:
+        if stack:
+            frame = stack[-1]
+            if index >= size:
+                what = "array" if frame is None else "bytes"
+                raise BencodeDecodeError(
+                    f"buffer overflow when decoding {what}, index {index}"
+                )
+
+            c = data[index]
+            if c == char_e:
+                stack.pop()
+                index += 1
+                yield "end", None, index - 1
+                if not stack:
+                    break
+                continue
+
+            if frame is not None and frame[2]:
+                if not (char_0 <= c <= char_9):
+                    raise BencodeDecodeError(
+                        f"directory only allow str as keys, "
+                        f"found unexpected char "
+                        f"'{c:c}', index {index}"
+                    )
+                start, end = _parse_bytes(data, index, size)
+                key = data[start:end]
+                if frame[1] is not None and key <= frame[1]:
+                    _check_sorted([(frame[1], None), (key, None)], frame[0])
+                if end >= size:
+                    raise BencodeDecodeError(
+                        f"buffer overflow when decoding bytes, index {end}"
+                    )
+                frame[1] = key
+                frame[2] = False
+                yield "key", key, index
+                index = end
+                continue
+
+            if frame is not None:
+                # next token is a key after this value
+                frame[2] = True
+
+        if len(stack) + 1 > _max_decode_depth:
+            raise BencodeDecodeError("exceeded maximum decode depth")
+
+        c = data[index]
+        if char_0 <= c <= char_9:
+            start, end = _parse_bytes(data, index, size)
+            yield "bytes", view[start:end], index
+            index = end
+        elif c == char_i:
+            n, end = _parse_int(data, index)
+            yield "int", n, index
+            index = end
+        elif c == char_l:
+            stack.append(None)
+            yield "start_list", None, index
+            index += 1
+            continue
+        elif c == char_d:
+            stack.append([index, None, True])
+            yield "start_dict", None, index
+            index += 1
+            continue
+        else:
+            raise BencodeDecodeError(
+                f"unexpected token {data[index:index + 1]!r}. index {index}"
+            )
+
+        if not stack:
+            break
+
+    if index != size:
+        raise BencodeDecodeError("invalid bencode value (data after valid prefix)")
+
+
+def bdecode_many(values: Iterable[Buffer], /) -> list[Any]:
+    """Decode many values in one call.
+
+    Errors don't abort the batch, exception object is returned in place of
+    the value that failed to decode.
+    """
+    results: list[Any] = []
+    for value in values:
+        try:
+            results.append(_Decoder(memoryview(value).cast("B")).decode())
+        except (BencodeDecodeError, TypeError) as e:
+            results.append(e)
+    return results
+
+
+def bdecode_span(value: Buffer, key: bytes, /) -> tuple[Any, tuple[int, int] | None]:
+    """Decode bencode formatted bytes, and record the byte range of a top-level value.
+
+    Return decoded value and `(start, end)` of the encoded value of `key` in
+    top-level dictionary, or `None` if there is no such key.
+    """
+    decoder = _Decoder(memoryview(value).cast("B"), span_key=key)
+    return decoder.decode(), decoder.span
+
+
+def bdecode_lazy(value: Buffer, /) -> Any:
+    """Decode bencode formatted bytes, containers are decoded on demand.
+
+    The whole input is validated first, then lists and dictionaries are
+    returned as read-only `LazyList`/`LazyDict`, which build python object
+    only for the items that are accessed.
+    """
+    return _lazy_value(_validate(value), 0)
+
+
+def _validate(value: Buffer) -> _Decoder:
+    decoder = _Decoder(memoryview(value).cast("B"))
+    decoder.skip()
+
+    if decoder.index != decoder.size:
+        raise BencodeDecodeError("invalid bencode value (data after valid prefix)")
+
+    return decoder
+
+
+def bvalidate(value: Buffer, /) -> None:
+    """Check that value is valid bencode, without building python object.
+
+    Raise `BencodeDecodeError` with same message as `bdecode`.
+    """
+    _validate(value)
+
+
+def bstats(value: Buffer, /) -> dict[str, int]:
+    """Validate value like `bvalidate`, and count its nodes.
+
+    Dict keys are counted as strings, `max_depth` is counted the same way as
+    the decode depth limit.
+    """
+    decoder = _validate(value)
+    data = decoder._data
+    find = data.find
+    size = decoder.size
+
+    ints = strings = lists = dicts = 0
+    max_depth = string_bytes = max_string_length = 0
+
+    # input is valid, keys and values are scanned the same way.
+    depth = 0
+    index = 0
+    while index < size:
+        c = data[index]
+        if c == char_e:
+            depth -= 1
+            index += 1
+        elif c == char_i:
+            ints += 1
+            max_depth = max(max_depth, depth + 1)
+            index = find(b"e", index) + 1
+        elif c == char_l or c == char_d:
+            if c == char_l:
+                lists += 1
+            else:
+                dicts += 1
+            depth += 1
+            max_depth = max(max_depth, depth)
+            index += 1
+        else:
+            index_colon = find(b":", index)
+            n = int(data[index:index_colon])
+            strings += 1
+            string_bytes += n
+            max_string_length = max(max_string_length, n)
+            max_depth = max(max_depth, depth + 1)
+            index = index_colon + 1 + n
+
+    return {
+        "ints": ints,
+        "strings": strings,
+        "lists": lists,
+        "dicts": dicts,
+        "max_depth": max_depth,
+        "string_bytes": string_bytes,
+        "max_string_length": max_string_length,
+    }
+
+
+_missing: Final = object()
+
+
+def _lazy_value(decoder: _Decoder, index: int) -> Any:
+    c = decoder.value[index]
+    if c == char_l:
+        return LazyList(decoder, index)
+    if c == char_d:
+        return LazyDict(decoder, index)
+    return decoder.decode_at(index)
+
+
+class LazyList(Sequence[Any]):
+    """Read-only list, items are decoded on first access."""
+
+    __slots__ = ("_decoder", "_offsets", "_values")
+
+    def __init__(self, decoder: _Decoder, index: int) -> None:
+        self._decoder = decoder
+        # start of each item
+        self._offsets: list[int] = []
+
+        # input is validated before any container is created.
+        decoder.index = index + 1
+        while decoder.value[decoder.index] != char_e:
+            self._offsets.append(decoder.index)
+            decoder.skip()
+
+        self._values: list[Any] = [_missing] * len(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @overload
+    def __getitem__(self, i: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[Any]: ...
+
+    def __getitem__(self, i: int | slice) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._offsets)))]
+
+        v = self._values[i]
+        if v is _missing:
+            v = self._values[i] = _lazy_value(self._decoder, self._offsets[i])
+        return v
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (LazyList, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class LazyDict(Mapping[bytes, Any]):
+    """Read-only dict, values are decoded on first access."""
+
+    __slots__ = ("_decoder", "_keys", "_offsets", "_values")
+
+    def __init__(self, decoder: _Decoder, index: int) -> None:
+        self._decoder = decoder
+        # sorted, decoder already checked it.
+        self._keys: list[bytes] = []
+        # start of each value
+        self._offsets: list[int] = []
+
+        # input is validated before any container is created.
+        decoder.index = index + 1
+        while decoder.value[decoder.index] != char_e:
+            self._keys.append(decoder.decode_at(decoder.index))  # type: ignore[arg-type]
+            self._offsets.append(decoder.index)
+            decoder.skip()
+
+        self._values: list[Any] = [_missing] * len(self._offsets)
+
+    def __find(self, key: object) -> int:
+        if not isinstance(key, bytes):
+            return -1
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return -1
+        return i
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return self.__find(key) != -1
+
+    def __getitem__(self, key: bytes) -> Any:
+        i = self.__find(key)
+        if i == -1:
+            raise KeyError(key)
+
+        v = self._values[i]
+        if v is _missing:
+            v = self._values[i] = _lazy_value(self._decoder, self._offsets[i])
+        return v
+
+    def span(self, key: bytes) -> tuple[int, int]:
+        """Byte range of the encoded value of key in input buffer."""
+        i = self.__find(key)
+        if i == -1:
+            raise KeyError(key)
+
+        start = self._offsets[i]
+        self._decoder.index = start
+        self._decoder.skip()
+        return start, self._decoder.index
+
+
+class _Decoder:
     value: memoryview
     index: int
     size: int
+    span: tuple[int, int] | None
 
-    __slots__ = ("_depth", "index", "size", "value")
+    __slots__ = (
+        "_data",
+        "_depth",
+        "_intern",
+        "_span_key",
+        "_zero_copy",
+        "index",
+        "size",
+        "span",
+        "value",
+    )
 
-    def __init__(self, value: memoryview) -> None:
+    def __init__(
+        self,
+        value: memoryview,
+        zero_copy: bool = False,
+        span_key: bytes | None = None,
+    ) -> None:
         self.size = len(value)
         if self.size == 0:
             raise BencodeDecodeError("empty input")
 
         self.value = value
+        # same content as value, but support `find` and slicing to bytes.
+        self._data = _searchable(value)
         self.index = 0
         self._depth = 0
+        self._zero_copy = zero_copy
+        self._span_key = span_key
+        # repeated dict keys and short values share one bytes object
+        self._intern: dict[bytes, bytes] = {}
+        # byte range of the value of `span_key` in top-level dict
+        self.span = None
 
     def decode(self) -> object:
         data = self.__decode()
@@ -49,161 +827,326 @@ class Decoder:
 
         return data
 
+    def decode_at(self, index: int, depth: int = 0) -> object:
+        """Decode the value start at index, `depth` is the number of its parents."""
+        self.index = index
+        self._depth = depth
+        return self.__decode()
+
     def __decode(self) -> object:
-        self._depth += 1
-        if self._depth > _MAX_DECODE_DEPTH:
-            raise BencodeDecodeError("exceeded maximum decode depth")
+        # iterative, containers being decoded are kept in `stack`,
+        # dict is kept as a flat `[key, value, key, value, ...]` list until it's closed.
+        data = self._data
+        find = data.find
+        size = self.size
+        index = self.index
+        depth = self._depth
+        intern = self._intern
+        zero_copy = self._zero_copy
+        span_key = self._span_key
 
-        if char_0 <= self.value[self.index] <= char_9:
-            return self.__decode_bytes()
-        if self.value[self.index] == char_i:
-            return self.__decode_int()
-        if self.value[self.index] == char_d:
-            return self.__decode_dict()
-        if self.value[self.index] == char_l:
-            return self.__decode_list()
+        stack: list[list[Any]] = []
+        # (is dict, start index) of containers in stack
+        frames: list[tuple[bool, int]] = []
+        top: list[Any] = []
+        in_dict = False
+        # start of the value of current key in top-level dict
+        span_start = 0
 
-        raise BencodeDecodeError(
-            f"unexpected token {self.value[self.index:self.index + 1].tobytes()}. "
-            f"index {self.index}"
-        )
+        while True:
+            depth += 1
+            if depth > _max_decode_depth:
+                raise BencodeDecodeError("exceeded maximum decode depth")
 
-    def __decode_int(self) -> int:
-        self.index += 1
-        for i, c in enumerate(self.value[self.index :]):
-            if c == char_e:
-                index_end = i + self.index
+            c = data[index]
+            v: Any
+            if char_0 <= c <= char_9:
+                index_colon = find(b":", index)
+                length = data[index:index_colon]
+                if (
+                    index_colon == -1
+                    or not length.isdigit()
+                    or len(length) > 18
+                    or (c == char_0 and index_colon != index + 1)
+                    or index_colon + (n := int(length)) >= size
+                ):
+                    # slow path to raise error
+                    _parse_bytes(data, index, size)
+                start = index_colon + 1
+                index = start + n
+                if zero_copy:
+                    v = self.value[start:index]
+                else:
+                    v = data[start:index]
+                    if index - start <= _INTERN_MAX_LENGTH:
+                        v = intern.setdefault(v, v)
+                depth -= 1
+            elif c == char_i:
+                v, index = _parse_int(data, index)
+                depth -= 1
+            elif c == char_l or c == char_d:
+                stack.append(top)
+                top = []
+                in_dict = c == char_d
+                frames.append((in_dict, index))
+                index += 1
+                v = _missing
+            else:
+                raise BencodeDecodeError(
+                    f"unexpected token {data[index:index + 1]!r}. index {index}"
+                )
+
+            # add decoded value to its container, close finished containers,
+            # until next value to decode is found.
+            while True:
+                if v is not _missing:
+                    if not frames:
+                        self.index = index
+                        self._depth = depth
+                        return v
+
+                    top.append(v)
+                    if in_dict and depth == 1 and top[-2] == span_key:
+                        self.span = (span_start, index)
+
+                if in_dict:
+                    if index >= size:
+                        raise BencodeDecodeError(
+                            f"buffer overflow when decoding bytes, index {index}"
+                        )
+                    c = data[index]
+                    if c == char_e:
+                        index += 1
+                        depth -= 1
+                        v = _build_dict(top, frames.pop()[1])
+                        top = stack.pop()
+                        in_dict = bool(frames) and frames[-1][0]
+                        continue
+                    if not (char_0 <= c <= char_9):
+                        raise BencodeDecodeError(
+                            f"directory only allow str as keys, "
+                            f"found unexpected char "
+                            f"'{c:c}', index {index}"
+                        )
+                    start, index = _parse_bytes(data, index, size)
+                    k = data[start:index]
+                    top.append(intern.setdefault(k, k))
+                    if index >= size:
+                        raise BencodeDecodeError(
+                            f"buffer overflow when decoding bytes, index {index}"
+                        )
+                    if depth == 1:
+                        span_start = index
+                    break
+
+                if index >= size:
+                    raise BencodeDecodeError(
+                        f"buffer overflow when decoding array, index {index}"
+                    )
+                if data[index] == char_e:
+                    index += 1
+                    depth -= 1
+                    frames.pop()
+                    v = top
+                    top = stack.pop()
+                    in_dict = bool(frames) and frames[-1][0]
+                    continue
                 break
-        else:
-            raise BencodeDecodeError(
-                f"invalid int, failed to found end. index {self.index}"
-            )
 
-        if index_end == self.index:
-            raise BencodeDecodeError(f"invalid int, found 'ie': {self.index}")
+    def skip(
+        self,
+        max_depth: int | None = None,
+        max_string: int = sys.maxsize,
+        max_items: int = sys.maxsize,
+    ) -> None:
+        """Validate the value at current index and move to its end.
 
-        n: int = 1
-        offset: int = 0
+        Same check as decoding, but containers are not built.
+        Limits of `Decoder` are checked here, dict keys are counted as items.
+        """
+        data = self._data
+        size = self.size
+        index = self.index
+        depth = self._depth
+        if max_depth is None or max_depth > _max_decode_depth:
+            max_depth = _max_decode_depth
+        items = 0
+        # `None` for list, `[start index, last key]` for dict
+        stack: list[list[Any] | None] = []
 
-        if self.value[self.index] == char_dash:
-            n = -1
-            offset = 1
-            if self.index + offset >= index_end:
-                raise BencodeDecodeError(
-                    f"invalid int, '-' with no digits at {self.index}"
-                )
+        while True:
+            depth += 1
+            if depth > max_depth:
+                raise BencodeDecodeError("exceeded maximum decode depth")
 
-        total: int = 0
-        for c in self.value[self.index + offset : index_end]:
-            if not (char_0 <= c <= char_9):
+            items += 1
+            if items > max_items:
                 raise BencodeDecodeError(
-                    f"malformed int {self.value[self.index:index_end].tobytes()}. index {self.index}"
+                    f"exceeded max_items {max_items}, index {index}"
                 )
-            total = total * 10 + (c - char_0)
-
-        n = total * n
 
-        if self.value[self.index] == char_dash:
-            if self.value[self.index + 1] == char_0:
+            c = data[index]
+            if char_0 <= c <= char_9:
+                start, index = _parse_bytes(data, index, size)
+                if index - start > max_string:
+                    _string_too_long(index - start, max_string, start)
+                depth -= 1
+            elif c == char_i:
+                index = _parse_int(data, index)[1]
+                depth -= 1
+            elif c == char_l:
+                stack.append(None)
+                index += 1
+            elif c == char_d:
+                stack.append([index, None])
+                index += 1
+            else:
                 raise BencodeDecodeError(
-                    f"-0 is not allowed in bencoding. index: {self.index}"
+                    f"unexpected token {data[index:index + 1]!r}. index {index}"
                 )
-        elif self.value[self.index] == char_0 and index_end != self.index + 1:
-            raise BencodeDecodeError(
-                f"integer with leading zero is not allowed. index: {self.index}"
-            )
-        self.index = index_end + 1
-        return n
 
-    def __decode_list(self) -> list[Any]:
-        r: list[Any] = []
-        self.index += 1
+            while True:
+                if not stack:
+                    self.index = index
+                    self._depth = depth
+                    return
 
-        while True:
-            if self.index >= self.size:
-                raise BencodeDecodeError(
-                    f"buffer overflow when decoding array, index {self.index}"
-                )
+                frame = stack[-1]
+                if frame is None:
+                    if index >= size:
+                        raise BencodeDecodeError(
+                            f"buffer overflow when decoding array, index {index}"
+                        )
+                    if data[index] == char_e:
+                        index += 1
+                        stack.pop()
+                        depth -= 1
+                        continue
+                    break
 
-            if self.value[self.index] == char_e:
+                if index >= size:
+                    raise BencodeDecodeError(
+                        f"buffer overflow when decoding bytes, index {index}"
+                    )
+                c = data[index]
+                if c == char_e:
+                    index += 1
+                    stack.pop()
+                    depth -= 1
+                    continue
+                if not (char_0 <= c <= char_9):
+                    raise BencodeDecodeError(
+                        f"directory only allow str as keys, "
+                        f"found unexpected char "
+                        f"'{c:c}', index {index}"
+                    )
+                items += 1
+                if items > max_items:
+                    raise BencodeDecodeError(
+                        f"exceeded max_items {max_items}, index {index}"
+                    )
+                start, index = _parse_bytes(data, index, size)
+                if index - start > max_string:
+                    _string_too_long(index - start, max_string, start)
+                key = data[start:index]
+                if frame[1] is not None:
+                    _check_sorted([(frame[1], None), (key, None)], frame[0])
+                frame[1] = key
+                if index >= size:
+                    raise BencodeDecodeError(
+                        f"buffer overflow when decoding bytes, index {index}"
+                    )
                 break
 
-            v = self.__decode()
-            r.append(v)
 
-        self.index += 1
-        return r
+def _searchable(value: memoryview) -> bytes | mmap.mmap:
+    """Object with same content as value, which support `find` and slicing to bytes.
 
-    def __decode_bytes(self) -> bytes:
-        for i, c in enumerate(self.value[self.index :]):
-            if c == char_colon:
-                index_colon = i + self.index
-                break
-        else:
-            raise BencodeDecodeError(
-                f"invalid bytes, failed find expected char ':'. index {self.index}"
-            )
+    Input is only copied if it's not bytes or mmap.
+    """
+    obj = value.obj
+    if isinstance(obj, (bytes, mmap.mmap)) and len(obj) == value.nbytes:
+        return obj
+    return value.tobytes()
 
-        if self.value[self.index] == char_0 and index_colon != self.index + 1:
-            raise BencodeDecodeError(
-                f"malformed str/bytes length with leading 0. index {self.index}"
-            )
 
-        n: int = 0
-        for c in self.value[self.index : index_colon]:
-            if not (char_0 <= c <= char_9):
-                raise BencodeDecodeError(
-                    f"malformed str/bytes length {self.value[self.index:index_colon].tobytes()!r}."
-                    f" index {self.index}"
-                )
+def _parse_bytes(data: bytes | mmap.mmap, index: int, size: int) -> tuple[int, int]:
+    """Validate string at index, return range of its content."""
+    index_colon = data.find(b":", index)
+    if index_colon == -1:
+        raise BencodeDecodeError(
+            f"invalid bytes, failed find expected char ':'. index {index}"
+        )
 
-            n = n * 10 + (c - char_0)
+    if data[index] == char_0 and index_colon != index + 1:
+        raise BencodeDecodeError(
+            f"malformed str/bytes length with leading 0. index {index}"
+        )
 
-        if index_colon + n >= self.size:
-            raise BencodeDecodeError(
-                f"malformed str/bytes length, buffer overflow. index {self.index}"
-            )
+    length = data[index:index_colon]
+    if not length.isdigit():
+        raise BencodeDecodeError(
+            f"malformed str/bytes length {length!r}. index {index}"
+        )
 
-        index_colon += 1
+    # no buffer is that large, and avoid int() on a huge digits string
+    n = int(length) if len(length) <= 18 else size
+    if index_colon + n >= size:
+        raise BencodeDecodeError(
+            f"malformed str/bytes length, buffer overflow. index {index}"
+        )
 
-        s = self.value[index_colon : index_colon + n]
+    return index_colon + 1, index_colon + 1 + n
 
-        self.index = index_colon + n
 
-        return s.tobytes()
+def _parse_int(data: bytes | mmap.mmap, index: int) -> tuple[int, int]:
+    """Decode int at index, return value and index after it."""
+    index += 1
+    index_end = data.find(b"e", index)
+    if index_end == -1:
+        raise BencodeDecodeError(f"invalid int, failed to found end. index {index}")
 
-    def __decode_dict(self) -> dict[str | bytes, Any]:
-        start_index = self.index
-        self.index += 1
+    if index_end == index:
+        raise BencodeDecodeError(f"invalid int, found 'ie': {index}")
 
-        items: list[tuple[bytes, Any]] = []
+    s = data[index:index_end]
+    digits = s
+    if s[0] == char_dash:
+        if len(s) == 1:
+            raise BencodeDecodeError(f"invalid int, '-' with no digits at {index}")
+        digits = s[1:]
 
-        while True:
-            if self.index >= self.size:
-                raise BencodeDecodeError(
-                    f"buffer overflow when decoding bytes, index {self.index}"
-                )
-            if self.value[self.index] == char_e:
-                break
-            if not (char_0 <= self.value[self.index] <= char_9):
-                raise BencodeDecodeError(
-                    f"directory only allow str as keys, "
-                    f"found unexpected char "
-                    f"'{self.value[self.index]:c}', index {self.index}"
-                )
-            k = self.__decode_bytes()
-            v = self.__decode()
-            items.append((k, v))
+    if not digits.isdigit():
+        raise BencodeDecodeError(f"malformed int {s!r}. index {index}")
+
+    if s[0] == char_dash:
+        if s[1] == char_0:
+            raise BencodeDecodeError(f"-0 is not allowed in bencoding. index: {index}")
+    elif s[0] == char_0 and len(s) != 1:
+        raise BencodeDecodeError(
+            f"integer with leading zero is not allowed. index: {index}"
+        )
 
-        if not items:
-            self.index += 1
-            return {}
+    try:
+        n = int(s)
+    except ValueError:
+        # exceeds the limit of int string conversion
+        n = 0
+        for c in digits:
+            n = n * 10 + (c - char_0)
+        if s[0] == char_dash:
+            n = -n
 
-        _check_sorted(items, start_index)
+    return n, index_end + 1
 
-        self.index += 1
 
-        return dict(items)
+def _build_dict(items: list[Any], start_index: int) -> dict[bytes, Any]:
+    """Build dict from flat `[key, value, ...]` list, keys must be sorted."""
+    keys = items[::2]
+    for i in range(1, len(keys)):
+        if keys[i] <= keys[i - 1]:
+            _check_sorted([(k, None) for k in keys], start_index)
+    return dict(zip(keys, items[1::2]))
 
 
 def _check_sorted(s: list[tuple[bytes, Any]], idx: int) -> None:
@@ -214,3 +1157,138 @@ def _check_sorted(s: list[tuple[bytes, Any]], idx: int) -> None:
         if s[i][0] == s[i - 1][0]:
             raise BencodeDecodeError(f"found duplicated keys in directory, index {idx}")
         i += 1
+
+
+class StreamDecoder:
+    """Incremental decoder, accept bencode data in chunks.
+
+    Bytes are only scanned once to find the boundary of top-level values,
+    each complete value is decoded as soon as its last byte is fed.
+    """
+
+    __slots__ = ("_buffer", "_depth", "_index", "_length", "_state", "_token")
+
+    def __init__(self) -> None:
+        self.__reset()
+
+    def __reset(self) -> None:
+        # unconsumed data, always start with the current top-level value
+        self._buffer = bytearray()
+        # bytes before index are already scanned
+        self._index = 0
+        self._state = _STATE_VALUE
+        self._depth = 0
+        # remaining bytes of current string in _STATE_STRING
+        self._length = 0
+        # start of length digits in _STATE_LENGTH
+        self._token = 0
+
+    def feed(self, data: Buffer, /) -> list[Any]:
+        """Feed a chunk of data, return all top-level values completed by it."""
+        buf = self._buffer
+        buf += data
+
+        try:
+            return self.__scan(buf)
+        except BencodeDecodeError:
+            self.__reset()
+            raise
+
+    def close(self) -> None:
+        """Check there is no incomplete value left in the stream."""
+        if self._buffer:
+            self.__reset()
+            raise BencodeDecodeError("incomplete bencode value at end of stream")
+
+    def __scan(self, buf: bytearray) -> list[Any]:
+        values: list[Any] = []
+        view: memoryview | None = None
+
+        size = len(buf)
+        index = self._index
+        state = self._state
+        depth = self._depth
+        # start of current top-level value
+        start = 0
+
+        while index < size:
+            if state == _STATE_STRING:
+                n = min(self._length, size - index)
+                index += n
+                self._length -= n
+                if self._length:
+                    continue
+                state = _STATE_VALUE
+            elif state == _STATE_INT:
+                index_e = buf.find(b"e", index)
+                if index_e == -1:
+                    index = size
+                    continue
+                index = index_e + 1
+                state = _STATE_VALUE
+            elif state == _STATE_LENGTH:
+                index_colon = buf.find(b":", index)
+                end = size if index_colon == -1 else index_colon
+                if not buf[index:end].isdigit() and index != end:
+                    raise BencodeDecodeError(
+                        f"invalid bytes length, found non-digit char. index {index}"
+                    )
+                # fail before waiting for a string that can't be held in memory
+                if end - self._token > 18:
+                    digits = buf[self._token : end].lstrip(b"0")
+                    if len(digits) > 19 or int(digits or b"0") > sys.maxsize:
+                        raise BencodeDecodeError(
+                            f"bytes length overflow, index {self._token}"
+                        )
+                if index_colon == -1:
+                    index = size
+                    continue
+                self._length = int(buf[self._token : index_colon])
+                index = index_colon + 1
+                if self._length:
+                    state = _STATE_STRING
+                    continue
+                state = _STATE_VALUE
+            else:
+                c = buf[index]
+                if c == char_i:
+                    state = _STATE_INT
+                    index += 1
+                    continue
+                if char_0 <= c <= char_9:
+                    state = _STATE_LENGTH
+                    self._token = index
+                    index += 1
+                    continue
+                if c == char_l or c == char_d:
+                    depth += 1
+                    if depth > _max_decode_depth:
+                        raise BencodeDecodeError("exceeded maximum decode depth")
+                    index += 1
+                    continue
+                if c != char_e or depth == 0:
+                    raise BencodeDecodeError(
+                        f"invalid bencode prefix {buf[index:index + 1]!r}, index {index}"
+                    )
+                depth -= 1
+                index += 1
+
+            # a value end at index, decode it if it's a top-level value
+            if depth == 0:
+                if view is None:
+                    view = memoryview(buf)
+                values.append(_Decoder(view[start:index]).decode())
+                start = index
+
+        if start:
+            # slice to a new bytearray, memoryview may still export old buffer.
+            buf = buf[start:]
+            index -= start
+            self._token -= start
+
+        self._buffer = buf
+        self._index = index
+        self._state = state
+        self._depth = depth
+
+        return values
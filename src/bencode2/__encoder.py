@@ -1,17 +1,65 @@
 from __future__ import annotations
 
 import io
+import operator
+import socket
+import sys
+import weakref
 from collections import OrderedDict
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 from dataclasses import fields, is_dataclass
 from types import MappingProxyType
-from typing import Any
+from typing import Any, Protocol, final
+
+from typing_extensions import Buffer
+
+from .__decoder import _limit, bvalidate
 
 
 class BencodeEncodeError(ValueError):
     """Bencode encode error."""
 
 
+@final
+class Raw:
+    """Pre-encoded bencode value, written to encoder output as it is.
+
+    Value is copied and checked once when `Raw` is created.
+    """
+
+    __slots__ = ("__value",)
+
+    def __init__(self, value: Buffer, /) -> None:
+        try:
+            data = bytes(memoryview(value))
+        except TypeError:
+            raise TypeError(
+                f"Raw value must be bytes-like object, not {type(value).__name__}"
+            ) from None
+
+        bvalidate(data)
+        self.__value = data
+
+    @property
+    def value(self) -> bytes:
+        return self.__value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Raw):
+            return NotImplemented
+        return self.__value == other.__value
+
+    def __hash__(self) -> int:
+        return hash(self.__value)
+
+    def __repr__(self) -> str:
+        return f"Raw({self.__value!r})"
+
+
+class _Writer(Protocol):
+    def write(self, b: Buffer, /) -> object: ...
+
+
 def bencode(value: Any, /) -> bytes:
     """Encode value into the bencode format."""
     with io.BytesIO() as w:
@@ -19,7 +67,244 @@ def bencode(value: Any, /) -> bytes:
         return w.getvalue()
 
 
-def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> None:
+@final
+class Encoder:
+    """Encoder with its own resource limits, kept between `encode` calls.
+
+    `max_depth` is the nesting depth of containers and `max_size` is the output
+    length, value crossing a limit raise `BencodeEncodeError` as soon as it's found.
+    """
+
+    __slots__ = ("__max_depth", "__max_size")
+
+    def __init__(
+        self, *, max_depth: int | None = None, max_size: int | None = None
+    ) -> None:
+        self.__max_depth = _limit("max_depth", max_depth)
+        self.__max_size = _limit("max_size", max_size)
+
+    @property
+    def max_depth(self) -> int | None:
+        return self.__max_depth
+
+    @property
+    def max_size(self) -> int | None:
+        return self.__max_size
+
+    def encode(self, value: Any, /) -> bytes:
+        """Encode value into the bencode format, like `bencode`."""
+        return _encode_limited(value, self.__max_depth, self.__max_size)
+
+    def __repr__(self) -> str:
+        return f"Encoder(max_depth={self.__max_depth}, max_size={self.__max_size})"
+
+
+# module level function, `__encode` would be name mangled in class body.
+def _encode_limited(value: Any, max_depth: int | None, max_size: int | None) -> bytes:
+    depth = sys.maxsize if max_depth is None else max_depth
+    if max_size is None:
+        with io.BytesIO() as w:
+            __encode(w, value, set(), stack_depth=0, max_depth=depth)
+            return w.getvalue()
+
+    limited = _LimitedWriter(max_size)
+    __encode(limited, value, set(), stack_depth=0, max_depth=depth)
+    return bytes(limited.buffer)
+
+
+class _LimitedWriter:
+    __slots__ = ("_max_size", "buffer")
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self.buffer = bytearray()
+
+    def write(self, b: Buffer, /) -> None:
+        if len(self.buffer) + memoryview(b).nbytes > self._max_size:
+            raise BencodeEncodeError(f"encoded size exceeds max_size {self._max_size}")
+        self.buffer += b
+
+
+def bencoded_size(value: Any, /) -> int:
+    """Return length of `bencode(value)`, without building the encoded bytes."""
+    w = _SizeCounter()
+    __encode(w, value, set(), stack_depth=0)
+    return w.size
+
+
+class _SizeCounter:
+    __slots__ = ("size",)
+
+    def __init__(self) -> None:
+        self.size = 0
+
+    def write(self, b: Buffer, /) -> None:
+        self.size += memoryview(b).nbytes
+
+
+def bencode_into(value: Any, buffer: Buffer, /, offset: int = 0) -> int:
+    """Encode value into a writable buffer at offset, return number of bytes written."""
+    data = bencode(value)
+
+    with memoryview(buffer) as m, m.cast("B") as view:
+        if view.readonly:
+            raise BufferError("Object is not writable.")
+        if not 0 <= offset <= len(view):
+            raise ValueError("offset out of range")
+
+        available = len(view) - offset
+        if len(data) > available:
+            raise BencodeEncodeError(
+                f"buffer too small, need {len(data)} bytes but only {available} available"
+            )
+
+        view[offset : offset + len(data)] = data
+
+    return len(data)
+
+
+def bencode_to(value: Any, fp: _Writer, /, chunk_size: int = 64 * 1024) -> int:
+    """Encode value to a file-like object, return number of bytes written.
+
+    Encoded data is passed to `fp.write` every `chunk_size` bytes,
+    bytes-like values larger than `chunk_size` are written as they are.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    w = _ChunkWriter(fp, chunk_size)
+    __encode(w, value, set(), stack_depth=0)
+    w.flush()
+    return w.written
+
+
+class _ChunkWriter:
+    __slots__ = ("_buffer", "_chunk_size", "_write", "written")
+
+    def __init__(self, fp: _Writer, chunk_size: int) -> None:
+        self._write = fp.write
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self.written = 0
+
+    def write(self, b: Buffer, /) -> None:
+        size = memoryview(b).nbytes
+        if size >= self._chunk_size:
+            self.flush()
+            self._write(b)
+            self.written += size
+            return
+
+        self._buffer += b
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write(bytes(self._buffer))
+            self.written += len(self._buffer)
+            self._buffer.clear()
+
+
+def bencode_many(values: Iterable[Any], /) -> list[bytes | Exception]:
+    """Encode many values in one call.
+
+    Errors don't abort the batch, exception object is returned in place of
+    the value that failed to encode.
+    """
+    results: list[bytes | Exception] = []
+    with io.BytesIO() as w:
+        for value in values:
+            w.seek(0)
+            w.truncate()
+            try:
+                __encode(w, value, set(), stack_depth=0)
+            except (TypeError, ValueError) as e:
+                results.append(e)
+                continue
+            results.append(w.getvalue())
+    return results
+
+
+# settings of `configure_buffers`, the pure python encoder doesn't pool buffers.
+_buffer_config = {"pool_size": 3, "max_buffer_size": 20 * 1024 * 1024}
+
+
+def configure_buffers(
+    *, pool_size: int | None = None, max_buffer_size: int | None = None
+) -> dict[str, int]:
+    """Set how many encode buffers each thread keep, and the size they are shrunk to.
+
+    Return current settings. Only the compiled extension pool buffers, settings are
+    checked and kept here.
+    """
+    if pool_size is not None:
+        pool_size = operator.index(pool_size)
+        if pool_size < 0:
+            raise ValueError("pool_size must not be negative")
+    if max_buffer_size is not None:
+        max_buffer_size = operator.index(max_buffer_size)
+        if max_buffer_size < 4096:
+            raise ValueError("max_buffer_size must be at least 4096")
+
+    if pool_size is not None:
+        _buffer_config["pool_size"] = pool_size
+    if max_buffer_size is not None:
+        _buffer_config["max_buffer_size"] = max_buffer_size
+
+    return dict(_buffer_config)
+
+
+def trim_buffers() -> None:
+    """Free pooled encode buffers, there is nothing to free in pure python encoder."""
+
+
+def buffer_stats() -> dict[str, dict[str, int]]:
+    """Hits, misses and retained bytes of encode buffer pools, always 0 here."""
+    thread = {"hits": 0, "misses": 0, "contexts": 0, "retained_bytes": 0}
+    return {"thread": thread, "global": {**thread, "threads": 0}}
+
+
+def pack_peers(peers: Iterable[tuple[str, int]], /) -> bytes:
+    """Pack (ip, port) pairs into compact peers, 6 bytes per IPv4 peer or 18 bytes per IPv6 peer."""
+    out = bytearray()
+    family = 0
+    for peer in peers:
+        if not isinstance(peer, tuple) or len(peer) != 2:
+            raise TypeError(
+                f"peer must be a (ip, port) tuple, not {type(peer).__name__}"
+            )
+
+        ip, port = peer
+        if not isinstance(ip, str):
+            raise TypeError(f"ip must be str, not {type(ip).__name__}")
+
+        f = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        if not family:
+            family = f
+        elif family != f:
+            raise ValueError("can't mix IPv4 and IPv6 peers")
+
+        try:
+            out += socket.inet_pton(f, ip)
+        except (OSError, ValueError):
+            raise ValueError(f"invalid IP address {ip!r}") from None
+
+        port = operator.index(port)
+        if not 0 <= port <= 65535:
+            raise ValueError(f"port must be in range 0-65535, not {port!r}")
+        out += port.to_bytes(2, "big")
+
+    return bytes(out)
+
+
+def __encode(
+    w: _Writer,
+    value: Any,
+    seen: set[int],
+    stack_depth: int,
+    max_depth: int = sys.maxsize,
+) -> None:
     if isinstance(value, str):
         return __encode_bytes(w, value.encode("UTF-8"))
 
@@ -37,17 +322,21 @@ def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> Non
 
     i = id(value)
     if isinstance(value, (dict, OrderedDict, MappingProxyType)):
+        if stack_depth > max_depth:
+            raise BencodeEncodeError(f"exceeded max_depth {max_depth}")
         if stack_depth >= 100:
             if i in seen:
                 raise BencodeEncodeError(f"circular reference found {value!r}")
             seen.add(i)
-        __encode_mapping(w, value, seen, stack_depth=stack_depth)
+        __encode_mapping(w, value, seen, stack_depth, max_depth)
         if stack_depth >= 100:  # pragma: no cover
             seen.remove(i)
         stack_depth -= 1
         return
 
     if isinstance(value, (list, tuple)):
+        if stack_depth > max_depth:
+            raise BencodeEncodeError(f"exceeded max_depth {max_depth}")
         if stack_depth >= 100:
             if i in seen:
                 raise BencodeEncodeError(f"circular reference found {value!r}")
@@ -55,7 +344,7 @@ def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> Non
 
         w.write(b"l")
         for item in value:
-            __encode(w, item, seen, stack_depth=stack_depth)
+            __encode(w, item, seen, stack_depth, max_depth)
         w.write(b"e")
 
         if stack_depth >= 100:  # pragma: no cover
@@ -65,7 +354,7 @@ def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> Non
         return
 
     if isinstance(value, bytearray):
-        __encode_bytes(w, bytes(value))
+        __encode_bytes(w, value)
         return
 
     if isinstance(value, memoryview):
@@ -74,13 +363,19 @@ def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> Non
         w.write(value)
         return
 
+    if isinstance(value, Raw):
+        w.write(value.value)
+        return
+
     if is_dataclass(value) and not isinstance(value, type):
+        if stack_depth > max_depth:
+            raise BencodeEncodeError(f"exceeded max_depth {max_depth}")
         if stack_depth >= 100:
             if i in seen:
                 raise BencodeEncodeError(f"circular reference found {value!r}")
             seen.add(i)
 
-        __encode_dataclass(w, value, seen, stack_depth=stack_depth)
+        __encode_dataclass(w, value, seen, stack_depth, max_depth)
 
         if stack_depth >= 100:  # pragma: no cover
             seen.remove(i)
@@ -91,17 +386,18 @@ def __encode(w: io.BytesIO, value: Any, seen: set[int], stack_depth: int) -> Non
     raise TypeError(f"type '{type(value)!r}' not supported by bencode")
 
 
-def __encode_bytes(w: io.BytesIO, val: bytes) -> None:
+def __encode_bytes(w: _Writer, val: bytes | bytearray) -> None:
     w.write(str(len(val)).encode())
     w.write(b":")
     w.write(val)
 
 
 def __encode_mapping(
-    w: io.BytesIO,
+    w: _Writer,
     val: Mapping[Any, Any],
     seen: set[int],
     stack_depth: int,
+    max_depth: int,
 ) -> None:
     w.write(b"d")
 
@@ -115,30 +411,40 @@ def __encode_mapping(
 
     for k, v in i_list:
         __encode_bytes(w, k)
-        __encode(w, v, seen, stack_depth=stack_depth)
+        __encode(w, v, seen, stack_depth, max_depth)
 
     w.write(b"e")
 
 
-def __encode_dataclass(w: io.BytesIO, x: Any, seen: set[int], stack_depth: int) -> None:
-    keys = fields(x)
-    if not keys:
-        w.write(b"de")
-        return
-
+def __encode_dataclass(
+    w: _Writer, x: Any, seen: set[int], stack_depth: int, max_depth: int
+) -> None:
     w.write(b"d")
 
-    ks = sorted([k.name for k in keys])
-
     # no need to check duplicated keys, dataclasses will check this.
 
-    for k in ks:
-        __encode_bytes(w, k.encode())
-        __encode(w, getattr(x, k), seen, stack_depth=stack_depth)
+    for key, name in _dataclass_plan(type(x)):
+        w.write(key)
+        __encode(w, getattr(x, name), seen, stack_depth, max_depth)
 
     w.write(b"e")
 
 
+# pre-encoded `len:name` keys and field names of dataclass types, sorted by name.
+_dataclass_plans: weakref.WeakKeyDictionary[type, list[tuple[bytes, str]]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _dataclass_plan(cls: type) -> list[tuple[bytes, str]]:
+    plan = _dataclass_plans.get(cls)
+    if plan is None:
+        names = sorted((f.name.encode(), f.name) for f in fields(cls))
+        plan = [(str(len(k)).encode() + b":" + k, name) for k, name in names]
+        _dataclass_plans[cls] = plan
+    return plan
+
+
 def __check_duplicated_keys(s: list[tuple[bytes, object]]) -> None:
     last_key: bytes = s[0][0]
     for current, _ in s[1:]:
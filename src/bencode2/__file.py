@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import io
+import mmap
+import os
+from collections.abc import Iterator
+from typing import Any, BinaryIO, cast
+
+from typing_extensions import Buffer
+
+try:
+    from .__bencode import bdecode, bdecode_lazy
+    from .__bencode import iterparse as _iterparse
+except ModuleNotFoundError:
+    from .__decoder import bdecode, bdecode_lazy  # type: ignore[no-redef]
+    from .__decoder import iterparse as _iterparse
+
+
+def bdecode_file(
+    path: str | os.PathLike[str],
+    /,
+    *,
+    zero_copy: bool = False,
+    lazy: bool = False,
+    threads: int = 1,
+) -> Any:
+    """Decode a bencode file, file content is memory-mapped instead of read into bytes.
+
+    `zero_copy` and `lazy` work like `bdecode(..., zero_copy=True)` and `bdecode_lazy`,
+    returned value keep the mapping alive, it's unmapped when they are garbage collected.
+    `threads` is passed to `bdecode`.
+    """
+    with open(path, "rb") as f:
+        m = _map(f)
+
+    # mapping is not closed explicitly, decoded value or exception traceback may still
+    # hold a buffer of it, it's unmapped when all of them are released.
+    if lazy:
+        return bdecode_lazy(m)
+    if zero_copy:
+        return bdecode(m, zero_copy=True)
+    return bdecode(m, threads=threads)
+
+
+def iterparse(
+    source: Buffer | str | os.PathLike[str] | BinaryIO, /
+) -> Iterator[tuple[str, Any, int]]:
+    """Iterate parse events of bencode data, without building any container.
+
+    `source` is a bytes-like object, a file path or a binary file, files are
+    memory-mapped if possible. Events are `(event, value, offset)`, `offset` is
+    the index where the token start in input:
+
+    - `("start_list", None, offset)`, `("start_dict", None, offset)`
+    - `("end", None, offset)`, end of current list or dict
+    - `("key", bytes, offset)`, a dict key
+    - `("int", int, offset)`
+    - `("bytes", memoryview, offset)`, a read-only slice of input
+
+    Input is checked with same rules as `bdecode` while it's parsed, invalid
+    data raise `BencodeDecodeError` when it's reached.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return _iterparse(_map(f))
+
+    try:
+        memoryview(source)  # type: ignore[arg-type]
+    except TypeError:
+        pass
+    else:
+        return _iterparse(source)  # type: ignore[arg-type]
+
+    if not hasattr(source, "read"):
+        # raise TypeError
+        return _iterparse(source)
+
+    fp = cast(BinaryIO, source)
+    try:
+        fp.fileno()
+    except (OSError, io.UnsupportedOperation):
+        # file-like object without a file descriptor
+        return _iterparse(fp.read())
+
+    return _iterparse(_map(fp))
+
+
+def _map(f: BinaryIO) -> mmap.mmap | bytes:
+    """Map whole content of a file, read-only."""
+    if os.fstat(f.fileno()).st_size == 0:
+        # empty file can't be mapped, decoding it raise same error as `bdecode`
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -1,17 +1,101 @@
 try:
-    from .__bencode import BencodeDecodeError, BencodeEncodeError, bdecode, bencode
+    from .__bencode import (
+        BencodeDecodeError,
+        BencodeEncodeError,
+        Decoder,
+        Encoder,
+        Raw,
+        StreamDecoder,
+        bdecode,
+        bdecode_lazy,
+        bdecode_many,
+        bdecode_path,
+        bdecode_paths,
+        bdecode_span,
+        bencode,
+        bencode_into,
+        bencode_many,
+        bencode_to,
+        bencoded_size,
+        bstats,
+        buffer_stats,
+        bvalidate,
+        configure_buffers,
+        get_max_decode_depth,
+        pack_peers,
+        set_max_decode_depth,
+        trim_buffers,
+        unpack_peers,
+    )
 
     COMPILED = True
 except ModuleNotFoundError:
-    from .__decoder import BencodeDecodeError, bdecode
-    from .__encoder import BencodeEncodeError, bencode
+    from .__decoder import (
+        BencodeDecodeError,
+        Decoder,
+        StreamDecoder,
+        bdecode,
+        bdecode_lazy,
+        bdecode_many,
+        bdecode_path,
+        bdecode_paths,
+        bdecode_span,
+        bstats,
+        bvalidate,
+        get_max_decode_depth,
+        set_max_decode_depth,
+        unpack_peers,
+    )
+    from .__encoder import (
+        BencodeEncodeError,
+        Encoder,
+        Raw,
+        bencode,
+        bencode_into,
+        bencode_many,
+        bencode_to,
+        bencoded_size,
+        buffer_stats,
+        configure_buffers,
+        pack_peers,
+        trim_buffers,
+    )
 
     COMPILED = False
 
+from .__file import bdecode_file, iterparse
+from .__torrent import HashArray, info_hash
+
 __all__ = (
     "COMPILED",
     "BencodeDecodeError",
     "BencodeEncodeError",
+    "Decoder",
+    "Encoder",
+    "HashArray",
+    "Raw",
+    "StreamDecoder",
     "bdecode",
+    "bdecode_file",
+    "bdecode_lazy",
+    "bdecode_many",
+    "bdecode_path",
+    "bdecode_paths",
+    "bdecode_span",
     "bencode",
+    "bencode_into",
+    "bencode_many",
+    "bencode_to",
+    "bencoded_size",
+    "bstats",
+    "buffer_stats",
+    "bvalidate",
+    "configure_buffers",
+    "get_max_decode_depth",
+    "info_hash",
+    "iterparse",
+    "pack_peers",
+    "set_max_decode_depth",
+    "trim_buffers",
+    "unpack_peers",
 )
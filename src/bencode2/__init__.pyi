@@ -1,6 +1,65 @@
-from .__bencode import bdecode, bencode
+from .__bencode import (
+    Decoder,
+    Encoder,
+    Raw,
+    StreamDecoder,
+    bdecode,
+    bdecode_lazy,
+    bdecode_many,
+    bdecode_path,
+    bdecode_paths,
+    bdecode_span,
+    bencode,
+    bencode_into,
+    bencode_many,
+    bencode_to,
+    bencoded_size,
+    bstats,
+    buffer_stats,
+    bvalidate,
+    configure_buffers,
+    get_max_decode_depth,
+    pack_peers,
+    set_max_decode_depth,
+    trim_buffers,
+    unpack_peers,
+)
+from .__file import bdecode_file, iterparse
+from .__torrent import HashArray, info_hash
 
-__all__ = ["COMPILED", "BencodeDecodeError", "BencodeEncodeError", "bdecode", "bencode"]
+__all__ = [
+    "COMPILED",
+    "BencodeDecodeError",
+    "BencodeEncodeError",
+    "Decoder",
+    "Encoder",
+    "HashArray",
+    "Raw",
+    "StreamDecoder",
+    "bdecode",
+    "bdecode_file",
+    "bdecode_lazy",
+    "bdecode_many",
+    "bdecode_path",
+    "bdecode_paths",
+    "bdecode_span",
+    "bencode",
+    "bencode_into",
+    "bencode_many",
+    "bencode_to",
+    "bencoded_size",
+    "bstats",
+    "buffer_stats",
+    "bvalidate",
+    "configure_buffers",
+    "get_max_decode_depth",
+    "info_hash",
+    "iterparse",
+    "pack_peers",
+    "set_max_decode_depth",
+    "trim_buffers",
+    "unpack_peers",
+]
 
 class BencodeDecodeError(ValueError): ...
 class BencodeEncodeError(ValueError): ...
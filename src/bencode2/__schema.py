@@ -0,0 +1,161 @@
+"""Compile type annotations into decode plans for `bdecode(..., type=...)`.
+
+A plan is a tuple starting with one of the `KIND_*` constants:
+
+- `(KIND_ANY,)`, `(KIND_INT,)`, `(KIND_BOOL,)`, `(KIND_BYTES,)`, `(KIND_STR,)`
+- `(KIND_LIST, item_plan)`
+- `(KIND_DICT, str_keys, value_plan)`
+- `(KIND_DATACLASS, cls_ref, fields)`, `cls_ref` is a weakref to the dataclass,
+  `fields` is a list of `(key, name, plan, required)` sorted by `key`.
+
+Plans are shared by the compiled decoder and the pure python fallback,
+the compiled one use same kind values.
+
+Plans of types without dataclass are cached forever. Plans with dataclasses don't
+keep them alive, they are removed from cache when any of the dataclasses is
+garbage collected.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import types
+import typing
+import weakref
+from typing import Any, Final, Union
+
+KIND_ANY: Final = 0
+KIND_INT: Final = 1
+KIND_BOOL: Final = 2
+KIND_BYTES: Final = 3
+KIND_STR: Final = 4
+KIND_LIST: Final = 5
+KIND_DICT: Final = 6
+KIND_DATACLASS: Final = 7
+
+_plans: dict[Any, tuple[Any, ...]] = {}
+
+# plans with dataclasses, keyed by `_weak_key`. value is the plan and weakrefs to its
+# dataclasses, with callback to remove the plan.
+_dataclass_plans: dict[Any, tuple[tuple[Any, ...], list[weakref.ref[type]]]] = {}
+
+
+def compile_plan(tp: Any) -> tuple[Any, ...]:
+    """Get decode plan of a type, plans are compiled once and cached."""
+    plan = _plans.get(tp)
+    if plan is not None:
+        return plan
+
+    key = _weak_key(tp)
+    cached = _dataclass_plans.get(key)
+    if cached is not None:
+        return cached[0]
+
+    dataclasses_seen: dict[type, tuple[Any, ...]] = {}
+    plan = _compile(tp, dataclasses_seen)
+    if not dataclasses_seen:
+        return _plans.setdefault(tp, plan)
+
+    refs = [weakref.ref(cls, _drop_plans) for cls in dataclasses_seen]
+    return _dataclass_plans.setdefault(key, (plan, refs))[0]
+
+
+# types that are never dataclass, skip `dataclasses.is_dataclass` in `_weak_key`
+_simple_types: Final = frozenset(
+    {Any, object, bool, int, bytes, str, list, dict, type(None)}
+)
+
+
+def _weak_key(tp: Any) -> Any:
+    """Cache key of a type, with dataclasses replaced by weakref to them."""
+    if tp in _simple_types:
+        return tp
+    if isinstance(tp, type):
+        return weakref.ref(tp) if dataclasses.is_dataclass(tp) else tp
+
+    # faster than `typing.get_origin` and `typing.get_args`
+    if isinstance(tp, types.UnionType):
+        return (types.UnionType, *map(_weak_key, tp.__args__))
+    args = getattr(tp, "__args__", None)
+    if not args:
+        return tp
+    return (getattr(tp, "__origin__", None), *map(_weak_key, args))
+
+
+def _drop_plans(ref: weakref.ref[type]) -> None:
+    # a dataclass is garbage collected, remove plans using it
+    for key in [k for k, (_, refs) in _dataclass_plans.items() if ref in refs]:
+        del _dataclass_plans[key]
+
+
+def _compile(tp: Any, dataclasses_seen: dict[type, tuple[Any, ...]]) -> tuple[Any, ...]:
+    if tp is Any or tp is object:
+        return (KIND_ANY,)
+    if tp is bool:
+        return (KIND_BOOL,)
+    if tp is int:
+        return (KIND_INT,)
+    if tp is bytes:
+        return (KIND_BYTES,)
+    if tp is str:
+        return (KIND_STR,)
+    if tp is list:
+        return (KIND_LIST, (KIND_ANY,))
+    if tp is dict:
+        return (KIND_DICT, False, (KIND_ANY,))
+
+    if isinstance(tp, type) and dataclasses.is_dataclass(tp):
+        return _compile_dataclass(tp, dataclasses_seen)
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+
+    if origin is list:
+        return (KIND_LIST, _compile(args[0], dataclasses_seen))
+
+    if origin is dict:
+        if args[0] not in (bytes, str):
+            raise TypeError(f"dict keys must be bytes or str, not {args[0]!r}")
+        return (KIND_DICT, args[0] is str, _compile(args[1], dataclasses_seen))
+
+    # Optional[T], value may be missing but can't be None
+    if origin is Union or origin is types.UnionType:
+        non_none = [a for a in args if a is not type(None)]
+        if len(non_none) == 1:
+            return _compile(non_none[0], dataclasses_seen)
+
+    raise TypeError(f"unsupported type {tp!r}")
+
+
+def _compile_dataclass(
+    cls: type, dataclasses_seen: dict[type, tuple[Any, ...]]
+) -> tuple[Any, ...]:
+    if cls in dataclasses_seen:
+        return dataclasses_seen[cls]
+
+    fields: list[tuple[bytes, str, tuple[Any, ...], bool]] = []
+    plan = (KIND_DATACLASS, weakref.ref(cls), fields)
+
+    # register before compiling fields, for recursive dataclasses
+    dataclasses_seen[cls] = plan
+
+    hints = typing.get_type_hints(cls)
+    for f in dataclasses.fields(cls):
+        if not f.init:
+            continue
+        required = (
+            f.default is dataclasses.MISSING
+            and f.default_factory is dataclasses.MISSING
+        )
+        fields.append(
+            (
+                f.name.encode(),
+                f.name,
+                _compile(hints[f.name], dataclasses_seen),
+                required,
+            )
+        )
+
+    fields.sort(key=lambda x: x[0])
+
+    return plan
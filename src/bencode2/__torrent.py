@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import operator
+from collections.abc import Iterator, Sequence
+from typing import overload
+
+from typing_extensions import Buffer
+
+from . import BencodeDecodeError
+
+try:
+    from .__bencode import LazyDict, bdecode_lazy
+except ModuleNotFoundError:
+    from .__decoder import LazyDict, bdecode_lazy  # type: ignore[assignment]
+
+
+def info_hash(value: Buffer, /, algorithm: str = "sha1") -> bytes:
+    """Compute info-hash of a torrent file content.
+
+    The raw bytes of top-level `info` dictionary are hashed directly,
+    without decoding and re-encoding it.
+    Use `sha1` for BitTorrent v1 and `sha256` for v2.
+    """
+    view = memoryview(value).cast("B")
+    torrent = bdecode_lazy(view)
+    if not isinstance(torrent, LazyDict):
+        raise BencodeDecodeError("torrent must be a dict")
+    if b"info" not in torrent:
+        raise BencodeDecodeError("torrent has no 'info' key")
+    start, end = torrent.span(b"info")
+    return hashlib.new(algorithm, view[start:end]).digest()
+
+
+# hashes compared at once by `HashArray.mismatches`
+_COMPARE_BLOCK = 1024
+
+
+class HashArray(Sequence[memoryview]):
+    """Fixed-width hashes packed in one buffer, like `pieces` of a torrent.
+
+    Items are read-only memoryview of the buffer, hashes are never copied into
+    their own bytes objects. Use width 32 for v2 `piece layers`.
+    """
+
+    __slots__ = ("_offset", "_search", "_view", "width")
+
+    def __init__(self, data: Buffer, /, width: int = 20) -> None:
+        if width <= 0:
+            raise ValueError("width must be positive")
+
+        view = memoryview(data).cast("B").toreadonly()
+        if len(view) % width:
+            raise ValueError(f"length {len(view)} is not a multiple of width {width}")
+
+        self._view = view
+        self.width = width
+        # bytes with same content as `_view` at `_offset`, for `find`
+        self._search = data if isinstance(data, bytes) else None
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return len(self._view) // self.width
+
+    @overload
+    def __getitem__(self, index: int, /) -> memoryview: ...
+    @overload
+    def __getitem__(self, index: slice, /) -> HashArray: ...
+    def __getitem__(self, index: int | slice, /) -> memoryview | HashArray:
+        w = self.width
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return HashArray(
+                    b"".join(
+                        self._view[i * w : (i + 1) * w]
+                        for i in range(start, stop, step)
+                    ),
+                    w,
+                )
+
+            sub = HashArray(self._view[start * w : max(start, stop) * w], w)
+            sub._search = self._search
+            sub._offset = self._offset + start * w
+            return sub
+
+        i = operator.index(index)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("hash index out of range")
+        return self._view[i * w : (i + 1) * w]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        w = self.width
+        view = self._view
+        for i in range(0, len(view), w):
+            yield view[i : i + w]
+
+    def __contains__(self, value: object) -> bool:
+        try:
+            return self._find(value, 0, len(self)) != -1  # type: ignore[arg-type]
+        except TypeError:
+            return False
+
+    def index(self, value: Buffer, start: int = 0, stop: int | None = None) -> int:
+        """Return index of first hash equal to `value`.
+
+        Raise `ValueError` if the hash is not present.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        i = self._find(value, start, stop)
+        if i == -1:
+            raise ValueError("hash is not in HashArray")
+        return i
+
+    def count(self, value: Buffer) -> int:
+        n = 0
+        i = self._find(value, 0, len(self))
+        while i != -1:
+            n += 1
+            i = self._find(value, i + 1, len(self))
+        return n
+
+    def _find(self, value: Buffer, start: int, stop: int) -> int:
+        w = self.width
+        with memoryview(value) as m:
+            if m.nbytes != w:
+                return -1
+            sub = m.tobytes()
+
+        if self._search is None:
+            self._search = self._view.tobytes()
+        data = self._search
+        base = self._offset
+        end = base + stop * w
+
+        i = data.find(sub, base + start * w, end)
+        while i != -1:
+            if (i - base) % w == 0:
+                return (i - base) // w
+            i = data.find(sub, i + 1, end)
+        return -1
+
+    def mismatches(self, other: HashArray | Buffer, /) -> list[int]:
+        """Return indexes of hashes that differ from `other`.
+
+        `other` must have the same number of hashes, hashes are compared in blocks
+        so equal ranges are skipped without looking at every hash.
+        """
+        if not isinstance(other, HashArray):
+            other = HashArray(other, self.width)
+        if other.width != self.width or len(other) != len(self):
+            raise ValueError("can't compare HashArray of different shape")
+
+        w = self.width
+        a = self._view
+        b = other._view
+        block = _COMPARE_BLOCK * w
+
+        result = []
+        for start in range(0, len(a), block):
+            end = start + block
+            if a[start:end].tobytes() == b[start:end].tobytes():
+                continue
+            for i in range(start, min(end, len(a)), w):
+                if a[i : i + w] != b[i : i + w]:
+                    result.append(i // w)
+        return result
+
+    def tobytes(self) -> bytes:
+        return self._view.tobytes()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HashArray):
+            return NotImplemented
+        return self.width == other.width and self.tobytes() == other.tobytes()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"<HashArray {len(self)} hashes of {self.width} bytes>"
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from typing import Any
+
+from . import BencodeDecodeError, bdecode, bencode, get_max_decode_depth
+
+_containers = (b"l", b"d")
+
+
+async def read_value(
+    reader: asyncio.StreamReader, /, *, max_size: int | None = None
+) -> Any:
+    """Read and decode exactly one bencode value from `reader`.
+
+    Only bytes of this value are read, data after it is left in `reader` for next
+    call. The value is checked by `bdecode` once it's complete, a value larger than
+    `max_size` raise `BencodeDecodeError` before its content is read.
+
+    Raise `asyncio.IncompleteReadError` if stream ends before the value is complete.
+    """
+    max_depth = get_max_decode_depth()
+    buf = bytearray()
+    depth = 0
+
+    while True:
+        c = await reader.readexactly(1)
+        buf += c
+
+        if c in _containers:
+            depth += 1
+            if depth > max_depth:
+                raise BencodeDecodeError("exceeded maximum decode depth")
+            continue
+
+        if c == b"e" and depth:
+            depth -= 1
+        elif c == b"i":
+            buf += await _read_token(reader, b"e", len(buf), max_size)
+        elif c.isdigit():
+            head = await _read_token(reader, b":", len(buf), max_size)
+            buf += head
+            digits = c + head[:-1]
+            if not digits.isdigit():
+                raise BencodeDecodeError(
+                    f"invalid bytes length {bytes(digits)!r}, index {len(buf) - len(head) - 1}"
+                )
+            if len(digits) > len(str(sys.maxsize)) or int(digits) > sys.maxsize:
+                raise BencodeDecodeError(
+                    f"bytes length overflow, index {len(buf) - len(head) - 1}"
+                )
+            length = int(digits)
+            if max_size is not None and len(buf) + length > max_size:
+                raise BencodeDecodeError(f"value is larger than max_size {max_size}")
+            buf += await reader.readexactly(length)
+        else:
+            raise BencodeDecodeError(
+                f"unexpected char {c!r} when reading value, index {len(buf) - 1}"
+            )
+
+        if max_size is not None and len(buf) > max_size:
+            raise BencodeDecodeError(f"value is larger than max_size {max_size}")
+
+        if depth == 0:
+            return bdecode(buf)
+
+
+async def _read_token(
+    reader: asyncio.StreamReader, sep: bytes, size: int, max_size: int | None
+) -> bytes:
+    """Read int or length prefix until `sep`, `size` bytes of value are already read."""
+    if max_size is not None and size + len(sep) > max_size:
+        raise BencodeDecodeError(f"value is larger than max_size {max_size}")
+
+    try:
+        token = await reader.readuntil(sep)
+    except asyncio.LimitOverrunError:
+        raise BencodeDecodeError(
+            f"token is longer than limit of reader, index {size}"
+        ) from None
+
+    if max_size is not None and size + len(token) > max_size:
+        raise BencodeDecodeError(f"value is larger than max_size {max_size}")
+    return token
+
+
+async def write_value(writer: asyncio.StreamWriter, value: Any, /) -> None:
+    """Encode `value` and write it to `writer`, wait until writer can accept more data."""
+    writer.write(bencode(value))
+    await writer.drain()
@@ -1,7 +1,13 @@
 #include <nanobind/nanobind.h>
+#include <nanobind/stl/optional.h>
 namespace nb = nanobind;
 
+#include "coder.hpp"
 #include "common.hpp"
+#include "iterparse.hpp"
+#include "lazy.hpp"
+#include "raw.hpp"
+#include "stream.hpp"
 
 // dataclasses.fields
 nb::object dataclasses_fields;
@@ -9,8 +15,46 @@ nb::object dataclasses_fields;
 // dataclasses.is_dataclass
 nb::object is_dataclasses;
 
+// BencodeDecodeError and BencodeEncodeError
+nb::object decode_error_type;
+nb::object encode_error_type;
+
+// bencode2.Raw
+PyTypeObject *raw_type;
+
 extern nb::bytes bencode(nb::object v);
-extern nb::object bdecode(nb::object b);
+extern size_t bencoded_size(nb::object v);
+// bencode2.__schema.compile_plan
+extern nb::object compile_plan;
+
+extern nb::object bdecode(nb::object b, bool zero_copy, nb::handle type, int threads);
+extern nb::object bdecode_lazy(nb::object b);
+extern nb::list bdecode_many(nb::iterable values);
+extern nb::list bencode_many(nb::iterable values);
+extern size_t bencode_into(nb::object v, nb::handle buffer, Py_ssize_t offset);
+extern size_t bencode_to(nb::object v, nb::object fp, Py_ssize_t chunk_size);
+extern nb::tuple bdecode_span(nb::object b, nb::bytes key);
+extern nb::object bdecode_path(nb::object b, nb::object path);
+extern nb::list bdecode_paths(nb::object b, nb::iterable paths);
+extern nb::object iterparse(nb::handle b);
+extern void bvalidate(nb::handle b);
+extern nb::dict bstats(nb::handle b);
+extern Py_ssize_t get_max_decode_depth();
+extern void set_max_decode_depth(Py_ssize_t depth);
+extern nb::dict configure_buffers(std::optional<Py_ssize_t> pool_size,
+                                  std::optional<Py_ssize_t> max_buffer_size);
+extern void trim_buffers();
+extern nb::dict buffer_stats();
+extern nb::bytes pack_peers(nb::iterable peers);
+extern nb::list unpack_peers(nb::handle b, bool ipv6);
+
+// copy mixin methods from abc class, and register cls as virtual subclass of it.
+static void abcMixin(nb::handle cls, nb::handle abc, std::initializer_list<const char *> names) {
+    for (auto name : names) {
+        nb::setattr(cls, name, abc.attr("__dict__")[name]);
+    }
+    abc.attr("register")(cls);
+}
 
 NB_MODULE(__bencode, m) {
     auto mod = m.import_("dataclasses");
@@ -19,8 +63,108 @@ NB_MODULE(__bencode, m) {
     is_dataclasses = mod.attr("is_dataclass");
     is_dataclasses.inc_ref();
 
-    nb::exception<EncodeError>(m, "BencodeEncodeError", PyExc_ValueError);
-    nb::exception<DecodeError>(m, "BencodeDecodeError", PyExc_ValueError);
+    compile_plan = m.import_("bencode2.__schema").attr("compile_plan");
+    compile_plan.inc_ref();
+
+    encode_error_type = nb::exception<EncodeError>(m, "BencodeEncodeError", PyExc_ValueError);
+    encode_error_type.inc_ref();
+    decode_error_type = nb::exception<DecodeError>(m, "BencodeDecodeError", PyExc_ValueError);
+    decode_error_type.inc_ref();
     m.def("bencode", bencode);
-    m.def("bdecode", bdecode);
+    m.def("bencoded_size", bencoded_size);
+    m.def("bdecode", bdecode, nb::arg(), nb::kw_only(), nb::arg("zero_copy") = false,
+          nb::arg("type") = nb::none(), nb::arg("threads") = 1);
+
+    nb::class_<StreamDecoder>(m, "StreamDecoder")
+        .def(nb::init<>())
+        .def("feed", &StreamDecoder::feed, nb::lock_self())
+        .def("close", &StreamDecoder::close, nb::lock_self());
+
+    nb::class_<Decoder>(m, "Decoder", nb::is_final())
+        .def(nb::init<Limit, Limit, Limit, Limit>(), nb::kw_only(),
+             nb::arg("max_depth") = nb::none(), nb::arg("max_size") = nb::none(),
+             nb::arg("max_string") = nb::none(), nb::arg("max_items") = nb::none())
+        .def_ro("max_depth", &Decoder::maxDepth)
+        .def_ro("max_size", &Decoder::maxSize)
+        .def_ro("max_string", &Decoder::maxString)
+        .def_ro("max_items", &Decoder::maxItems)
+        .def("decode", &Decoder::decode, nb::arg())
+        .def("__repr__", &Decoder::repr);
+
+    nb::class_<Encoder>(m, "Encoder", nb::is_final())
+        .def(nb::init<Limit, Limit>(), nb::kw_only(), nb::arg("max_depth") = nb::none(),
+             nb::arg("max_size") = nb::none())
+        .def_ro("max_depth", &Encoder::maxDepth)
+        .def_ro("max_size", &Encoder::maxSize)
+        .def("encode", &Encoder::encode, nb::arg())
+        .def("__repr__", &Encoder::repr);
+
+    auto raw = nb::class_<Raw>(m, "Raw", nb::is_final())
+                   .def(nb::init<nb::handle>(), nb::arg())
+                   .def_ro("value", &Raw::value)
+                   .def("__eq__",
+                        [](Raw &self, nb::handle other) -> nb::object {
+                            if (!nb::isinstance<Raw>(other)) {
+                                return nb::borrow(Py_NotImplemented);
+                            }
+                            return nb::bool_(self.value.equal(nb::cast<Raw &>(other).value));
+                        })
+                   .def("__hash__", [](Raw &self) { return nb::hash(self.value); })
+                   .def("__repr__",
+                        [](Raw &self) { return nb::str("Raw({})").format(nb::repr(self.value)); });
+    raw_type = (PyTypeObject *)raw.ptr();
+
+    nb::class_<IterParser>(m, "IterParser")
+        .def("__iter__", [](nb::handle self) { return self; })
+        .def("__next__", &IterParser::next, nb::lock_self());
+
+    m.def("iterparse", iterparse);
+
+    m.def("bdecode_lazy", bdecode_lazy);
+    m.def("bdecode_span", bdecode_span);
+    m.def("bdecode_many", bdecode_many);
+    m.def("bdecode_path", bdecode_path);
+    m.def("bdecode_paths", bdecode_paths);
+    m.def("bvalidate", bvalidate);
+    m.def("bstats", bstats);
+    m.def("bencode_many", bencode_many);
+    m.def("get_max_decode_depth", get_max_decode_depth);
+    m.def("set_max_decode_depth", set_max_decode_depth, nb::arg());
+    m.def("bencode_into", bencode_into, nb::arg(), nb::arg(), nb::arg("offset") = 0);
+    m.def("bencode_to", bencode_to, nb::arg(), nb::arg(), nb::arg("chunk_size") = 64 * 1024);
+    m.def("configure_buffers", configure_buffers, nb::kw_only(), nb::arg("pool_size") = nb::none(),
+          nb::arg("max_buffer_size") = nb::none());
+    m.def("trim_buffers", trim_buffers);
+    m.def("buffer_stats", buffer_stats);
+    m.def("pack_peers", pack_peers, nb::arg());
+    m.def("unpack_peers", unpack_peers, nb::arg(), nb::kw_only(), nb::arg("ipv6") = false);
+
+    auto abc = m.import_("collections.abc");
+
+    auto lazyList =
+        nb::class_<LazyList>(m, "LazyList")
+            .def("__len__", &LazyList::size)
+            .def("__getitem__", &LazyList::getItem, nb::lock_self())
+            .def("__getitem__", &LazyList::getSlice, nb::lock_self())
+            .def(
+                "__eq__",
+                [](LazyList &self, nb::handle other) -> nb::object {
+                    if (!nb::isinstance<LazyList>(other) && !PyList_Check(other.ptr())) {
+                        return nb::borrow(Py_NotImplemented);
+                    }
+                    return nb::bool_(self.equal(other));
+                },
+                nb::lock_self());
+    abcMixin(lazyList, abc.attr("Sequence"),
+             {"__iter__", "__contains__", "__reversed__", "index", "count"});
+    nb::setattr(lazyList, "__hash__", nb::none());
+
+    auto lazyDict = nb::class_<LazyDict>(m, "LazyDict")
+                        .def("__len__", &LazyDict::size)
+                        .def("__getitem__", &LazyDict::getItem, nb::lock_self())
+                        .def("__contains__", &LazyDict::contains)
+                        .def("__iter__", &LazyDict::iter)
+                        .def("span", &LazyDict::span);
+    abcMixin(lazyDict, abc.attr("Mapping"), {"get", "keys", "items", "values", "__eq__"});
+    nb::setattr(lazyDict, "__hash__", nb::none());
 }
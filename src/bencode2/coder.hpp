@@ -0,0 +1,53 @@
+#pragma once
+
+#include <optional>
+#include <string>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+
+namespace nb = nanobind;
+
+// limit passed from python, `std::nullopt` for no limit.
+using Limit = std::optional<Py_ssize_t>;
+
+// decoder with its own resource limits, they are checked once and kept between `decode` calls.
+class Decoder {
+public:
+    Decoder(Limit maxDepth, Limit maxSize, Limit maxString, Limit maxItems);
+
+    nb::object decode(nb::handle b) const;
+
+    nb::str repr() const;
+
+    Limit maxDepth;
+    Limit maxSize;
+    Limit maxString;
+    Limit maxItems;
+
+private:
+    DecodeLimits limits;
+    // any of depth, string or item limit is set, `limits` is checked while decoding.
+    bool checked = false;
+};
+
+// encoder with its own resource limits.
+class Encoder {
+public:
+    Encoder(Limit maxDepth, Limit maxSize);
+
+    nb::bytes encode(nb::handle v) const;
+
+    nb::str repr() const;
+
+    Limit maxDepth;
+    Limit maxSize;
+};
+
+// validate a limit argument, it must be positive.
+Limit checkLimit(const char *name, Limit value);
+
+// limit in `__repr__`
+std::string limitRepr(Limit value);
@@ -8,24 +8,15 @@
 #include <fmt/core.h>
 #include <nanobind/nanobind.h>
 
+#include "coder.hpp"
 #include "common.hpp"
+#include "decode.hpp"
 #include "overflow.hpp"
 
-namespace nb = nanobind;
+std::atomic<Py_ssize_t> maxDecodeDepth = BENCODE_DEFAULT_MAX_DECODE_DEPTH;
 
-#define BENCODE_MAX_DECODE_DEPTH 4096
-
-nb::object decodeAny(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth);
-
-#define decoderError(f, ...) throw DecodeError(fmt::format(f, ##__VA_ARGS__))
-
-static inline void checkDepth(uint_fast32_t depth) {
-    if (depth > BENCODE_MAX_DECODE_DEPTH) {
-        throw DecodeError("exceeded maximum decode depth");
-    }
-}
-
-nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
+// validate int at index, return index of ending 'e'.
+static Py_ssize_t checkInt(const char *buf, Py_ssize_t index, Py_ssize_t size) {
     Py_ssize_t index_e = 0;
     for (Py_ssize_t i = index + 1; i < size; i++) {
         if (buf[i] == 'e') {
@@ -43,8 +34,6 @@ nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
         decoderError("invalid int, found 'ie': {}", index_e);
     }
 
-    int64_t sign = 1;
-
     // i1234e
     // i-1234e
     //  ^ index
@@ -59,7 +48,6 @@ nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
         if (buf[num_start] == '0') {
             decoderError("invalid int, '-0' found at {}", index);
         }
-        sign = -1;
     } else if (buf[index] == '0') {
         if (index + 1 != index_e) {
             decoderError("invalid int, non-zero int should not start with '0'. found at {}", index);
@@ -73,6 +61,25 @@ nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
         }
     }
 
+    return index_e;
+}
+
+nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
+    Py_ssize_t index_e = checkInt(buf, index, size);
+
+    int64_t sign = 1;
+
+    // i1234e
+    // i-1234e
+    //  ^ index
+    index = index + 1;
+    Py_ssize_t num_start = index;
+
+    if (buf[index] == '-') {
+        num_start = 1 + index;
+        sign = -1;
+    }
+
     // fast path without overflow check for small length string
     if ((index_e - index) < 19) {
         int64_t val = 0;
@@ -130,7 +137,7 @@ __OverFlow:;
 }
 
 // there is no bytes/Str in bencode, they only have 1 type for both of them.
-static std::string_view decodeAsView(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
+std::string_view decodeAsView(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
     Py_ssize_t index_sep = -1;
     for (Py_ssize_t i = index; i < size; i++) {
         if (buf[i] == ':') {
@@ -168,139 +175,506 @@ static std::string_view decodeAsView(const char *buf, Py_ssize_t &index, Py_ssiz
 }
 
 // there is no bytes/Str in bencode, they only have 1 type for both of them.
-static nb::bytes decodeBytes(const char *buf, Py_ssize_t &index, Py_ssize_t size) {
-    auto s = decodeAsView(buf, index, size);
+nb::object decodeBytes(const DecodeContext &ctx, Py_ssize_t &index) {
+    return bytesValue(ctx, decodeAsView(ctx.buf, index, ctx.size));
+}
+
+nb::object bytesValue(const DecodeContext &ctx, std::string_view s) {
+    if (ctx.view.is_valid()) {
+        Py_ssize_t start = s.data() - ctx.buf;
+        PyObject *o = PySequence_GetSlice(ctx.view.ptr(), start, start + s.length());
+        if (o == NULL) {
+            throw nb::python_error();
+        }
+        return nb::steal(o);
+    }
+    if (ctx.intern != nullptr) {
+        return ctx.intern->values.get(s);
+    }
     return nb::bytes(s.data(), s.length());
 }
 
-nb::object decodeList(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth) {
-    index = index + 1;
+// count a value or dict key at index for `DecodeLimits::maxItems`.
+static inline void countItem(const DecodeLimits *limits, Py_ssize_t &items, Py_ssize_t index) {
+    if (limits != nullptr && ++items > limits->maxItems) {
+        decoderError("exceeded max_items {}, index {}", limits->maxItems, index);
+    }
+}
 
-    nb::list l = nb::list();
+static inline void checkString(const DecodeContext &ctx, std::string_view s) {
+    if (ctx.limits != nullptr && (Py_ssize_t)s.size() > ctx.limits->maxString) {
+        decoderError("string length {} exceeds max_string {}, index {}", s.size(),
+                     ctx.limits->maxString, s.data() - ctx.buf);
+    }
+}
+
+namespace {
+// a list or dict being decoded by `decodeAny`.
+struct Frame {
+    nb::object container;
+    bool isDict;
+    // dict only, key of the value being decoded and where the value start.
+    std::string_view key = {};
+    Py_ssize_t valueStart = 0;
+    std::optional<std::string_view> lastKey = std::nullopt;
+};
+
+// a list or dict being validated by `skipAny`.
+struct SkipFrame {
+    bool isDict;
+    std::string_view key = {};
+    std::optional<std::string_view> lastKey = std::nullopt;
+};
+} // namespace
+
+// containers are kept in an explicit stack instead of recursion,
+// so nesting depth is not limited by size of C stack.
+nb::object decodeAny(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth) {
+    const char *buf = ctx.buf;
+    Py_ssize_t size = ctx.size;
+
+    gch::small_vector<Frame, 16> stack;
+    // values and dict keys decoded so far, only counted with limits.
+    Py_ssize_t items = 0;
 
     while (1) {
-        if (index >= size) {
-            decoderError("buffer overflow when decoding list, index {}", index);
+        checkDepth(depth + stack.size() + 1, ctx.limits);
+        countItem(ctx.limits, items, index);
+
+        nb::object value;
+        char c = buf[index];
+
+        if (c == 'i') {
+            value = decodeInt(buf, index, size);
+        } else if (c >= '0' && c <= '9') {
+            auto s = decodeAsView(buf, index, size);
+            checkString(ctx, s);
+            value = bytesValue(ctx, s);
+        } else if (c == 'l' || c == 'd') {
+            if (c == 'l') {
+                stack.push_back(Frame{nb::list(), false});
+            } else {
+                stack.push_back(Frame{nb::dict(), true});
+            }
+            index = index + 1;
+        } else {
+            decoderError("invalid bencode prefix '{:c}', index {}", c, index);
         }
 
-        if (buf[index] == 'e') {
-            break;
-        }
+        // add finished value to its container and close containers ending here,
+        // until index is at the start of next value.
+        while (1) {
+            if (value.is_valid()) {
+                if (stack.empty()) {
+                    return value;
+                }
+
+                Frame &top = stack.back();
+                if (!top.isDict) {
+                    if (PyList_Append(top.container.ptr(), value.ptr()) != 0) {
+                        throw nb::python_error();
+                    }
+                } else {
+                    if (depth + stack.size() == 1 && ctx.span != nullptr &&
+                        top.key == ctx.span->key) {
+                        ctx.span->start = top.valueStart;
+                        ctx.span->end = index;
+                    }
+
+                    checkKeyOrder(top.lastKey, top.key, index);
+
+                    nb::object key = ctx.intern != nullptr
+                                         ? ctx.intern->keys.get(top.key)
+                                         : nb::bytes(top.key.data(), top.key.size());
+                    if (PyDict_SetItem(top.container.ptr(), key.ptr(), value.ptr()) != 0) {
+                        throw nb::python_error();
+                    }
+                }
+            }
 
-        nb::object obj = decodeAny(buf, index, size, depth);
+            Frame &top = stack.back();
 
-        l.append(obj);
-    }
+            if (index >= size) {
+                decoderError("buffer overflow when decoding {}, index {}",
+                             top.isDict ? "dict" : "list", index);
+            }
 
-    index = index + 1;
+            if (buf[index] == 'e') {
+                index = index + 1;
+                value = std::move(top.container);
+                stack.pop_back();
+                continue;
+            }
 
-    return l;
-}
+            if (top.isDict) {
+                if (buf[index] < '0' || buf[index] > '9') {
+                    decoderError(
+                        "expecting bytes when parsing dict key, found {} instead, index {}",
+                        buf[index], index);
+                }
+
+                countItem(ctx.limits, items, index);
+                top.key = decodeAsView(buf, index, size);
+                checkString(ctx, top.key);
+                if (index >= size) {
+                    decoderError("buffer overflow when decoding dict, index {}", index);
+                }
+                top.valueStart = index;
+            }
 
-nb::object decodeDict(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth) {
-    index = index + 1;
-    std::optional<std::string_view> lastKey = std::nullopt;
+            break;
+        }
+    }
+}
 
-    auto d = nb::dict();
+void skipAny(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth,
+             DecodeStats *stats) {
+    gch::small_vector<SkipFrame, 16> stack;
 
     while (1) {
-        if (index >= size) {
-            decoderError("buffer overflow when decoding dict, index {}", index);
-        }
+        checkDepth(depth + stack.size() + 1);
 
-        if (buf[index] == 'e') {
-            break;
+        bool finished = true;
+        char c = buf[index];
+
+        if (c == 'i') {
+            index = checkInt(buf, index, size) + 1;
+        } else if (c >= '0' && c <= '9') {
+            auto s = decodeAsView(buf, index, size);
+            if (stats != nullptr) {
+                stats->addString(s);
+            }
+        } else if (c == 'l' || c == 'd') {
+            stack.push_back(SkipFrame{c == 'd'});
+            index = index + 1;
+            finished = false;
+        } else {
+            decoderError("invalid bencode prefix '{:c}', index {}", c, index);
         }
 
-        if (buf[index] < '0' || buf[index] > '9') {
-            decoderError("expecting bytes when parsing dict key, found {} instead, index {}",
-                         buf[index], index);
+        if (stats != nullptr) {
+            stats->ints += c == 'i';
+            stats->lists += c == 'l';
+            stats->dicts += c == 'd';
+            stats->maxDepth =
+                std::max(stats->maxDepth, (Py_ssize_t)(depth + stack.size()) + (finished ? 1 : 0));
         }
 
-        auto key = decodeAsView(buf, index, size);
-        auto obj = decodeAny(buf, index, size, depth);
+        while (1) {
+            if (finished) {
+                if (stack.empty()) {
+                    return;
+                }
 
-        // skip first key
-        if (lastKey.has_value()) {
-            if (key < lastKey.value()) {
-                decoderError("invalid dict, key not sorted. index {}", index);
+                SkipFrame &top = stack.back();
+                if (top.isDict) {
+                    checkKeyOrder(top.lastKey, top.key, index);
+                }
             }
-            if (key == lastKey.value()) {
-                decoderError("invalid dict, find duplicated keys {}. index {}", key, index);
+
+            SkipFrame &top = stack.back();
+
+            if (index >= size) {
+                decoderError("buffer overflow when decoding {}, index {}",
+                             top.isDict ? "dict" : "list", index);
+            }
+
+            if (buf[index] == 'e') {
+                index = index + 1;
+                stack.pop_back();
+                finished = true;
+                continue;
+            }
+
+            if (top.isDict) {
+                if (buf[index] < '0' || buf[index] > '9') {
+                    decoderError(
+                        "expecting bytes when parsing dict key, found {} instead, index {}",
+                        buf[index], index);
+                }
+
+                top.key = decodeAsView(buf, index, size);
+                if (index >= size) {
+                    decoderError("buffer overflow when decoding dict, index {}", index);
+                }
+                if (stats != nullptr) {
+                    stats->addString(top.key);
+                }
             }
+
+            break;
         }
-        lastKey = std::make_optional(key);
+    }
+}
+
+Py_ssize_t get_max_decode_depth() { return maxDecodeDepth.load(std::memory_order_relaxed); }
 
-        d[nb::bytes(key.data(), key.length())] = obj;
+void set_max_decode_depth(Py_ssize_t depth) {
+    if (depth <= 0) {
+        throw nb::value_error("max decode depth must be positive");
     }
+    maxDecodeDepth.store(depth, std::memory_order_relaxed);
+}
 
-    index = index + 1;
+nb::object decodeBuffer(const DecodeContext &ctx, nb::handle plan) {
+    if (ctx.size == 0) {
+        throw DecodeError("can't decode empty bytes");
+    }
 
-    return d;
+    if (ctx.threads > 1 && !plan.is_valid() && ctx.span == nullptr && ctx.limits == nullptr &&
+        !ctx.view.is_valid() && ctx.size >= BENCODE_PARALLEL_MIN_SIZE) {
+        auto o = decodeParallel(ctx);
+        if (o.is_valid()) {
+            return o;
+        }
+    }
+
+    if (!plan.is_valid() && ctx.span == nullptr && ctx.limits == nullptr &&
+        ctx.size >= BENCODE_TAPE_MIN_SIZE) {
+        auto o = decodeTape(ctx);
+        if (o.is_valid()) {
+            return o;
+        }
+    }
+
+    Py_ssize_t index = 0;
+
+    auto o = plan.is_valid() ? decodeTyped(ctx, index, 0, plan) : decodeAny(ctx, index, 0);
+
+    if (index != ctx.size) {
+        decoderError("invalid bencode data, parse end at index {} but total bytes length {}", index,
+                     ctx.size);
+    }
+
+    return o;
 }
 
-nb::object decodeAny(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth) {
-    depth++;
-    checkDepth(depth);
+nb::object decodeBuffer(const char *buf, Py_ssize_t size) {
+    InternCache intern;
+    return decodeBuffer(DecodeContext{buf, size, nb::object(), nullptr, &intern});
+}
 
-    // int
-    if (buf[index] == 'i') {
-        return decodeInt(buf, index, size);
+nb::tuple bdecode_span(nb::object b, nb::bytes key) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "bencode.bdecode_span should be called with bytes/memoryview/bytearray/Buffer");
     }
 
-    // bytes
-    if (buf[index] >= '0' && buf[index] <= '9') {
-        return decodeBytes(buf, index, size);
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
     }
 
-    // list
-    if (buf[index] == 'l') {
-        return decodeList(buf, index, size, depth);
+    Span span{std::string_view(key.c_str(), key.size())};
+    InternCache intern;
+    DecodeContext ctx{(const char *)view.buf, view.len, nb::object(), &span, &intern};
+
+    nb::object o;
+    try {
+        o = decodeBuffer(ctx);
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
     }
 
-    // dict
-    if (buf[index] == 'd') {
-        return decodeDict(buf, index, size, depth);
+    PyBuffer_Release(&view);
+
+    if (span.start == -1) {
+        return nb::make_tuple(o, nb::none());
     }
 
-    decoderError("invalid bencode prefix '{:c}', index {}", buf[index], index);
+    return nb::make_tuple(o, nb::make_tuple(span.start, span.end));
 }
 
-nb::object bdecode(nb::object b) {
+extern nb::object compile_plan;
+
+nb::object bdecode(nb::object b, bool zero_copy, nb::handle type, int threads) {
     if (!PyObject_CheckBuffer(b.ptr())) {
         throw nb::type_error(
             "bencode.bencode should be called with bytes/memoryview/bytearray/Buffer");
     }
 
+    if (threads <= 0) {
+        throw nb::value_error("threads must be positive");
+    }
+
     Py_buffer view;
     PyObject_GetBuffer(b.ptr(), &view, 0);
     if (PyErr_Occurred()) {
         throw nb::python_error();
     }
 
-    Py_ssize_t size = view.len;
-    if (size == 0) {
-        throw DecodeError("can't decode empty bytes");
+    InternCache intern;
+    DecodeContext ctx{(const char *)view.buf, view.len, nb::object(), nullptr, &intern};
+    ctx.threads = threads;
+
+    nb::object o;
+    try {
+        nb::object plan;
+        if (!type.is_none()) {
+            plan = compile_plan(type);
+        }
+
+        if (zero_copy) {
+            // slices of this memoryview keep the input object alive.
+            ctx.view = nb::steal(PyMemoryView_FromObject(b.ptr()));
+            if (!ctx.view.is_valid()) {
+                throw nb::python_error();
+            }
+            ctx.view = ctx.view.attr("cast")("B").attr("toreadonly")();
+        }
+
+        o = decodeBuffer(ctx, plan);
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
     }
 
-    const char *buf = (char *)view.buf;
+    PyBuffer_Release(&view);
+
+    return o;
+}
+
+extern nb::object decode_error_type;
 
-    Py_ssize_t index = 0;
+nb::list bdecode_many(nb::iterable values) {
+    nb::list results;
+
+    for (nb::handle b : values) {
+        if (!PyObject_CheckBuffer(b.ptr())) {
+            results.append(nb::handle(PyExc_TypeError)(
+                "bencode.bdecode_many should be called with bytes/memoryview/bytearray/Buffer"));
+            continue;
+        }
+
+        Py_buffer view;
+        if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+            throw nb::python_error();
+        }
+
+        try {
+            results.append(decodeBuffer((const char *)view.buf, view.len));
+        } catch (DecodeError &e) {
+            PyBuffer_Release(&view);
+            results.append(decode_error_type(e.what()));
+            continue;
+        } catch (...) {
+            PyBuffer_Release(&view);
+            throw;
+        }
+
+        PyBuffer_Release(&view);
+    }
+
+    return results;
+}
+
+// validate a whole buffer like `decodeBuffer`, without building python object.
+static void validateBuffer(nb::handle b, const char *name, DecodeStats *stats) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            fmt::format("bencode.{} should be called with bytes/memoryview/bytearray/Buffer", name)
+                .c_str());
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
 
-    nb::object o;
     try {
-        o = decodeAny(buf, index, size, 0);
+        nb::gil_scoped_release release;
+
+        const char *buf = (const char *)view.buf;
+        if (view.len == 0) {
+            throw DecodeError("can't decode empty bytes");
+        }
+
+        Py_ssize_t index = 0;
+        skipAny(buf, index, view.len, 0, stats);
+
+        if (index != view.len) {
+            decoderError("invalid bencode data, parse end at index {} but total bytes length {}",
+                         index, view.len);
+        }
     } catch (...) {
         PyBuffer_Release(&view);
         throw;
     }
 
     PyBuffer_Release(&view);
+}
 
-    if (index != size) {
-        decoderError("invalid bencode data, parse end at index {} but total bytes length {}", index,
-                     size);
+void bvalidate(nb::handle b) { validateBuffer(b, "bvalidate", nullptr); }
+
+nb::dict bstats(nb::handle b) {
+    DecodeStats stats;
+    validateBuffer(b, "bstats", &stats);
+
+    nb::dict d;
+    d["ints"] = stats.ints;
+    d["strings"] = stats.strings;
+    d["lists"] = stats.lists;
+    d["dicts"] = stats.dicts;
+    d["max_depth"] = stats.maxDepth;
+    d["string_bytes"] = stats.stringBytes;
+    d["max_string_length"] = stats.maxStringLength;
+    return d;
+}
+
+Limit checkLimit(const char *name, Limit value) {
+    if (value.has_value() && value.value() <= 0) {
+        throw nb::value_error(fmt::format("{} must be positive", name).c_str());
+    }
+    return value;
+}
+
+Decoder::Decoder(Limit maxDepth, Limit maxSize, Limit maxString, Limit maxItems)
+    : maxDepth(checkLimit("max_depth", maxDepth)), maxSize(checkLimit("max_size", maxSize)),
+      maxString(checkLimit("max_string", maxString)), maxItems(checkLimit("max_items", maxItems)) {
+    limits.maxDepth = maxDepth.value_or(PY_SSIZE_T_MAX);
+    limits.maxString = maxString.value_or(PY_SSIZE_T_MAX);
+    limits.maxItems = maxItems.value_or(PY_SSIZE_T_MAX);
+    checked = maxDepth.has_value() || maxString.has_value() || maxItems.has_value();
+}
+
+nb::object Decoder::decode(nb::handle b) const {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "Decoder.decode should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
     }
 
+    nb::object o;
+    try {
+        if (maxSize.has_value() && view.len > maxSize.value()) {
+            decoderError("input size {} exceeds max_size {}", view.len, maxSize.value());
+        }
+
+        InternCache intern;
+        o = decodeBuffer(DecodeContext{(const char *)view.buf, view.len, nb::object(), nullptr,
+                                       &intern, checked ? &limits : nullptr});
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
+    }
+
+    PyBuffer_Release(&view);
+
     return o;
 }
+
+std::string limitRepr(Limit value) {
+    return value.has_value() ? std::to_string(value.value()) : "None";
+}
+
+nb::str Decoder::repr() const {
+    return nb::str(fmt::format("Decoder(max_depth={}, max_size={}, max_string={}, max_items={})",
+                               limitRepr(maxDepth), limitRepr(maxSize), limitRepr(maxString),
+                               limitRepr(maxItems))
+                       .c_str());
+}
@@ -0,0 +1,192 @@
+#pragma once
+
+#include <algorithm>
+#include <atomic>
+#include <bit>
+#include <cstring>
+#include <optional>
+#include <string_view>
+
+#include <fmt/core.h>
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+
+namespace nb = nanobind;
+
+#define BENCODE_DEFAULT_MAX_DECODE_DEPTH 4096
+
+#define decoderError(f, ...) throw DecodeError(fmt::format(f, ##__VA_ARGS__))
+
+// maximum nesting depth of decoded value, changed by `set_max_decode_depth`.
+extern std::atomic<Py_ssize_t> maxDecodeDepth;
+
+static inline void checkDepth(uint_fast32_t depth) {
+    if ((Py_ssize_t)depth > maxDecodeDepth.load(std::memory_order_relaxed)) {
+        throw DecodeError("exceeded maximum decode depth");
+    }
+}
+
+// resource limits of a `Decoder`, checked while decoding.
+struct DecodeLimits {
+    Py_ssize_t maxDepth = PY_SSIZE_T_MAX;
+    Py_ssize_t maxString = PY_SSIZE_T_MAX;
+    Py_ssize_t maxItems = PY_SSIZE_T_MAX;
+};
+
+static inline void checkDepth(uint_fast32_t depth, const DecodeLimits *limits) {
+    checkDepth(depth);
+    if (limits != nullptr && (Py_ssize_t)depth > limits->maxDepth) {
+        throw DecodeError("exceeded maximum decode depth");
+    }
+}
+
+// check that dict keys are sorted and unique.
+static inline void checkKeyOrder(std::optional<std::string_view> &lastKey, std::string_view key,
+                                 Py_ssize_t index) {
+    // skip first key
+    if (lastKey.has_value()) {
+        if (key < lastKey.value()) {
+            decoderError("invalid dict, key not sorted. index {}", index);
+        }
+        if (key == lastKey.value()) {
+            decoderError("invalid dict, find duplicated keys {}. index {}", key, index);
+        }
+    }
+    lastKey = std::make_optional(key);
+}
+
+// byte range of a value in top-level dict, recorded while decoding.
+struct Span {
+    std::string_view key;
+    Py_ssize_t start = -1;
+    Py_ssize_t end = -1;
+};
+
+// small direct-mapped cache of bytes objects created in one decode call,
+// so repeated dict keys (and short values) share one python object.
+//
+// slots are only initialized when they are used, it's created for every decode call.
+template <size_t maxLength> class BytesCache {
+public:
+    BytesCache() = default;
+    BytesCache(const BytesCache &) = delete;
+    BytesCache &operator=(const BytesCache &) = delete;
+
+    ~BytesCache() {
+        while (used != 0) {
+            int i = std::countr_zero(used);
+            Py_DECREF(table[i]);
+            used &= used - 1;
+        }
+    }
+
+    nb::object get(std::string_view s) {
+        if (s.size() > maxLength) {
+            return nb::bytes(s.data(), s.size());
+        }
+
+        // FNV-1a
+        uint32_t h = 2166136261u;
+        for (char c : s) {
+            h = (h ^ (uint8_t)c) * 16777619u;
+        }
+        h = h % 64;
+
+        uint64_t bit = uint64_t(1) << h;
+        if (used & bit) {
+            PyObject *o = table[h];
+            if ((size_t)PyBytes_Size(o) == s.size() &&
+                memcmp(PyBytes_AsString(o), s.data(), s.size()) == 0) {
+                return nb::borrow(o);
+            }
+            Py_DECREF(o);
+            used &= ~bit;
+        }
+
+        nb::bytes b(s.data(), s.size());
+        table[h] = b.inc_ref().ptr();
+        used |= bit;
+        return b;
+    }
+
+private:
+    uint64_t used = 0;
+    PyObject *table[64];
+};
+
+struct InternCache {
+    BytesCache<64> keys;
+    BytesCache<16> values;
+};
+
+struct DecodeContext {
+    const char *buf;
+    Py_ssize_t size;
+    // read-only memoryview of the whole input, when it's set,
+    // string values are sliced from it instead of copied to bytes.
+    nb::object view;
+    Span *span = nullptr;
+    InternCache *intern = nullptr;
+    // values are decoded by `decodeAny` when it's set.
+    const DecodeLimits *limits = nullptr;
+    // native threads used to decode a large input, see `decodeParallel`.
+    int threads = 1;
+};
+
+nb::object decodeAny(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth);
+
+// decode value at index as described by a plan from `bencode2.__schema`.
+nb::object decodeTyped(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth,
+                       nb::handle plan);
+
+nb::object decodeInt(const char *buf, Py_ssize_t &index, Py_ssize_t size);
+
+nb::object decodeBytes(const DecodeContext &ctx, Py_ssize_t &index);
+
+// python object of a string value in ctx.buf, bytes or a slice of ctx.view.
+nb::object bytesValue(const DecodeContext &ctx, std::string_view s);
+
+std::string_view decodeAsView(const char *buf, Py_ssize_t &index, Py_ssize_t size);
+
+// counters collected by `skipAny`, dict keys are counted as strings.
+struct DecodeStats {
+    Py_ssize_t ints = 0;
+    Py_ssize_t strings = 0;
+    Py_ssize_t lists = 0;
+    Py_ssize_t dicts = 0;
+    Py_ssize_t maxDepth = 0;
+    Py_ssize_t stringBytes = 0;
+    Py_ssize_t maxStringLength = 0;
+
+    void addString(std::string_view s) {
+        strings++;
+        stringBytes += s.size();
+        maxStringLength = std::max(maxStringLength, (Py_ssize_t)s.size());
+    }
+};
+
+// validate value at index and move index to its end, without building python object.
+// it doesn't touch any python object, and can run without GIL.
+void skipAny(const char *buf, Py_ssize_t &index, Py_ssize_t size, uint_fast32_t depth,
+             DecodeStats *stats = nullptr);
+
+// input at least this large is decoded by `decodeTape`.
+#define BENCODE_TAPE_MIN_SIZE (16 * 1024)
+
+// decode a whole buffer with the two stage decoder in `tape.cpp`,
+// return an empty object if input is invalid, error should be raised by `decodeAny`.
+nb::object decodeTape(const DecodeContext &ctx);
+
+// input at least this large is decoded by `decodeParallel` when more than 1 thread is allowed.
+#define BENCODE_PARALLEL_MIN_SIZE (1024 * 1024)
+
+// decode top-level items of a whole buffer on `ctx.threads` threads, see `parallel.cpp`.
+// return an empty object if input is invalid or can't be split, it should be decoded as usual.
+nb::object decodeParallel(const DecodeContext &ctx);
+
+// decode a whole buffer, buffer must contain exactly one bencode value.
+// with a plan, value is decoded by `decodeTyped`.
+nb::object decodeBuffer(const DecodeContext &ctx, nb::handle plan = nb::handle());
+
+nb::object decodeBuffer(const char *buf, Py_ssize_t size);
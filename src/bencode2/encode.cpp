@@ -1,10 +1,16 @@
 #include <Python.h>
+#include <structmember.h>
+
 #include <algorithm> // std::sort
 #include <gch/small_vector.hpp>
+#include <memory>
 #include <nanobind/nanobind.h>
+#include <unordered_map>
 
+#include "coder.hpp"
 #include "common.hpp"
 #include "encode_ctx.hpp"
+#include "raw.hpp"
 
 namespace nb = nanobind;
 
@@ -14,6 +20,9 @@ extern nb::object dataclasses_fields;
 // dataclasses.is_dataclass
 extern nb::object is_dataclasses;
 
+// bencode2.Raw
+extern PyTypeObject *raw_type;
+
 void encodeAny(EncodeContext *ctx, nb::handle obj);
 
 static bool cmp(std::pair<std::string_view, nb::handle> &a,
@@ -132,34 +141,135 @@ void encodeDictLike(EncodeContext *ctx, nb::handle h) {
     return;
 }
 
-void encodeDataclasses(EncodeContext *ctx, nb::handle h) {
-    ctx->writeChar('d');
-    auto fields = dataclasses_fields(h);
-    auto size = PyTuple_Size(fields.ptr());
+// encode plan of a dataclass type, fields are sorted by name.
+struct DataclassField {
+    // pre-encoded key, `4:name`
+    std::string key;
+    // interned field name
+    nb::object name;
+    // offset of the slot, if field is stored in `__slots__`
+    Py_ssize_t offset = -1;
+};
 
-    gch::small_vector<std::pair<std::string_view, nb::handle>, 8> vec;
+struct DataclassPlan {
+    std::vector<DataclassField> fields;
+    // weakref to the type, plan is removed from cache when type is garbage collected
+    nb::object ref;
+};
 
-    vec.reserve(size);
+static nb::ft_mutex dataclassPlansMutex;
 
-    for (auto field : fields) {
-        auto key = field.attr("name").ptr();
-        auto value = h.attr(key);
+// never freed, objects in it can't be released after interpreter finalization.
+static auto *dataclassPlans =
+    new std::unordered_map<PyTypeObject *, std::shared_ptr<DataclassPlan>>();
 
-        vec.push_back(make_pair(py_string_view(key), nb::handle(value)));
+static std::shared_ptr<DataclassPlan> findDataclassPlan(PyTypeObject *type) {
+    nb::ft_lock_guard lock(dataclassPlansMutex);
+    auto it = dataclassPlans->find(type);
+    if (it == dataclassPlans->end()) {
+        return nullptr;
     }
+    return it->second;
+}
 
-    std::sort(vec.begin(), vec.end(), cmp);
+// build plan from fields of a dataclass type, or a dataclass itself if it's encoded as value.
+static std::shared_ptr<DataclassPlan> buildDataclassPlan(nb::handle type, bool useSlots) {
+    auto plan = std::make_shared<DataclassPlan>();
 
-    for (const auto &pair : vec) {
-        ctx->writeSize_t(pair.first.length());
-        ctx->writeChar(':');
-        ctx->write(pair.first);
+    for (auto field : dataclasses_fields(type)) {
+        nb::object fieldName = field.attr("name");
+        PyObject *p = fieldName.release().ptr();
+        PyUnicode_InternInPlace(&p);
+        auto name = nb::steal<nb::str>(p);
 
-        encodeAny(ctx, pair.second);
+        auto key = py_string_view(name);
+
+        DataclassField f{fmt::format("{}:{}", key.size(), key), name};
+
+#ifndef Py_LIMITED_API
+        // slots=True, read object slot directly instead of looking up the descriptor
+        if (useSlots) {
+            PyObject *descr = _PyType_Lookup((PyTypeObject *)type.ptr(), name.ptr());
+            if (descr != nullptr && Py_TYPE(descr) == &PyMemberDescr_Type) {
+                auto member = ((PyMemberDescrObject *)descr)->d_member;
+                if (member->type == T_OBJECT_EX) {
+                    f.offset = member->offset;
+                }
+            }
+        }
+#endif
+
+        plan->fields.push_back(std::move(f));
+    }
+
+    std::sort(plan->fields.begin(), plan->fields.end(),
+              [](const DataclassField &a, const DataclassField &b) {
+                  std::string_view ka = a.key;
+                  std::string_view kb = b.key;
+                  return ka.substr(ka.find(':') + 1) < kb.substr(kb.find(':') + 1);
+              });
+
+    return plan;
+}
+
+static std::shared_ptr<DataclassPlan> compileDataclassPlan(nb::handle type) {
+    auto plan = buildDataclassPlan(type, true);
+
+    PyTypeObject *key = (PyTypeObject *)type.ptr();
+    plan->ref =
+        nb::steal(PyWeakref_NewRef(type.ptr(), nb::cpp_function([key](nb::handle) {
+                                                   std::shared_ptr<DataclassPlan> removed;
+                                                   {
+                                                       nb::ft_lock_guard lock(dataclassPlansMutex);
+                                                       auto it = dataclassPlans->find(key);
+                                                       if (it != dataclassPlans->end()) {
+                                                           removed = std::move(it->second);
+                                                           dataclassPlans->erase(it);
+                                                       }
+                                                   }
+                                               }).ptr()));
+    if (!plan->ref.is_valid()) {
+        throw nb::python_error();
+    }
+
+    nb::ft_lock_guard lock(dataclassPlansMutex);
+    auto [it, _] = dataclassPlans->emplace(key, plan);
+    return it->second;
+}
+
+static void encodeDataclassFields(EncodeContext *ctx, nb::handle h, const DataclassPlan &plan) {
+    ctx->writeChar('d');
+
+    for (const auto &field : plan.fields) {
+        ctx->write(field.key);
+
+        if (field.offset != -1) {
+            PyObject *value = *(PyObject **)((char *)h.ptr() + field.offset);
+            if (value != nullptr) {
+                encodeAny(ctx, nb::handle(value));
+                continue;
+            }
+        }
+
+        // raise AttributeError if slot is not set
+        encodeAny(ctx, h.attr(field.name));
     }
 
     ctx->writeChar('e');
-    return;
+}
+
+void encodeDataclasses(EncodeContext *ctx, nb::handle h) {
+    // dataclass type itself, it's not cached
+    if (PyType_Check(h.ptr())) {
+        return encodeDataclassFields(ctx, h, *buildDataclassPlan(h, false));
+    }
+
+    auto plan = findDataclassPlan(Py_TYPE(h.ptr()));
+    if (plan == nullptr) {
+        plan = compileDataclassPlan(h.type());
+    }
+
+    encodeDataclassFields(ctx, h, *plan);
 }
 
 void encodeInt_fast(EncodeContext *ctx, long long val) {
@@ -226,6 +336,9 @@ void encodeComposeObject(EncodeContext *ctx, nb::handle obj, Encode encode) {
     debug_print("put object {:x} to seen", key);
     debug_print("after put object {:x} to seen", key);
     ctx->stack_depth++;
+    if (ctx->stack_depth > ctx->maxDepth) {
+        throw EncodeError(fmt::format("exceeded max_depth {}", ctx->maxDepth));
+    }
     bool enableCheck = ctx->stack_depth >= 100;
     if (enableCheck) {
         if (ctx->seen.find(key) != ctx->seen.end()) {
@@ -305,7 +418,9 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
         debug_print("write char");
         ctx->writeChar(':');
         debug_print("write content");
-        ctx->write(s, length);
+        if (!ctx->writeThrough(obj, length)) {
+            ctx->write(s, length);
+        }
         return;
     }
 
@@ -336,7 +451,9 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
 
         ctx->writeSize_t(size);
         ctx->writeChar(':');
-        ctx->write(s, size);
+        if (!ctx->writeThrough(obj, size)) {
+            ctx->write(s, size);
+        }
 
         return;
     }
@@ -347,7 +464,9 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
         Py_buffer *buf = PyMemoryView_GET_BUFFER(obj.ptr());
         ctx->writeSize_t(buf->len);
         ctx->writeChar(':');
-        ctx->write((char *)buf->buf, buf->len);
+        if (!ctx->writeThrough(obj, buf->len)) {
+            ctx->write((char *)buf->buf, buf->len);
+        }
 
         return;
     }
@@ -362,12 +481,29 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
 
         ctx->writeSize_t(buf.len);
         ctx->writeChar(':');
-        ctx->write((char *)buf.buf, buf.len);
+        try {
+            if (!ctx->writeThrough(obj, buf.len)) {
+                ctx->write((char *)buf.buf, buf.len);
+            }
+        } catch (...) {
+            PyBuffer_Release(&buf);
+            throw;
+        }
 
         PyBuffer_Release(&buf);
         return;
     }
 
+    if (Py_TYPE(obj.ptr()) == raw_type) {
+        debug_print("encode raw");
+        const nb::bytes &value = nb::inst_ptr<Raw>(obj)->value;
+        Py_ssize_t length = value.size();
+        if (!ctx->writeThrough(value, length)) {
+            ctx->write(value.c_str(), length);
+        }
+        return;
+    }
+
     // types.MappingProxyType
     debug_print("test if mapping proxy");
     if (obj.ptr()->ob_type == &PyDictProxy_Type) {
@@ -375,6 +511,16 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
         return encodeComposeObject(ctx, obj, encodeDictLike);
     }
 
+    // dataclass instance with cached plan, skip `dataclasses.is_dataclass`
+    if (!PyType_Check(obj.ptr())) {
+        auto plan = findDataclassPlan(Py_TYPE(obj.ptr()));
+        if (plan != nullptr) {
+            return encodeComposeObject(ctx, obj, [&plan](EncodeContext *ctx, nb::handle h) {
+                encodeDataclassFields(ctx, h, *plan);
+            });
+        }
+    }
+
     if (is_dataclasses(obj).ptr() == Py_True) {
         return encodeComposeObject(ctx, obj, encodeDataclasses);
     }
@@ -388,55 +534,271 @@ void encodeAny(EncodeContext *ctx, const nb::handle obj) {
     throw nb::type_error(msg.c_str());
 }
 
-thread_local static std::vector<EncodeContext *> pool;
-
-// 30 MiB. Most torrents is smaller than 20 mib,
-// we may alloc more size so set it bigger
-size_t const ctx_buffer_reuse_cap = 20 * 1024 * 1024u;
-
-// reuse encoded buffer for average 10% performance gain.
-class CtxMgr {
-public:
-    EncodeContext *ctx;
-    CtxMgr() {
-        if (pool.empty()) {
-            debug_print("empty pool, create Context");
-            ctx = new EncodeContext();
-            return;
-        }
+// `bencode` output larger than this is moved to a bytes object of exact size while encoding,
+// instead of copied out of context buffer at the end.
+#define BENCODE_EXACT_MIN_SIZE (64 * 1024)
 
-        debug_print("get Context from pool");
+static size_t decimalLength(unsigned long long val) {
+    size_t n = 1;
+    while (val >= 10) {
+        val /= 10;
+        n++;
+    }
+    return n;
+}
 
-        // will there be any race problem here?
-        ctx = pool.back();
-        pool.pop_back();
+struct SizeWalk {
+    size_t size = 0;
+    size_t items = 0;
+};
 
-        return;
+// add encoded size of obj to `walk`, without checking or writing anything.
+//
+// only exact builtin types are handled, return false for other types, deep nesting, or
+// when there are too many small items to make a second pass worth it.
+static bool walkSize(nb::handle obj, SizeWalk &walk, int depth) {
+    if (++walk.items > 64 && walk.items * 256 > walk.size) {
+        return false;
+    }
+
+    PyObject *o = obj.ptr();
+
+    if (PyBytes_CheckExact(o)) {
+#ifndef Py_LIMITED_API
+        Py_ssize_t n = PyBytes_GET_SIZE(o);
+#else
+        Py_ssize_t n = PyBytes_Size(o);
+#endif
+        walk.size += decimalLength(n) + 1 + n;
+        return true;
     }
 
-    ~CtxMgr() {
-        if (pool.size() <= 2) {
-            if (ctx->buffer.capacity() <= ctx_buffer_reuse_cap) {
-                debug_print("put Context back to pool");
+    if (PyUnicode_CheckExact(o)) {
+        size_t n = py_string_view(obj).size();
+        walk.size += decimalLength(n) + 1 + n;
+        return true;
+    }
 
-                ctx->reset();
-                pool.push_back(ctx);
-                return;
+    if (o == Py_True || o == Py_False) {
+        walk.size += 3;
+        return true;
+    }
+
+    if (PyLong_CheckExact(o)) {
+        int overflow = 0;
+        long long val = PyLong_AsLongLongAndOverflow(o, &overflow);
+        if (overflow || (val == -1 && PyErr_Occurred())) {
+            PyErr_Clear();
+            return false;
+        }
+        walk.size += 2 + (val < 0) + decimalLength(val < 0 ? -(unsigned long long)val : val);
+        return true;
+    }
+
+    if (depth >= 100) {
+        return false;
+    }
+
+    if (PyList_CheckExact(o) || PyTuple_CheckExact(o)) {
+        walk.size += 2;
+#ifndef Py_LIMITED_API
+        Py_ssize_t n = PySequence_Fast_GET_SIZE(o);
+        PyObject **items = PySequence_Fast_ITEMS(o);
+        for (Py_ssize_t i = 0; i < n; i++) {
+            if (!walkSize(items[i], walk, depth + 1)) {
+                return false;
             }
         }
+#else
+        for (nb::handle item : nb::borrow<nb::sequence>(obj)) {
+            if (!walkSize(item, walk, depth + 1)) {
+                return false;
+            }
+        }
+#endif
+        return true;
+    }
+
+    if (PyDict_CheckExact(o)) {
+        PyObject *key, *value;
+        Py_ssize_t pos = 0;
+        walk.size += 2;
+        while (PyDict_Next(o, &pos, &key, &value)) {
+            if (!PyBytes_CheckExact(key) && !PyUnicode_CheckExact(key)) {
+                return false;
+            }
+            if (!walkSize(key, walk, depth + 1) || !walkSize(value, walk, depth + 1)) {
+                return false;
+            }
+        }
+        return true;
+    }
 
-        debug_print("delete Context");
-        delete ctx;
+    if (Py_TYPE(o) == raw_type) {
+        walk.size += nb::inst_ptr<Raw>(obj)->value.size();
+        return true;
     }
-};
+
+    return false;
+}
+
+void onLargeOutput(EncodeContext *ctx, nb::handle v) {
+    // give up on values with many small items, copying output is cheaper than a second pass.
+    SizeWalk walk;
+    if (!walkSize(v, walk, 0) || walk.size < ctx->size()) {
+        return;
+    }
+
+    auto res = nb::steal<nb::bytes>(PyBytes_FromStringAndSize(nullptr, walk.size));
+    if (!res.is_valid()) {
+        throw nb::python_error(); // LCOV_EXCL_LINE
+    }
+
+#ifndef Py_LIMITED_API
+    ctx->moveTo(PyBytes_AS_STRING(res.ptr()), walk.size);
+#else
+    ctx->moveTo(PyBytes_AsString(res.ptr()), walk.size);
+#endif
+    ctx->exactOutput = std::move(res);
+}
 
 nb::bytes bencode(nb::object v) {
     debug_print("1");
     auto ctx = CtxMgr();
 
+    // small output is copied out of context buffer, large output is written to a bytes object
+    // of exact size once it's known to be large, see `onLargeOutput`.
+    ctx.ctx->watchSize(v, BENCODE_EXACT_MIN_SIZE);
+    encodeAny(ctx.ctx, v);
+
+    nb::object res = std::move(ctx.ctx->exactOutput);
+    // value is changed while encoding
+    if (res.is_valid() && !ctx.ctx->overflowed() &&
+        ctx.ctx->size() == nb::borrow<nb::bytes>(res).size()) {
+        return nb::steal<nb::bytes>(res.release());
+    }
+
+    return nb::bytes(ctx.ctx->data(), ctx.ctx->size());
+}
+
+Encoder::Encoder(Limit maxDepth, Limit maxSize)
+    : maxDepth(checkLimit("max_depth", maxDepth)), maxSize(checkLimit("max_size", maxSize)) {}
+
+nb::bytes Encoder::encode(nb::handle v) const {
+    auto ctx = CtxMgr();
+
+    if (maxDepth.has_value()) {
+        ctx.ctx->maxDepth = maxDepth.value();
+    }
+    if (maxSize.has_value()) {
+        ctx.ctx->limitSize(maxSize.value());
+    }
+
+    encodeAny(ctx.ctx, v);
+
+    return nb::bytes(ctx.ctx->data(), ctx.ctx->size());
+}
+
+nb::str Encoder::repr() const {
+    return nb::str(
+        fmt::format("Encoder(max_depth={}, max_size={})", limitRepr(maxDepth), limitRepr(maxSize))
+            .c_str());
+}
+
+size_t bencoded_size(nb::object v) {
+    auto ctx = CtxMgr();
+
+    ctx.ctx->useCounter();
     encodeAny(ctx.ctx, v);
 
-    auto res = nb::bytes(ctx.ctx->buffer.data(), ctx.ctx->buffer.size());
+    return ctx.ctx->size();
+}
+
+size_t bencode_into(nb::object v, nb::handle buffer, Py_ssize_t offset) {
+    Py_buffer view;
+    if (PyObject_GetBuffer(buffer.ptr(), &view, PyBUF_WRITABLE) != 0) {
+        throw nb::python_error();
+    }
+
+    if (offset < 0 || offset > view.len) {
+        PyBuffer_Release(&view);
+        throw nb::value_error("offset out of range");
+    }
+
+    auto ctx = CtxMgr();
+    size_t available = view.len - offset;
+
+    // write to `buffer` directly, without a copy. if it's too small, encoding continues in
+    // owned buffer to get the required size, and data already written to `buffer` is left
+    // there.
+    ctx.ctx->useExternal((char *)view.buf + offset, available);
+
+    try {
+        encodeAny(ctx.ctx, v);
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
+    }
+
+    PyBuffer_Release(&view);
+
+    if (ctx.ctx->overflowed()) {
+        throw EncodeError(fmt::format("buffer too small, need {} bytes but only {} available",
+                                      ctx.ctx->size(), available));
+    }
+
+    return ctx.ctx->size();
+}
+
+size_t bencode_to(nb::object v, nb::object fp, Py_ssize_t chunk_size) {
+    if (chunk_size <= 0) {
+        throw nb::value_error("chunk_size must be positive");
+    }
+
+    auto write = fp.attr("write");
+
+    auto ctx = CtxMgr();
+
+    ctx.ctx->useSink(write, chunk_size);
+
+    encodeAny(ctx.ctx, v);
+
+    ctx.ctx->flush();
+
+    return ctx.ctx->written();
+}
+
+extern nb::object encode_error_type;
+
+nb::list bencode_many(nb::iterable values) {
+    auto ctx = CtxMgr();
+
+    nb::list results;
+
+    for (nb::handle v : values) {
+        ctx.ctx->reset();
+
+        try {
+            encodeAny(ctx.ctx, v);
+        } catch (EncodeError &e) {
+            results.append(encode_error_type(e.what()));
+            continue;
+        } catch (nb::builtin_exception &e) {
+            if (e.type() != nb::exception_type::type_error) {
+                throw;
+            }
+            results.append(nb::handle(PyExc_TypeError)(e.what()));
+            continue;
+        } catch (nb::python_error &e) {
+            if (!e.matches(PyExc_ValueError) && !e.matches(PyExc_TypeError)) {
+                throw;
+            }
+            results.append(e.value());
+            continue;
+        }
+
+        results.append(nb::bytes(ctx.ctx->data(), ctx.ctx->size()));
+    }
 
-    return res;
+    return results;
 }
@@ -1,52 +1,313 @@
 #pragma once
 
+#include <algorithm>
+#include <cstdlib>
+#include <cstring>
+#include <new>
 #include <stdint.h>
+#include <string_view>
 #include <unordered_set>
-#include <vector>
 
 #include <fmt/compile.h>
 #include <fmt/core.h>
+#include <nanobind/nanobind.h>
 
 #include "common.hpp"
 
+namespace nb = nanobind;
+
 #define defaultBufferSize 4096
 
+class EncodeContext;
+
+// called once when output of a watched value grows past its size, see `watchSize`.
+void onLargeOutput(EncodeContext *ctx, nb::handle value);
+
 class EncodeContext {
 public:
-    std::vector<char> buffer;
     size_t stack_depth;
     std::unordered_set<uintptr_t> seen;
 
+    // bytes object output is moved to by `onLargeOutput`, cleared by `reset`
+    nb::object exactOutput;
+
+    // limits of `Encoder`, cleared by `reset`
+    size_t maxDepth = SIZE_MAX;
+
     EncodeContext() {
         debug_print("new EncodeContext");
-        buffer = std::vector<char>();
         stack_depth = 0;
-        buffer.reserve(defaultBufferSize);
+        buffer = (char *)malloc(defaultBufferSize);
+        if (buffer == nullptr) {
+            throw std::bad_alloc(); // LCOV_EXCL_LINE
+        }
+        bufferCap = defaultBufferSize;
+        out = buffer;
+        cap = bufferCap;
+        len = 0;
     }
 
     ~EncodeContext() {
         debug_print("delete context");
         seen.clear();
-        buffer.clear();
+        free(buffer);
     }
 
     void reset() {
         stack_depth = 0;
-        buffer.clear();
+        maxDepth = SIZE_MAX;
+        maxSize = SIZE_MAX;
         seen.clear();
+        out = buffer;
+        cap = bufferCap;
+        len = 0;
+        external = false;
+        overflow = false;
+        counting = false;
+        sink = nb::handle();
+        flushed = 0;
+        watched = nb::handle();
+        watchLimit = SIZE_MAX;
+        exactOutput.reset();
+    }
+
+    // encoded data
+    const char *data() const { return out; }
+
+    size_t size() const { return len; }
+
+    // capacity of owned buffer
+    size_t capacity() const { return bufferCap; }
+
+    // shrink owned buffer to n bytes if it's larger, only after `reset`.
+    void shrink(size_t n) {
+        if (bufferCap <= n) {
+            return;
+        }
+
+        char *p = (char *)realloc(buffer, n);
+        if (p == nullptr) {
+            return; // LCOV_EXCL_LINE
+        }
+        buffer = p;
+        bufferCap = n;
+        out = buffer;
+        cap = bufferCap;
+    }
+
+    // write to a caller supplied buffer instead of the owned one.
+    //
+    // if it's too small, data written so far is moved to the owned buffer and
+    // encoding continue there, `overflow` is set, so caller know the required size.
+    void useExternal(char *p, size_t size) {
+        out = p;
+        cap = size;
+        len = 0;
+        external = true;
+    }
+
+    bool overflowed() const { return overflow; }
+
+    // call `onLargeOutput(this, value)` when output grows past `size`, only once.
+    void watchSize(nb::handle value, size_t size) {
+        watched = value;
+        watchLimit = size;
+        cap = std::min(cap, watchLimit);
+    }
+
+    // continue writing to a caller supplied buffer, data written so far is copied to it.
+    // it's handled like `useExternal` if it's too small.
+    void moveTo(char *p, size_t size) {
+        memcpy(p, out, len);
+        out = p;
+        cap = std::min(size, maxSize);
+        external = true;
+    }
+
+    // output larger than `size` raise `EncodeError` before it's written.
+    void limitSize(size_t size) {
+        maxSize = size;
+        cap = std::min(cap, maxSize);
+    }
+
+    // only count output size, nothing is written.
+    void useCounter() {
+        len = 0;
+        counting = true;
     }
 
-    void write(std::string_view val) { buffer.insert(buffer.end(), val.begin(), val.end()); }
+    // pass data to `write` every `chunkSize` bytes instead of growing buffer.
+    void useSink(nb::handle write, size_t chunkSize) {
+        ensureBuffer(chunkSize);
+
+        sink = write;
+        chunk = chunkSize;
+        out = buffer;
+        cap = chunkSize;
+        len = 0;
+    }
+
+    // write buffered data to sink
+    void flush() {
+        if (len == 0) {
+            return;
+        }
+
+        sink(nb::bytes(out, len));
+        flushed += len;
+        len = 0;
+        cap = chunk;
+    }
+
+    // total bytes passed to sink
+    size_t written() const { return flushed; }
+
+    // pass a large bytes-like object to sink as it is, without copying it to buffer.
+    // return false if it should be written as usual.
+    bool writeThrough(nb::handle obj, size_t size) {
+        if (!sink.is_valid() || size < cap) {
+            return false;
+        }
+
+        flush();
+        sink(obj);
+        flushed += size;
+        return true;
+    }
+
+    void write(std::string_view val) { write(val.data(), val.size()); }
 
     void write(const char *data, Py_ssize_t size) {
-        buffer.insert(buffer.end(), data, data + size);
+        if (counting) {
+            len += size;
+            return;
+        }
+
+        reserve(size);
+        memcpy(out + len, data, size);
+        len += size;
     }
 
-    void writeSize_t(size_t val) { fmt::format_to(std::back_inserter(buffer), "{}", val); }
+    void writeSize_t(size_t val) { writeFormatted(val); }
+
+    void writePySize_t(Py_ssize_t val) { writeFormatted(val); }
+
+    void writeLongLong(int64_t val) { writeFormatted(val); }
+
+    void writeChar(const char c) {
+        if (counting) {
+            len++;
+            return;
+        }
+
+        reserve(1);
+        out[len++] = c;
+    }
 
-    void writePySize_t(Py_ssize_t val) { fmt::format_to(std::back_inserter(buffer), "{}", val); }
+private:
+    // owned buffer
+    char *buffer;
+    size_t bufferCap;
+
+    // current output, owned buffer or an external one
+    char *out;
+    size_t cap;
+    size_t len;
+    bool external = false;
+    bool overflow = false;
+    bool counting = false;
+    size_t maxSize = SIZE_MAX;
+
+    // bound `write` method of output file
+    nb::handle sink;
+    size_t chunk = 0;
+    size_t flushed = 0;
+
+    // value passed to `onLargeOutput`
+    nb::handle watched;
+    size_t watchLimit = SIZE_MAX;
+
+    template <typename T> void writeFormatted(T val) {
+        char tmp[24];
+        auto end = fmt::format_to(tmp, FMT_COMPILE("{}"), val);
+        write(tmp, end - tmp);
+    }
+
+    void reserve(size_t n) {
+        if (len + n > cap) {
+            grow(n);
+        }
+    }
+
+    // make sure owned buffer can hold at least n bytes
+    void ensureBuffer(size_t n) {
+        if (bufferCap >= n) {
+            return;
+        }
+
+        char *p = (char *)realloc(buffer, n);
+        if (p == nullptr) {
+            throw std::bad_alloc(); // LCOV_EXCL_LINE
+        }
+        buffer = p;
+        bufferCap = n;
+    }
+
+    void grow(size_t n) {
+        if (len + n > maxSize) {
+            throw EncodeError(fmt::format("encoded size exceeds max_size {}", maxSize));
+        }
+
+        if (len + n > watchLimit) {
+            watchLimit = SIZE_MAX;
+            cap = std::min(bufferCap, maxSize);
+            onLargeOutput(this, watched);
+            if (len + n <= cap) {
+                return;
+            }
+        }
+
+        if (sink.is_valid()) {
+            flush();
+            if (n <= cap) {
+                return;
+            }
+
+            // a single write larger than chunk size, buffer it and flush on next write.
+            ensureBuffer(n);
+            out = buffer;
+            cap = n;
+            return;
+        }
+
+        size_t newCap = std::max(bufferCap * 2, len + n);
+        char *p = (char *)realloc(buffer, newCap);
+        if (p == nullptr) {
+            throw std::bad_alloc(); // LCOV_EXCL_LINE
+        }
+        buffer = p;
+        bufferCap = newCap;
+
+        if (external) {
+            memcpy(buffer, out, len);
+            external = false;
+            overflow = true;
+        }
+
+        out = buffer;
+        cap = std::min({bufferCap, maxSize, watchLimit});
+    }
+};
+
+// take an `EncodeContext` from pool of current thread, and put it back when it's destroyed.
+// see `pool.cpp`.
+class CtxMgr {
+public:
+    EncodeContext *ctx;
 
-    void writeLongLong(int64_t val) { fmt::format_to(std::back_inserter(buffer), "{}", val); }
+    CtxMgr();
+    ~CtxMgr();
 
-    void writeChar(const char c) { buffer.push_back(c); }
+    CtxMgr(const CtxMgr &) = delete;
+    CtxMgr &operator=(const CtxMgr &) = delete;
 };
@@ -0,0 +1,150 @@
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+#include "iterparse.hpp"
+
+namespace nb = nanobind;
+
+namespace {
+// interned event names, never released.
+struct EventNames {
+    PyObject *startList = PyUnicode_InternFromString("start_list");
+    PyObject *startDict = PyUnicode_InternFromString("start_dict");
+    PyObject *key = PyUnicode_InternFromString("key");
+    PyObject *int_ = PyUnicode_InternFromString("int");
+    PyObject *bytes = PyUnicode_InternFromString("bytes");
+    PyObject *end = PyUnicode_InternFromString("end");
+};
+} // namespace
+
+static const EventNames &eventNames() {
+    static EventNames names;
+    return names;
+}
+
+static nb::tuple event(PyObject *name, nb::handle value, Py_ssize_t offset) {
+    return nb::make_tuple(nb::handle(name), value, offset);
+}
+
+IterParser::IterParser(nb::handle b) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "bencode.iterparse should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    Py_buffer v;
+    if (PyObject_GetBuffer(b.ptr(), &v, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
+    source = std::make_shared<LazySource>(v);
+
+    view = nb::steal(PyMemoryView_FromObject(b.ptr()));
+    if (!view.is_valid()) {
+        throw nb::python_error();
+    }
+    view = view.attr("cast")("B").attr("toreadonly")();
+}
+
+nb::tuple IterParser::next() {
+    if (finished) {
+        throw nb::stop_iteration();
+    }
+
+    try {
+        return step();
+    } catch (...) {
+        finished = true;
+        throw;
+    }
+}
+
+nb::tuple IterParser::step() {
+    const char *buf = source->buf();
+    Py_ssize_t size = source->size();
+    const EventNames &names = eventNames();
+
+    if (size == 0) {
+        throw DecodeError("can't decode empty bytes");
+    }
+
+    if (started && stack.empty()) {
+        if (index != size) {
+            decoderError("invalid bencode data, parse end at index {} but total bytes length {}",
+                         index, size);
+        }
+        throw nb::stop_iteration();
+    }
+
+    started = true;
+
+    if (!stack.empty()) {
+        Frame &top = stack.back();
+
+        if (index >= size) {
+            decoderError("buffer overflow when decoding {}, index {}", top.isDict ? "dict" : "list",
+                         index);
+        }
+
+        if (buf[index] == 'e') {
+            stack.pop_back();
+            index = index + 1;
+            return event(names.end, nb::none(), index - 1);
+        }
+
+        if (top.isDict && top.expectKey) {
+            if (buf[index] < '0' || buf[index] > '9') {
+                decoderError("expecting bytes when parsing dict key, found {} instead, index {}",
+                             buf[index], index);
+            }
+
+            Py_ssize_t start = index;
+            auto key = decodeAsView(buf, index, size);
+            checkKeyOrder(top.lastKey, key, index);
+            if (index >= size) {
+                decoderError("buffer overflow when decoding dict, index {}", index);
+            }
+
+            top.expectKey = false;
+            return event(names.key, nb::bytes(key.data(), key.size()), start);
+        }
+
+        // next token of a dict is a key after this value
+        top.expectKey = true;
+    }
+
+    checkDepth(stack.size() + 1);
+
+    Py_ssize_t start = index;
+    char c = buf[index];
+
+    if (c == 'i') {
+        return event(names.int_, decodeInt(buf, index, size), start);
+    }
+
+    if (c >= '0' && c <= '9') {
+        auto s = decodeAsView(buf, index, size);
+        Py_ssize_t offset = s.data() - buf;
+        PyObject *o = PySequence_GetSlice(view.ptr(), offset, offset + s.size());
+        if (o == NULL) {
+            throw nb::python_error();
+        }
+        return event(names.bytes, nb::steal(o), start);
+    }
+
+    if (c == 'l') {
+        stack.push_back(Frame{false, false});
+        index = index + 1;
+        return event(names.startList, nb::none(), start);
+    }
+
+    if (c == 'd') {
+        stack.push_back(Frame{true, true});
+        index = index + 1;
+        return event(names.startDict, nb::none(), start);
+    }
+
+    decoderError("invalid bencode prefix '{:c}', index {}", c, index);
+}
+
+nb::object iterparse(nb::handle b) { return nb::cast(IterParser(b), nb::rv_policy::move); }
@@ -0,0 +1,38 @@
+#pragma once
+
+#include <memory>
+#include <optional>
+#include <string_view>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "lazy.hpp"
+
+namespace nb = nanobind;
+
+// iterator of `(event, value, offset)` parse events, values are not collected into containers.
+class IterParser {
+public:
+    IterParser(nb::handle b);
+
+    nb::tuple next();
+
+private:
+    struct Frame {
+        bool isDict;
+        // dict only, next token is a key
+        bool expectKey;
+        std::optional<std::string_view> lastKey = std::nullopt;
+    };
+
+    std::shared_ptr<LazySource> source;
+    // read-only memoryview of input, string values are sliced from it.
+    nb::object view;
+    Py_ssize_t index = 0;
+    gch::small_vector<Frame, 16> stack;
+    bool started = false;
+    bool finished = false;
+
+    nb::tuple step();
+};
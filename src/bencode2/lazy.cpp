@@ -0,0 +1,178 @@
+#include <algorithm>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+#include "lazy.hpp"
+
+namespace nb = nanobind;
+
+static nb::object lazyValue(const std::shared_ptr<LazySource> &source, Py_ssize_t index) {
+    const char *buf = source->buf();
+
+    if (buf[index] == 'l') {
+        return nb::cast(LazyList(source, index), nb::rv_policy::move);
+    }
+
+    if (buf[index] == 'd') {
+        return nb::cast(LazyDict(source, index), nb::rv_policy::move);
+    }
+
+    return decodeAny(DecodeContext{buf, source->size(), nb::object()}, index, 0);
+}
+
+LazyList::LazyList(std::shared_ptr<LazySource> source, Py_ssize_t index) : source(source) {
+    const char *buf = source->buf();
+    Py_ssize_t size = source->size();
+
+    // input is validated before any container is created.
+    index = index + 1;
+    while (buf[index] != 'e') {
+        offsets.push_back(index);
+        skipAny(buf, index, size, 0);
+    }
+
+    values.resize(offsets.size());
+}
+
+nb::object LazyList::getItem(Py_ssize_t i) {
+    Py_ssize_t size = offsets.size();
+    if (i < 0) {
+        i += size;
+    }
+
+    if (i < 0 || i >= size) {
+        throw nb::index_error("list index out of range");
+    }
+
+    if (!values[i].is_valid()) {
+        values[i] = lazyValue(source, offsets[i]);
+    }
+
+    return values[i];
+}
+
+nb::list LazyList::getSlice(nb::slice slice) {
+    auto [start, stop, step, length] = slice.compute(offsets.size());
+
+    nb::list l;
+    for (size_t i = 0; i < length; i++) {
+        l.append(getItem(start));
+        start += step;
+    }
+
+    return l;
+}
+
+bool LazyList::equal(nb::handle other) {
+    nb::list l;
+    for (size_t i = 0; i < offsets.size(); i++) {
+        l.append(getItem(i));
+    }
+
+    return l.equal(other);
+}
+
+LazyDict::LazyDict(std::shared_ptr<LazySource> source, Py_ssize_t index) : source(source) {
+    const char *buf = source->buf();
+    Py_ssize_t size = source->size();
+
+    // input is validated before any container is created.
+    index = index + 1;
+    while (buf[index] != 'e') {
+        auto key = decodeAsView(buf, index, size);
+        items.push_back(Item{key, index});
+        skipAny(buf, index, size, 0);
+    }
+
+    values.resize(items.size());
+}
+
+[[noreturn]] static void raiseKeyError(nb::handle key) {
+    PyErr_SetObject(PyExc_KeyError, key.ptr());
+    throw nb::python_error();
+}
+
+Py_ssize_t LazyDict::find(nb::handle key) const {
+    if (!PyBytes_Check(key.ptr())) {
+        return -1;
+    }
+
+    auto b = nb::borrow<nb::bytes>(key);
+    auto k = std::string_view(b.c_str(), b.size());
+
+    auto it = std::lower_bound(items.begin(), items.end(), k,
+                               [](const Item &item, std::string_view k) { return item.key < k; });
+
+    if (it == items.end() || it->key != k) {
+        return -1;
+    }
+
+    return it - items.begin();
+}
+
+nb::object LazyDict::getItem(nb::handle key) {
+    auto i = find(key);
+    if (i == -1) {
+        raiseKeyError(key);
+    }
+
+    if (!values[i].is_valid()) {
+        values[i] = lazyValue(source, items[i].offset);
+    }
+
+    return values[i];
+}
+
+bool LazyDict::contains(nb::handle key) const { return find(key) != -1; }
+
+nb::tuple LazyDict::span(nb::handle key) const {
+    auto i = find(key);
+    if (i == -1) {
+        raiseKeyError(key);
+    }
+
+    Py_ssize_t end = items[i].offset;
+    skipAny(source->buf(), end, source->size(), 0);
+
+    return nb::make_tuple(items[i].offset, end);
+}
+
+nb::object LazyDict::iter() const {
+    nb::list keys;
+    for (const auto &item : items) {
+        keys.append(nb::bytes(item.key.data(), item.key.size()));
+    }
+
+    return nb::iter(keys);
+}
+
+nb::object bdecode_lazy(nb::object b) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "bencode.bdecode_lazy should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
+
+    auto source = std::make_shared<LazySource>(view);
+
+    Py_ssize_t size = source->size();
+    if (size == 0) {
+        throw DecodeError("can't decode empty bytes");
+    }
+
+    Py_ssize_t index = 0;
+    skipAny(source->buf(), index, size, 0);
+
+    if (index != size) {
+        decoderError("invalid bencode data, parse end at index {} but total bytes length {}", index,
+                     size);
+    }
+
+    return lazyValue(source, 0);
+}
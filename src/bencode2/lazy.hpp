@@ -0,0 +1,76 @@
+#pragma once
+
+#include <memory>
+#include <string_view>
+#include <vector>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+
+namespace nb = nanobind;
+
+// input buffer shared by all lazy containers decoded from it.
+struct LazySource {
+    Py_buffer view;
+
+    LazySource(Py_buffer v) : view(v) {}
+
+    ~LazySource() { PyBuffer_Release(&view); }
+
+    const char *buf() const { return (const char *)view.buf; }
+
+    Py_ssize_t size() const { return view.len; }
+};
+
+// read-only Sequence, items are decoded on first access.
+class LazyList {
+public:
+    LazyList(std::shared_ptr<LazySource> source, Py_ssize_t index);
+
+    Py_ssize_t size() const { return offsets.size(); }
+
+    nb::object getItem(Py_ssize_t i);
+
+    nb::list getSlice(nb::slice slice);
+
+    bool equal(nb::handle other);
+
+private:
+    std::shared_ptr<LazySource> source;
+    // start of each item
+    std::vector<Py_ssize_t> offsets;
+    std::vector<nb::object> values;
+};
+
+// read-only Mapping, values are decoded on first access.
+class LazyDict {
+public:
+    LazyDict(std::shared_ptr<LazySource> source, Py_ssize_t index);
+
+    Py_ssize_t size() const { return items.size(); }
+
+    nb::object getItem(nb::handle key);
+
+    bool contains(nb::handle key) const;
+
+    nb::object iter() const;
+
+    // byte range of the encoded value of key in input buffer.
+    nb::tuple span(nb::handle key) const;
+
+private:
+    struct Item {
+        std::string_view key;
+        // start of value
+        Py_ssize_t offset;
+    };
+
+    std::shared_ptr<LazySource> source;
+    // sorted by key, decoder already checked it.
+    std::vector<Item> items;
+    std::vector<nb::object> values;
+
+    // return -1 if key is not found
+    Py_ssize_t find(nb::handle key) const;
+};
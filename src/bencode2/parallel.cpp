@@ -0,0 +1,196 @@
+#include <algorithm>
+#include <exception>
+#include <optional>
+#include <string_view>
+#include <system_error>
+#include <thread>
+#include <vector>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+
+// parallel decoder for large top-level list or dict.
+//
+// a sequential `skipAny` pass validates every top-level item and records where it starts,
+// then items are split into contiguous chunks of about the same size, and decoded on native
+// threads, each with its own intern cache. results are assembled in input order.
+//
+// it's only used on free-threaded python, where chunks are decoded at the same time. on other
+// builds workers would take turns on the GIL, which is slower than decoding on one thread,
+// so input is decoded by `decodeAny` instead.
+
+// find start of every top-level item, and dict keys.
+// return false if input is invalid, error should be raised by `decodeAny`.
+static bool scanItems(const char *buf, Py_ssize_t size, bool isDict,
+                      std::vector<Py_ssize_t> &starts, std::vector<std::string_view> &keys) {
+    Py_ssize_t index = 1;
+    std::optional<std::string_view> lastKey;
+
+    try {
+        while (1) {
+            if (index >= size) {
+                return false;
+            }
+
+            if (buf[index] == 'e') {
+                // end of last item
+                starts.push_back(index);
+                return index + 1 == size;
+            }
+
+            if (isDict) {
+                if (buf[index] < '0' || buf[index] > '9') {
+                    return false;
+                }
+
+                auto key = decodeAsView(buf, index, size);
+                checkKeyOrder(lastKey, key, index);
+                if (index >= size) {
+                    return false;
+                }
+                keys.push_back(key);
+            }
+
+            starts.push_back(index);
+            skipAny(buf, index, size, 1);
+        }
+    } catch (DecodeError &) {
+        return false;
+    }
+}
+
+nb::object decodeParallel(const DecodeContext &ctx) {
+#ifndef Py_GIL_DISABLED
+    return nb::object();
+#endif
+
+    const char *buf = ctx.buf;
+    Py_ssize_t size = ctx.size;
+
+    if (buf[0] != 'l' && buf[0] != 'd') {
+        return nb::object();
+    }
+
+    bool isDict = buf[0] == 'd';
+    std::vector<Py_ssize_t> starts;
+    std::vector<std::string_view> keys;
+
+    if (!scanItems(buf, size, isDict, starts, keys)) {
+        return nb::object();
+    }
+
+    size_t count = starts.size() - 1;
+    size_t workers = std::min((size_t)ctx.threads, count);
+    // more workers than cpu cores only add overhead, 0 means it's unknown.
+    size_t cores = std::thread::hardware_concurrency();
+    if (cores != 0) {
+        workers = std::min(workers, cores);
+    }
+    if (workers < 2) {
+        return nb::object();
+    }
+
+    // chunk w is items in [bounds[w], bounds[w + 1])
+    std::vector<size_t> bounds = {0};
+    Py_ssize_t total = starts[count] - starts[0];
+    for (size_t w = 1; w < workers; w++) {
+        Py_ssize_t target = starts[0] + (Py_ssize_t)(total * w / workers);
+        auto it = std::lower_bound(starts.begin() + bounds.back(), starts.begin() + count, target);
+        bounds.push_back(it - starts.begin());
+    }
+    bounds.push_back(count);
+
+    // new references, owned here until they are moved to result.
+    std::vector<PyObject *> values(count, nullptr);
+    std::vector<std::exception_ptr> errors(workers);
+
+    auto decodeChunk = [&](size_t w) {
+        try {
+            InternCache intern;
+            DecodeContext local{buf, size, nb::object(), nullptr, &intern};
+            for (size_t i = bounds[w]; i < bounds[w + 1]; i++) {
+                Py_ssize_t index = starts[i];
+                values[i] = decodeAny(local, index, 1).release().ptr();
+            }
+        } catch (...) {
+            errors[w] = std::current_exception();
+        }
+    };
+
+    std::vector<std::thread> pool;
+    // chunks decoded by current thread, first one and those a thread can't be started for.
+    std::vector<size_t> inlineChunks = {0};
+    for (size_t w = 1; w < workers; w++) {
+        try {
+            pool.emplace_back([&decodeChunk, w] {
+                nb::gil_scoped_acquire acquire;
+                decodeChunk(w);
+            });
+        } catch (std::system_error &) {
+            inlineChunks.push_back(w);
+        }
+    }
+
+    for (size_t w : inlineChunks) {
+        decodeChunk(w);
+    }
+
+    {
+        nb::gil_scoped_release release;
+        for (auto &t : pool) {
+            t.join();
+        }
+    }
+
+    for (auto &e : errors) {
+        if (e) {
+            for (PyObject *v : values) {
+                Py_XDECREF(v);
+            }
+            std::rethrow_exception(e);
+        }
+    }
+
+    if (!isDict) {
+        auto result = nb::steal<nb::list>(PyList_New(count));
+        if (!result.is_valid()) {
+            for (PyObject *v : values) {
+                Py_DECREF(v); // LCOV_EXCL_LINE
+            }
+            throw nb::python_error(); // LCOV_EXCL_LINE
+        }
+        for (size_t i = 0; i < count; i++) {
+#ifndef Py_LIMITED_API
+            PyList_SET_ITEM(result.ptr(), i, values[i]);
+#else
+            // item is stolen even on error
+            if (PyList_SetItem(result.ptr(), i, values[i]) != 0) {
+                for (size_t j = i + 1; j < count; j++) {
+                    Py_DECREF(values[j]); // LCOV_EXCL_LINE
+                }
+                throw nb::python_error(); // LCOV_EXCL_LINE
+            }
+#endif
+        }
+        return result;
+    }
+
+    nb::dict result;
+    for (size_t i = 0; i < count; i++) {
+        nb::object value = nb::steal(values[i]);
+        values[i] = nullptr;
+
+        nb::object key = ctx.intern != nullptr ? ctx.intern->keys.get(keys[i])
+                                               : nb::bytes(keys[i].data(), keys[i].size());
+        if (PyDict_SetItem(result.ptr(), key.ptr(), value.ptr()) != 0) {
+            for (PyObject *v : values) {
+                Py_XDECREF(v); // LCOV_EXCL_LINE
+            }
+            throw nb::python_error(); // LCOV_EXCL_LINE
+        }
+    }
+
+    return result;
+}
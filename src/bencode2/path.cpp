@@ -0,0 +1,191 @@
+#include <algorithm>
+#include <optional>
+#include <string_view>
+#include <vector>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+
+namespace nb = nanobind;
+
+namespace {
+// a dict key or a list index in path.
+struct PathItem {
+    bool isIndex;
+    std::string_view key;
+    Py_ssize_t index;
+
+    bool operator<(const PathItem &other) const {
+        if (isIndex != other.isIndex) {
+            return isIndex;
+        }
+        if (isIndex) {
+            return index < other.index;
+        }
+        return key < other.key;
+    }
+
+    bool operator==(const PathItem &other) const {
+        return isIndex == other.isIndex && (isIndex ? index == other.index : key == other.key);
+    }
+};
+
+using Path = std::vector<PathItem>;
+} // namespace
+
+static Path toPath(nb::handle path, std::vector<nb::object> &keep) {
+    Path p;
+    for (nb::handle item : path) {
+        keep.push_back(nb::borrow(item));
+        if (PyBytes_Check(item.ptr())) {
+            auto b = nb::borrow<nb::bytes>(item);
+            p.push_back(PathItem{false, std::string_view(b.c_str(), b.size())});
+        } else if (PyLong_Check(item.ptr()) && !PyBool_Check(item.ptr())) {
+            p.push_back(PathItem{true, {}, nb::cast<Py_ssize_t>(item)});
+        } else {
+            throw nb::type_error(fmt::format("path item must be bytes or int, not {}",
+                                             nb::type_name(item.type()).c_str())
+                                     .c_str());
+        }
+    }
+    return p;
+}
+
+// find values of paths in `ids`, they share first `level` items and value at index match them.
+//
+// only one container is opened for all paths with same prefix, items not in any path are
+// skipped, and a container is left as soon as all its paths are found or passed.
+static void findPaths(const DecodeContext &ctx, Py_ssize_t index, uint_fast32_t level,
+                      const std::vector<Path> &paths, std::vector<size_t> &ids, nb::list &results) {
+    const char *buf = ctx.buf;
+    Py_ssize_t size = ctx.size;
+
+    std::vector<size_t> rest;
+    nb::object whole;
+    for (size_t id : ids) {
+        if (paths[id].size() != level) {
+            rest.push_back(id);
+            continue;
+        }
+
+        if (!whole.is_valid()) {
+            Py_ssize_t i = index;
+            whole = decodeAny(ctx, i, level);
+        }
+        results[id] = whole;
+    }
+
+    if (rest.empty()) {
+        return;
+    }
+
+    char c = buf[index];
+    if (c != 'l' && c != 'd') {
+        return;
+    }
+
+    checkDepth(level + 1);
+
+    // dict keys in path of a list, or list indexes in path of a dict, don't exist.
+    std::erase_if(rest, [&](size_t id) { return paths[id][level].isIndex != (c == 'l'); });
+
+    std::sort(rest.begin(), rest.end(),
+              [&](size_t a, size_t b) { return paths[a][level] < paths[b][level]; });
+
+    index = index + 1;
+    std::optional<std::string_view> lastKey = std::nullopt;
+    Py_ssize_t count = 0;
+    size_t r = 0;
+
+    while (r < rest.size()) {
+        if (index >= size) {
+            decoderError("buffer overflow when decoding {}, index {}", c == 'd' ? "dict" : "list",
+                         index);
+        }
+
+        if (buf[index] == 'e') {
+            break;
+        }
+
+        PathItem current{c == 'l', {}, count++};
+        if (c == 'd') {
+            if (buf[index] < '0' || buf[index] > '9') {
+                decoderError("expecting bytes when parsing dict key, found {} instead, index {}",
+                             buf[index], index);
+            }
+            current.key = decodeAsView(buf, index, size);
+            checkKeyOrder(lastKey, current.key, index);
+            if (index >= size) {
+                decoderError("buffer overflow when decoding dict, index {}", index);
+            }
+        }
+
+        // items are sorted, paths before current item don't exist.
+        while (r < rest.size() && paths[rest[r]][level] < current) {
+            r++;
+        }
+
+        std::vector<size_t> matched;
+        while (r < rest.size() && paths[rest[r]][level] == current) {
+            matched.push_back(rest[r++]);
+        }
+
+        if (!matched.empty()) {
+            findPaths(ctx, index, level + 1, paths, matched, results);
+            if (r == rest.size()) {
+                break;
+            }
+        }
+
+        skipAny(buf, index, size, level + 1);
+    }
+}
+
+nb::list bdecode_paths(nb::object b, nb::iterable paths) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "bencode.bdecode_paths should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    std::vector<nb::object> keep;
+    std::vector<Path> parsed;
+    for (nb::handle path : paths) {
+        parsed.push_back(toPath(path, keep));
+    }
+
+    nb::list results;
+    std::vector<size_t> ids;
+    for (size_t i = 0; i < parsed.size(); i++) {
+        results.append(nb::none());
+        ids.push_back(i);
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
+
+    InternCache intern;
+    DecodeContext ctx{(const char *)view.buf, view.len, nb::object(), nullptr, &intern};
+
+    try {
+        if (ctx.size == 0) {
+            throw DecodeError("can't decode empty bytes");
+        }
+
+        findPaths(ctx, 0, 0, parsed, ids, results);
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
+    }
+
+    PyBuffer_Release(&view);
+
+    return results;
+}
+
+nb::object bdecode_path(nb::object b, nb::object path) {
+    return bdecode_paths(b, nb::borrow<nb::iterable>(nb::make_tuple(path)))[0];
+}
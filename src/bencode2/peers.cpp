@@ -0,0 +1,173 @@
+#include <cstring>
+#include <string>
+
+#ifdef _WIN32
+#include <ws2tcpip.h>
+#else
+#include <arpa/inet.h>
+#endif
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+
+namespace nb = nanobind;
+
+// compact peers of tracker response, BEP 23 and BEP 7.
+// each peer is 4 or 16 bytes of address and 2 bytes of port, in network byte order.
+
+static constexpr Py_ssize_t compactV4 = 4 + 2;
+static constexpr Py_ssize_t compactV6 = 16 + 2;
+
+static unsigned int peerPort(nb::handle port) {
+    nb::object index = nb::steal(PyNumber_Index(port.ptr()));
+    if (!index.is_valid()) {
+        throw nb::python_error();
+    }
+
+    int overflow = 0;
+    long value = PyLong_AsLongAndOverflow(index.ptr(), &overflow);
+    if (value == -1 && PyErr_Occurred()) {
+        throw nb::python_error(); // LCOV_EXCL_LINE
+    }
+
+    if (overflow != 0 || value < 0 || value > 65535) {
+        throw nb::value_error(
+            fmt::format("port must be in range 0-65535, not {}", nb::repr(index).c_str()).c_str());
+    }
+
+    return (unsigned int)value;
+}
+
+// inet_ntop of IPv4 goes through sprintf, this is much faster.
+static size_t formatIPv4(const unsigned char *addr, char *out) {
+    char *p = out;
+    for (int i = 0; i < 4; i++) {
+        if (i != 0) {
+            *p++ = '.';
+        }
+        unsigned int n = addr[i];
+        if (n >= 100) {
+            *p++ = (char)('0' + n / 100);
+        }
+        if (n >= 10) {
+            *p++ = (char)('0' + n / 10 % 10);
+        }
+        *p++ = (char)('0' + n % 10);
+    }
+    return p - out;
+}
+
+// tuple macros are not in limited API
+static inline Py_ssize_t tupleSize(PyObject *t) {
+#ifndef Py_LIMITED_API
+    return PyTuple_GET_SIZE(t);
+#else
+    return PyTuple_Size(t);
+#endif
+}
+
+static inline PyObject *tupleItem(PyObject *t, Py_ssize_t i) {
+#ifndef Py_LIMITED_API
+    return PyTuple_GET_ITEM(t, i);
+#else
+    return PyTuple_GetItem(t, i);
+#endif
+}
+
+nb::bytes pack_peers(nb::iterable peers) {
+    std::string out;
+    int family = 0;
+
+    for (nb::handle peer : peers) {
+        if (!PyTuple_Check(peer.ptr()) || tupleSize(peer.ptr()) != 2) {
+            throw nb::type_error(fmt::format("peer must be a (ip, port) tuple, not {}",
+                                             nb::type_name(peer.type()).c_str())
+                                     .c_str());
+        }
+
+        nb::handle ip = tupleItem(peer.ptr(), 0);
+        if (!PyUnicode_Check(ip.ptr())) {
+            throw nb::type_error(
+                fmt::format("ip must be str, not {}", nb::type_name(ip.type()).c_str()).c_str());
+        }
+
+        Py_ssize_t size;
+        const char *s = PyUnicode_AsUTF8AndSize(ip.ptr(), &size);
+        if (s == nullptr) {
+            throw nb::python_error();
+        }
+
+        int f = std::memchr(s, ':', size) != nullptr ? AF_INET6 : AF_INET;
+        if (family == 0) {
+            family = f;
+        } else if (family != f) {
+            throw nb::value_error("can't mix IPv4 and IPv6 peers");
+        }
+
+        unsigned char addr[16];
+        if ((size_t)size != std::strlen(s) || inet_pton(f, s, addr) != 1) {
+            throw nb::value_error(
+                fmt::format("invalid IP address {}", nb::repr(ip).c_str()).c_str());
+        }
+
+        unsigned int port = peerPort(tupleItem(peer.ptr(), 1));
+
+        out.append((const char *)addr, f == AF_INET ? 4 : 16);
+        out.push_back((char)(port >> 8));
+        out.push_back((char)(port & 0xff));
+    }
+
+    return nb::bytes(out.data(), out.size());
+}
+
+nb::list unpack_peers(nb::handle b, bool ipv6) {
+    if (!PyObject_CheckBuffer(b.ptr())) {
+        throw nb::type_error(
+            "bencode.unpack_peers should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(b.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
+
+    Py_ssize_t record = ipv6 ? compactV6 : compactV4;
+    const unsigned char *buf = (const unsigned char *)view.buf;
+
+    try {
+        if (view.len % record != 0) {
+            throw nb::value_error(
+                fmt::format("compact peers length {} is not a multiple of {}", view.len, record)
+                    .c_str());
+        }
+
+        nb::list result = nb::steal<nb::list>(PyList_New(view.len / record));
+        if (!result.is_valid()) {
+            throw nb::python_error(); // LCOV_EXCL_LINE
+        }
+
+        char ip[INET6_ADDRSTRLEN];
+        for (Py_ssize_t i = 0; i < view.len / record; i++) {
+            const unsigned char *p = buf + i * record;
+            size_t len =
+                ipv6 ? std::strlen(inet_ntop(AF_INET6, p, ip, sizeof(ip))) : formatIPv4(p, ip);
+
+            unsigned int port = (p[record - 2] << 8) | p[record - 1];
+            PyObject *peer = nb::make_tuple(nb::str(ip, len), port).release().ptr();
+#ifndef Py_LIMITED_API
+            PyList_SET_ITEM(result.ptr(), i, peer);
+#else
+            if (PyList_SetItem(result.ptr(), i, peer) != 0) {
+                throw nb::python_error(); // LCOV_EXCL_LINE
+            }
+#endif
+        }
+
+        PyBuffer_Release(&view);
+        return result;
+    } catch (...) {
+        PyBuffer_Release(&view);
+        throw;
+    }
+}
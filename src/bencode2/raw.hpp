@@ -0,0 +1,30 @@
+#pragma once
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+
+namespace nb = nanobind;
+
+extern void bvalidate(nb::handle b);
+
+// pre-encoded bencode value, checked once and written to encoder output as it is.
+class Raw {
+public:
+    nb::bytes value;
+
+    explicit Raw(nb::handle b) {
+        if (!PyObject_CheckBuffer(b.ptr())) {
+            throw nb::type_error(fmt::format("Raw value must be bytes-like object, not {}",
+                                             nb::type_name(b.type()).c_str())
+                                     .c_str());
+        }
+
+        value = nb::steal<nb::bytes>(PyBytes_FromObject(b.ptr()));
+        if (!value.is_valid()) {
+            throw nb::python_error(); // LCOV_EXCL_LINE
+        }
+
+        bvalidate(value);
+    }
+};
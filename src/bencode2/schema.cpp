@@ -0,0 +1,278 @@
+#include <optional>
+#include <string_view>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+
+namespace nb = nanobind;
+
+// bencode2.__schema.compile_plan
+nb::object compile_plan;
+
+// same value as KIND_* in __schema.py
+enum class Kind : long {
+    Any = 0,
+    Int = 1,
+    Bool = 2,
+    Bytes = 3,
+    Str = 4,
+    List = 5,
+    Dict = 6,
+    Dataclass = 7,
+};
+
+static const char *typeName(char c) {
+    if (c == 'i') {
+        return "int";
+    }
+    if (c == 'l') {
+        return "list";
+    }
+    if (c == 'd') {
+        return "dict";
+    }
+    return "bytes";
+}
+
+static void expectType(const DecodeContext &ctx, Py_ssize_t index, const char *expected, bool ok) {
+    char c = ctx.buf[index];
+    if (c != 'i' && c != 'l' && c != 'd' && (c < '0' || c > '9')) {
+        decoderError("invalid bencode prefix '{:c}', index {}", c, index);
+    }
+
+    if (!ok) {
+        decoderError("invalid type, expecting {}, found {}. index {}", expected, typeName(c),
+                     index);
+    }
+}
+
+static nb::object toStr(std::string_view s, Py_ssize_t index) {
+    PyObject *o = PyUnicode_DecodeUTF8(s.data(), s.size(), "strict");
+    if (o == NULL) {
+        PyErr_Clear();
+        decoderError("invalid utf-8 string. index {}", index);
+    }
+    return nb::steal(o);
+}
+
+static Kind planKind(nb::handle plan) {
+    return (Kind)PyLong_AsLong(PyTuple_GetItem(plan.ptr(), 0));
+}
+
+namespace {
+// a list, dict or dataclass being decoded by `decodeTyped`.
+struct TypedFrame {
+    Kind kind;
+    // list, dict, or keyword arguments of dataclass
+    nb::object container;
+    // list item or dict value plan, fields of dataclass
+    nb::handle plan;
+    // dataclass type
+    nb::object cls;
+    // dict key or field name of the value being decoded
+    nb::object key;
+    // plan of the value being decoded
+    nb::handle valuePlan;
+    bool strKeys = false;
+    // index of next field of dataclass
+    Py_ssize_t field = 0;
+    std::optional<std::string_view> lastKey = std::nullopt;
+};
+} // namespace
+
+// decode scalar value, or push a frame for list, dict or dataclass.
+static nb::object decodeTypedValue(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth,
+                                   nb::handle plan, gch::small_vector<TypedFrame, 16> &stack) {
+    auto kind = planKind(plan);
+    if (kind == Kind::Any) {
+        return decodeAny(ctx, index, depth);
+    }
+
+    checkDepth(depth + 1);
+
+    char c = ctx.buf[index];
+
+    switch (kind) {
+    case Kind::Any:
+        break;
+    case Kind::Int:
+        expectType(ctx, index, "int", c == 'i');
+        return decodeInt(ctx.buf, index, ctx.size);
+    case Kind::Bool: {
+        expectType(ctx, index, "int", c == 'i');
+        auto start = index;
+        auto v = decodeInt(ctx.buf, index, ctx.size);
+        if (v.equal(nb::int_(0))) {
+            return nb::bool_(false);
+        }
+        if (v.equal(nb::int_(1))) {
+            return nb::bool_(true);
+        }
+        decoderError("invalid bool value, index {}", start);
+    }
+    case Kind::Bytes:
+        expectType(ctx, index, "bytes", c >= '0' && c <= '9');
+        return decodeBytes(ctx, index);
+    case Kind::Str: {
+        expectType(ctx, index, "bytes", c >= '0' && c <= '9');
+        auto start = index;
+        return toStr(decodeAsView(ctx.buf, index, ctx.size), start);
+    }
+    case Kind::List:
+        expectType(ctx, index, "list", c == 'l');
+        stack.push_back(TypedFrame{kind, nb::list(), PyTuple_GetItem(plan.ptr(), 1)});
+        index = index + 1;
+        return nb::object();
+    case Kind::Dict: {
+        expectType(ctx, index, "dict", c == 'd');
+        TypedFrame frame{kind, nb::dict(), PyTuple_GetItem(plan.ptr(), 2)};
+        frame.strKeys = PyTuple_GetItem(plan.ptr(), 1) == Py_True;
+        stack.push_back(std::move(frame));
+        index = index + 1;
+        return nb::object();
+    }
+    case Kind::Dataclass: {
+        expectType(ctx, index, "dict", c == 'd');
+        nb::object cls = nb::handle(PyTuple_GetItem(plan.ptr(), 1))();
+        if (cls.is_none()) {
+            throw nb::type_error("dataclass of decode plan is garbage collected");
+        }
+        TypedFrame frame{kind, nb::dict(), PyTuple_GetItem(plan.ptr(), 2)};
+        frame.cls = std::move(cls);
+        stack.push_back(std::move(frame));
+        index = index + 1;
+        return nb::object();
+    }
+    }
+
+    throw std::runtime_error("unknown decode plan"); // LCOV_EXCL_LINE
+}
+
+// construct dataclass from decoded fields, after all keys are read.
+static nb::object finishDataclass(TypedFrame &top) {
+    auto kwargs = nb::borrow<nb::dict>(top.container);
+    Py_ssize_t fieldCount = PyList_Size(top.plan.ptr());
+    for (Py_ssize_t i = 0; i < fieldCount; i++) {
+        PyObject *field = PyList_GetItem(top.plan.ptr(), i);
+        auto name = nb::handle(PyTuple_GetItem(field, 1));
+        if (PyTuple_GetItem(field, 3) == Py_True && !kwargs.contains(name)) {
+            decoderError("missing field '{}' of {}", nb::str(name).c_str(),
+                         nb::str(top.cls.attr("__qualname__")).c_str());
+        }
+    }
+
+    PyObject *o = PyObject_Call(top.cls.ptr(), nb::tuple().ptr(), kwargs.ptr());
+    if (o == NULL) {
+        throw nb::python_error();
+    }
+
+    return nb::steal(o);
+}
+
+// read next dict key, return false if it's an unknown field of dataclass and is skipped.
+static bool readKey(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth,
+                    TypedFrame &top) {
+    if (ctx.buf[index] < '0' || ctx.buf[index] > '9') {
+        decoderError("expecting bytes when parsing dict key, found {} instead, index {}",
+                     ctx.buf[index], index);
+    }
+
+    auto keyStart = index;
+    auto key = decodeAsView(ctx.buf, index, ctx.size);
+    checkKeyOrder(top.lastKey, key, index);
+    if (index >= ctx.size) {
+        decoderError("buffer overflow when decoding dict, index {}", index);
+    }
+
+    if (top.kind == Kind::Dict) {
+        if (top.strKeys) {
+            top.key = toStr(key, keyStart);
+        } else if (ctx.intern != nullptr) {
+            top.key = ctx.intern->keys.get(key);
+        } else {
+            top.key = nb::bytes(key.data(), key.size());
+        }
+        top.valuePlan = top.plan;
+        return true;
+    }
+
+    // keys in input and fields in plan are both sorted, match them in one pass,
+    // unknown keys are validated and skipped.
+    Py_ssize_t fieldCount = PyList_Size(top.plan.ptr());
+    while (top.field < fieldCount) {
+        PyObject *field = PyList_GetItem(top.plan.ptr(), top.field);
+        auto k = nb::borrow<nb::bytes>(PyTuple_GetItem(field, 0));
+        auto fieldKey = std::string_view(k.c_str(), k.size());
+        if (fieldKey > key) {
+            break;
+        }
+        top.field++;
+        if (fieldKey == key) {
+            top.key = nb::borrow(PyTuple_GetItem(field, 1));
+            top.valuePlan = PyTuple_GetItem(field, 2);
+            return true;
+        }
+    }
+
+    skipAny(ctx.buf, index, ctx.size, depth);
+    return false;
+}
+
+// containers are kept in an explicit stack like `decodeAny`,
+// so nesting depth is not limited by size of C stack.
+nb::object decodeTyped(const DecodeContext &ctx, Py_ssize_t &index, uint_fast32_t depth,
+                       nb::handle plan) {
+    gch::small_vector<TypedFrame, 16> stack;
+
+    while (1) {
+        nb::object value = decodeTypedValue(ctx, index, depth + stack.size(), plan, stack);
+
+        // add finished value to its container and close containers ending here,
+        // until index is at the start of next value.
+        while (1) {
+            if (value.is_valid()) {
+                if (stack.empty()) {
+                    return value;
+                }
+
+                TypedFrame &top = stack.back();
+                if (top.kind == Kind::List) {
+                    if (PyList_Append(top.container.ptr(), value.ptr()) != 0) {
+                        throw nb::python_error();
+                    }
+                } else if (PyDict_SetItem(top.container.ptr(), top.key.ptr(), value.ptr()) != 0) {
+                    throw nb::python_error();
+                }
+            }
+
+            TypedFrame &top = stack.back();
+
+            if (index >= ctx.size) {
+                decoderError("buffer overflow when decoding {}, index {}",
+                             top.kind == Kind::List ? "list" : "dict", index);
+            }
+
+            if (ctx.buf[index] == 'e') {
+                index = index + 1;
+                value =
+                    top.kind == Kind::Dataclass ? finishDataclass(top) : std::move(top.container);
+                stack.pop_back();
+                continue;
+            }
+
+            if (top.kind == Kind::List) {
+                plan = top.plan;
+                break;
+            }
+
+            if (readKey(ctx, index, depth + stack.size(), top)) {
+                plan = top.valuePlan;
+                break;
+            }
+
+            value = nb::object();
+        }
+    }
+}
@@ -0,0 +1,135 @@
+#include <algorithm>
+#include <cstring>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+#include "stream.hpp"
+
+namespace nb = nanobind;
+
+nb::list StreamDecoder::feed(nb::handle chunk) {
+    if (!PyObject_CheckBuffer(chunk.ptr())) {
+        throw nb::type_error(
+            "StreamDecoder.feed should be called with bytes/memoryview/bytearray/Buffer");
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(chunk.ptr(), &view, PyBUF_SIMPLE) != 0) {
+        throw nb::python_error();
+    }
+
+    buffer.insert(buffer.end(), (const char *)view.buf, (const char *)view.buf + view.len);
+    PyBuffer_Release(&view);
+
+    nb::list values;
+
+    const char *buf = buffer.data();
+    size_t size = buffer.size();
+    // start of current top-level value
+    size_t start = 0;
+
+    try {
+        while (index < size) {
+            switch (state) {
+            case State::String: {
+                size_t n = std::min((size_t)length, size - index);
+                index += n;
+                length -= n;
+                if (length != 0) {
+                    continue;
+                }
+                state = State::Value;
+                break;
+            }
+            case State::Int: {
+                auto e = (const char *)memchr(buf + index, 'e', size - index);
+                if (e == nullptr) {
+                    index = size;
+                    continue;
+                }
+                index = e - buf + 1;
+                state = State::Value;
+                break;
+            }
+            case State::Length: {
+                char c = buf[index];
+                if (c == ':') {
+                    index++;
+                    if (length != 0) {
+                        state = State::String;
+                        continue;
+                    }
+                    state = State::Value;
+                    break;
+                }
+                if (c < '0' || c > '9') {
+                    decoderError("invalid bytes length, found '{:c}' at {}", c, index);
+                }
+                if (length > (PY_SSIZE_T_MAX - 9) / 10) {
+                    decoderError("bytes length overflow, index {}", index);
+                }
+                length = length * 10 + (c - '0');
+                index++;
+                continue;
+            }
+            case State::Value: {
+                char c = buf[index];
+                if (c == 'i') {
+                    state = State::Int;
+                    index++;
+                    continue;
+                }
+                if (c >= '0' && c <= '9') {
+                    state = State::Length;
+                    length = c - '0';
+                    index++;
+                    continue;
+                }
+                if (c == 'l' || c == 'd') {
+                    depth++;
+                    checkDepth(depth);
+                    index++;
+                    continue;
+                }
+                if (c == 'e' && depth != 0) {
+                    depth--;
+                    index++;
+                    break;
+                }
+                decoderError("invalid bencode prefix '{:c}', index {}", c, index);
+            }
+            }
+
+            // a value end at index, decode it if it's a top-level value
+            if (depth == 0) {
+                values.append(decodeBuffer(buf + start, index - start));
+                start = index;
+            }
+        }
+    } catch (...) {
+        reset();
+        throw;
+    }
+
+    buffer.erase(buffer.begin(), buffer.begin() + start);
+    index -= start;
+
+    return values;
+}
+
+void StreamDecoder::close() {
+    if (!buffer.empty()) {
+        reset();
+        throw DecodeError("incomplete bencode value at end of stream");
+    }
+}
+
+void StreamDecoder::reset() {
+    buffer.clear();
+    index = 0;
+    state = State::Value;
+    depth = 0;
+    length = 0;
+}
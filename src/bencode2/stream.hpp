@@ -0,0 +1,34 @@
+#pragma once
+
+#include <vector>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+
+namespace nb = nanobind;
+
+// incremental decoder, accept data in chunks and decode every complete top-level value.
+//
+// bytes are only scanned once to find the boundary of top-level values,
+// the scanner state is kept between `feed` calls.
+class StreamDecoder {
+public:
+    nb::list feed(nb::handle chunk);
+
+    void close();
+
+private:
+    enum class State : uint8_t { Value, Int, Length, String };
+
+    // unconsumed data, always start with the current top-level value
+    std::vector<char> buffer;
+    // bytes before index are already scanned
+    size_t index = 0;
+    State state = State::Value;
+    uint_fast32_t depth = 0;
+    // length of current string, or remaining bytes of current string in `State::String`
+    Py_ssize_t length = 0;
+
+    void reset();
+};
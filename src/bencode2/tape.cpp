@@ -0,0 +1,287 @@
+#include <optional>
+#include <string_view>
+#include <vector>
+
+#include <nanobind/nanobind.h>
+
+#include "common.hpp"
+#include "decode.hpp"
+
+// two stage decoder for large input.
+//
+// first stage validates the whole input and records item count of every list and dict,
+// without touching any python object. second stage walks input again without any check
+// and builds python objects, lists are created with their final size.
+//
+// unlike JSON, bencode strings are length-prefixed and may contain any byte, so structural
+// chars can't be found by a bulk scan ahead of parsing lengths, first stage is a tight
+// scalar loop instead.
+
+namespace {
+
+struct OpenContainer {
+    size_t count;
+    bool isDict;
+    std::string_view key = {};
+    std::optional<std::string_view> lastKey = std::nullopt;
+};
+
+struct BuildFrame {
+    nb::object container;
+    bool isDict;
+    Py_ssize_t size;
+    Py_ssize_t filled = 0;
+    nb::object key = {};
+};
+
+} // namespace
+
+// same rule as `checkInt`, index is at 'i'.
+static inline bool scanInt(const char *buf, Py_ssize_t size, Py_ssize_t &index) {
+    Py_ssize_t i = index + 1;
+    bool negative = false;
+    if (i < size && buf[i] == '-') {
+        negative = true;
+        i++;
+    }
+
+    Py_ssize_t digits = i;
+    while (i < size && buf[i] >= '0' && buf[i] <= '9') {
+        i++;
+    }
+
+    if (i >= size || buf[i] != 'e' || i == digits) {
+        return false;
+    }
+
+    if (buf[digits] == '0' && (negative || i - digits != 1)) {
+        return false;
+    }
+
+    index = i + 1;
+    return true;
+}
+
+// same rule as `decodeAsView`, index is at first digit of length.
+static inline bool scanBytes(const char *buf, Py_ssize_t size, Py_ssize_t &index,
+                             std::string_view &s) {
+    Py_ssize_t i = index;
+    Py_ssize_t len = 0;
+    while (i < size && buf[i] >= '0' && buf[i] <= '9') {
+        if (len > (PY_SSIZE_T_MAX - 9) / 10) {
+            return false;
+        }
+        len = len * 10 + (buf[i] - '0');
+        i++;
+    }
+
+    if (i >= size || buf[i] != ':') {
+        return false;
+    }
+
+    if (buf[index] == '0' && i != index + 1) {
+        return false;
+    }
+
+    if (i + len >= size) {
+        return false;
+    }
+
+    s = std::string_view(buf + i + 1, len);
+    index = i + 1 + len;
+    return true;
+}
+
+// first stage, `counts` is item count of each container, in the order they start.
+// return false if input is not valid bencode.
+static bool countItems(const char *buf, Py_ssize_t size, std::vector<Py_ssize_t> &counts) {
+    Py_ssize_t maxDepth = maxDecodeDepth.load(std::memory_order_relaxed);
+    Py_ssize_t index = 0;
+
+    gch::small_vector<OpenContainer, 16> stack;
+
+    while (1) {
+        if ((Py_ssize_t)stack.size() + 1 > maxDepth) {
+            return false;
+        }
+
+        bool finished = true;
+        char c = buf[index];
+
+        if (c == 'i') {
+            if (!scanInt(buf, size, index)) {
+                return false;
+            }
+        } else if (c >= '0' && c <= '9') {
+            std::string_view s;
+            if (!scanBytes(buf, size, index, s)) {
+                return false;
+            }
+        } else if (c == 'l' || c == 'd') {
+            stack.push_back(OpenContainer{counts.size(), c == 'd'});
+            counts.push_back(0);
+            index = index + 1;
+            finished = false;
+        } else {
+            return false;
+        }
+
+        while (1) {
+            if (finished) {
+                if (stack.empty()) {
+                    return index == size;
+                }
+
+                OpenContainer &top = stack.back();
+                if (top.isDict) {
+                    if (top.lastKey.has_value() && top.key <= top.lastKey.value()) {
+                        return false;
+                    }
+                    top.lastKey = top.key;
+                }
+                counts[top.count]++;
+            }
+
+            OpenContainer &top = stack.back();
+
+            if (index >= size) {
+                return false;
+            }
+
+            if (buf[index] == 'e') {
+                stack.pop_back();
+                index = index + 1;
+                finished = true;
+                continue;
+            }
+
+            if (top.isDict) {
+                if (buf[index] < '0' || buf[index] > '9') {
+                    return false;
+                }
+                if (!scanBytes(buf, size, index, top.key) || index >= size) {
+                    return false;
+                }
+            }
+
+            break;
+        }
+    }
+}
+
+// read length of a valid string at index, and move index to its content.
+static inline std::string_view readBytes(const char *buf, Py_ssize_t &index) {
+    Py_ssize_t len = 0;
+    while (buf[index] != ':') {
+        len = len * 10 + (buf[index] - '0');
+        index++;
+    }
+
+    std::string_view s(buf + index + 1, len);
+    index = index + 1 + len;
+    return s;
+}
+
+// second stage, input is valid.
+static nb::object buildValue(const DecodeContext &ctx, const std::vector<Py_ssize_t> &counts) {
+    const char *buf = ctx.buf;
+    Py_ssize_t index = 0;
+    size_t container = 0;
+
+    gch::small_vector<BuildFrame, 16> stack;
+
+    while (1) {
+        nb::object value;
+        char c = buf[index];
+
+        if (c == 'i') {
+            Py_ssize_t start = index + (buf[index + 1] == '-' ? 2 : 1);
+            Py_ssize_t end = start;
+            while (buf[end] != 'e') {
+                end++;
+            }
+
+            if (end - start <= 18) {
+                int64_t val = 0;
+                for (Py_ssize_t i = start; i < end; i++) {
+                    val = val * 10 + (buf[i] - '0');
+                }
+                value = nb::steal(PyLong_FromLongLong(buf[index + 1] == '-' ? -val : val));
+                index = end + 1;
+            } else {
+                value = decodeInt(buf, index, ctx.size);
+            }
+        } else if (c >= '0' && c <= '9') {
+            value = bytesValue(ctx, readBytes(buf, index));
+        } else {
+            Py_ssize_t n = counts[container++];
+            if (c == 'l') {
+                value = nb::steal(PyList_New(n));
+                if (!value.is_valid()) {
+                    throw nb::python_error(); // LCOV_EXCL_LINE
+                }
+            } else {
+                value = nb::dict();
+            }
+            index = index + 1;
+
+            if (n != 0) {
+                stack.push_back(BuildFrame{std::move(value), c == 'd', n});
+            } else {
+                // skip 'e'
+                index = index + 1;
+            }
+        }
+
+        if (value.is_valid()) {
+            while (1) {
+                if (stack.empty()) {
+                    return value;
+                }
+
+                BuildFrame &top = stack.back();
+                if (top.isDict) {
+                    if (PyDict_SetItem(top.container.ptr(), top.key.ptr(), value.ptr()) != 0) {
+                        throw nb::python_error(); // LCOV_EXCL_LINE
+                    }
+                } else {
+#ifndef Py_LIMITED_API
+                    PyList_SET_ITEM(top.container.ptr(), top.filled, value.release().ptr());
+#else
+                    if (PyList_SetItem(top.container.ptr(), top.filled, value.release().ptr()) !=
+                        0) {
+                        throw nb::python_error(); // LCOV_EXCL_LINE
+                    }
+#endif
+                }
+
+                top.filled++;
+                if (top.filled < top.size) {
+                    break;
+                }
+
+                // skip 'e'
+                index = index + 1;
+                value = std::move(top.container);
+                stack.pop_back();
+            }
+        }
+
+        BuildFrame &top = stack.back();
+        if (top.isDict) {
+            auto key = readBytes(buf, index);
+            top.key = ctx.intern != nullptr ? ctx.intern->keys.get(key)
+                                            : nb::bytes(key.data(), key.size());
+        }
+    }
+}
+
+nb::object decodeTape(const DecodeContext &ctx) {
+    std::vector<Py_ssize_t> counts;
+
+    if (!countItems(ctx.buf, ctx.size, counts)) {
+        return nb::object();
+    }
+
+    return buildValue(ctx, counts);
+}
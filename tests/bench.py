@@ -2,10 +2,25 @@ import dataclasses
 import sys
 from pathlib import Path
 
+import pytest
+
 from bencode2.__bencode import bdecode as cpp_bdecode
+from bencode2.__bencode import bdecode_many as cpp_bdecode_many
+from bencode2.__bencode import bdecode_path as cpp_bdecode_path
 from bencode2.__bencode import bencode as cpp_bencode
+from bencode2.__bencode import bencode_many as cpp_bencode_many
+from bencode2.__bencode import bencoded_size as cpp_bencoded_size
+from bencode2.__bencode import pack_peers as cpp_pack_peers
+from bencode2.__bencode import unpack_peers as cpp_unpack_peers
 from bencode2.__decoder import bdecode as py_bdecode
+from bencode2.__decoder import bdecode_lazy as py_bdecode_lazy
+from bencode2.__decoder import bdecode_many as py_bdecode_many
+from bencode2.__decoder import bdecode_path as py_bdecode_path
+from bencode2.__decoder import unpack_peers as py_unpack_peers
 from bencode2.__encoder import bencode as py_bencode
+from bencode2.__encoder import bencode_many as py_bencode_many
+from bencode2.__encoder import bencoded_size as py_bencoded_size
+from bencode2.__encoder import pack_peers as py_pack_peers
 
 # a parametrize to make codspeed add python version to benchmark
 py = f"{sys.version_info.major}.{sys.version_info.minor}"
@@ -17,6 +32,21 @@ compat_peers_py = {
     "peers6": b"1" * 18 * 50,
 }
 
+# 50 peers of each address family
+peers_v4 = [(f"10.0.{i}.{i + 1}", 6881 + i) for i in range(50)]
+peers_v6 = [(f"2001:db8::{i:x}:1", 6881 + i) for i in range(50)]
+
+# DHT ping query
+krpc_message = {
+    "a": {"id": b"abcdefghij0123456789"},
+    "q": "ping",
+    "t": "aa",
+    "y": "q",
+}
+
+krpc_batch = [krpc_message] * 1000
+krpc_encoded_batch = [py_bencode(krpc_message)] * 1000
+
 single_file_torrent = (
     Path(__file__)
     .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
@@ -70,6 +100,22 @@ def test_benchmark_decode_single_file_torrent_py(benchmark):
     benchmark(py_bdecode, single_file_torrent)
 
 
+def test_benchmark_decode_path_single_file_torrent_cpp(benchmark):
+    benchmark(cpp_bdecode_path, single_file_torrent, [b"info", b"name"])
+
+
+def test_benchmark_decode_path_single_file_torrent_py(benchmark):
+    benchmark(py_bdecode_path, single_file_torrent, [b"info", b"name"])
+
+
+def test_benchmark_decode_index_single_file_torrent_cpp(benchmark):
+    benchmark(lambda: cpp_bdecode(single_file_torrent)[b"info"][b"name"])
+
+
+def test_benchmark_decode_index_single_file_torrent_py(benchmark):
+    benchmark(lambda: py_bdecode(single_file_torrent)[b"info"][b"name"])
+
+
 def test_benchmark_encode_single_file_torrent_cpp(benchmark):
     benchmark(cpp_bencode, py_bdecode(single_file_torrent))
 
@@ -86,6 +132,36 @@ def test_benchmark_decode_multiple_files_torrent_py(benchmark):
     benchmark(py_bdecode, multiple_files_torrent)
 
 
+many_files = py_bencode(
+    [{b"length": i * 1000, b"path": [b"dir", b"file%d" % i]} for i in range(100_000)]
+)
+
+
+def test_benchmark_decode_many_files_cpp(benchmark):
+    benchmark(cpp_bdecode, many_files)
+
+
+@pytest.mark.parametrize("threads", [2, 4, 8])
+def test_benchmark_decode_many_files_threads_cpp(benchmark, threads):
+    benchmark(cpp_bdecode, many_files, threads=threads)
+
+
+def test_benchmark_decode_lazy_single_file_torrent_py(benchmark):
+    benchmark(py_bdecode_lazy, single_file_torrent)
+
+
+def test_benchmark_decode_lazy_multiple_files_torrent_py(benchmark):
+    benchmark(py_bdecode_lazy, multiple_files_torrent)
+
+
+def test_benchmark_decode_long_strings_py(benchmark):
+    benchmark(py_bdecode, py_bencode([b"x" * 100_000] * 100))
+
+
+def test_benchmark_decode_deep_nested_py(benchmark):
+    benchmark(py_bdecode, b"l" * 4000 + b"e" * 4000)
+
+
 def test_benchmark_encode_multiple_files_torrent_cpp(benchmark):
     benchmark(cpp_bencode, py_bdecode(multiple_files_torrent))
 
@@ -94,6 +170,18 @@ def test_benchmark_encode_multiple_files_torrent_py(benchmark):
     benchmark(py_bencode, py_bdecode(multiple_files_torrent))
 
 
+def test_benchmark_encode_long_strings_cpp(benchmark):
+    benchmark(cpp_bencode, [b"x" * 100_000] * 100)
+
+
+def test_benchmark_encoded_size_single_file_torrent_cpp(benchmark):
+    benchmark(cpp_bencoded_size, py_bdecode(single_file_torrent))
+
+
+def test_benchmark_encoded_size_single_file_torrent_py(benchmark):
+    benchmark(py_bencoded_size, py_bdecode(single_file_torrent))
+
+
 @dataclasses.dataclass(frozen=True, slots=True)
 class AnnounceCompatResponse:
     interval: int
@@ -111,3 +199,91 @@ def test_benchmark_encode_compact_peers_dataclass_cpp(benchmark):
 
 def test_benchmark_encode_compact_peers_dataclass_py(benchmark):
     benchmark(py_bencode, AnnounceCompatResponse(**compat_peers_py))
+
+
+def test_benchmark_encode_announce_pack_peers_cpp(benchmark):
+    benchmark(
+        lambda: cpp_bencode(
+            AnnounceCompatResponse(
+                3600, cpp_pack_peers(peers_v4), cpp_pack_peers(peers_v6)
+            )
+        )
+    )
+
+
+def test_benchmark_encode_announce_pack_peers_py(benchmark):
+    benchmark(
+        lambda: py_bencode(
+            AnnounceCompatResponse(
+                3600, py_pack_peers(peers_v4), py_pack_peers(peers_v6)
+            )
+        )
+    )
+
+
+def test_benchmark_decode_announce_unpack_peers_cpp(benchmark):
+    raw = py_bencode(
+        {
+            "interval": 3600,
+            "peers": py_pack_peers(peers_v4),
+            "peers6": py_pack_peers(peers_v6),
+        }
+    )
+
+    def f():
+        value = cpp_bdecode(raw)
+        return cpp_unpack_peers(value[b"peers"]), cpp_unpack_peers(
+            value[b"peers6"], ipv6=True
+        )
+
+    benchmark(f)
+
+
+def test_benchmark_decode_announce_unpack_peers_py(benchmark):
+    raw = py_bencode(
+        {
+            "interval": 3600,
+            "peers": py_pack_peers(peers_v4),
+            "peers6": py_pack_peers(peers_v6),
+        }
+    )
+
+    def f():
+        value = py_bdecode(raw)
+        return py_unpack_peers(value[b"peers"]), py_unpack_peers(
+            value[b"peers6"], ipv6=True
+        )
+
+    benchmark(f)
+
+
+def test_benchmark_decode_krpc_loop_cpp(benchmark):
+    benchmark(lambda: [cpp_bdecode(b) for b in krpc_encoded_batch])
+
+
+def test_benchmark_decode_krpc_many_cpp(benchmark):
+    benchmark(cpp_bdecode_many, krpc_encoded_batch)
+
+
+def test_benchmark_decode_krpc_loop_py(benchmark):
+    benchmark(lambda: [py_bdecode(b) for b in krpc_encoded_batch])
+
+
+def test_benchmark_decode_krpc_many_py(benchmark):
+    benchmark(py_bdecode_many, krpc_encoded_batch)
+
+
+def test_benchmark_encode_krpc_loop_cpp(benchmark):
+    benchmark(lambda: [cpp_bencode(v) for v in krpc_batch])
+
+
+def test_benchmark_encode_krpc_many_cpp(benchmark):
+    benchmark(cpp_bencode_many, krpc_batch)
+
+
+def test_benchmark_encode_krpc_loop_py(benchmark):
+    benchmark(lambda: [py_bencode(v) for v in krpc_batch])
+
+
+def test_benchmark_encode_krpc_many_py(benchmark):
+    benchmark(py_bencode_many, krpc_batch)
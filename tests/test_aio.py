@@ -0,0 +1,163 @@
+import asyncio
+import socket
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bencode
+from bencode2.aio import read_value, write_value
+
+
+def run_pair(
+    f: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[Any]],
+) -> Any:
+    """Run `f` with reader of one end of a local socket pair and writer of the other end."""
+
+    async def main() -> Any:
+        a, b = socket.socketpair()
+        reader, w = await asyncio.open_connection(sock=a)
+        _, writer = await asyncio.open_connection(sock=b)
+        try:
+            return await f(reader, writer)
+        finally:
+            writer.close()
+            w.close()
+
+    return asyncio.run(main())
+
+
+def test_read_write_value():
+    values = [
+        {"info": {"name": "a", "pieces": b"x" * 100_000}},
+        1,
+        b"",
+        [[], {}, -1],
+    ]
+
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        for v in values:
+            await write_value(writer, v)
+        return [await read_value(reader) for _ in values]
+
+    assert run_pair(f) == [
+        {b"info": {b"name": b"a", b"pieces": b"x" * 100_000}},
+        1,
+        b"",
+        [[], {}, -1],
+    ]
+
+
+def test_read_value_exact():
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(b"d1:ai1ee" + b"rest")
+        await writer.drain()
+
+        value = await read_value(reader)
+        # data after the value is not consumed
+        return value, await reader.readexactly(4)
+
+    assert run_pair(f) == ({b"a": 1}, b"rest")
+
+
+def test_read_value_chunks():
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        async def write() -> None:
+            for c in [b"l", b"i1", b"0e", b"4:sp", b"am", b"e"]:
+                writer.write(c)
+                await writer.drain()
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(write())
+        value = await read_value(reader)
+        await task
+        return value
+
+    assert run_pair(f) == [10, b"spam"]
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"x",
+        b"e",
+        b"i01e",
+        b"1x:",
+        b"d1:bi1e1:ai1ee",
+        b"di1ei1ee",
+        b"l" * 5000,
+    ],
+)
+def test_read_value_bad_case(raw: bytes):
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(raw)
+        writer.write_eof()
+        return await read_value(reader)
+
+    with pytest.raises(BencodeDecodeError):
+        run_pair(f)
+
+
+def test_read_value_max_size():
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(bencode([b"x" * 100]) * 2)
+        await writer.drain()
+
+        assert await read_value(reader, max_size=104) == [b"x" * 100]
+        return await read_value(reader, max_size=103)
+
+    with pytest.raises(BencodeDecodeError):
+        run_pair(f)
+
+
+@pytest.mark.parametrize("raw", [b"i" + b"1" * 100_000 + b"e", b"1" * 100_000 + b":"])
+@pytest.mark.parametrize("max_size", [None, 100])
+def test_read_value_long_token(raw: bytes, max_size: int | None):
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(raw)
+        writer.write_eof()
+        return await read_value(reader, max_size=max_size)
+
+    with pytest.raises(BencodeDecodeError):
+        run_pair(f)
+
+
+@pytest.mark.parametrize(
+    ["raw", "max_size"],
+    [
+        # int token crosses max_size
+        (b"li12345ei1ee", 8),
+        (b"i12345e", 6),
+        # length prefix crosses max_size
+        (b"l100:", 4),
+        (b"li1e10:", 6),
+    ],
+)
+def test_read_value_max_size_token(raw: bytes, max_size: int):
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(raw)
+        writer.write_eof()
+        return await read_value(reader, max_size=max_size)
+
+    with pytest.raises(BencodeDecodeError, match="max_size"):
+        run_pair(f)
+
+
+def test_read_value_length_overflow():
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(b"1" + b"0" * 40 + b":")
+        writer.write_eof()
+        return await read_value(reader)
+
+    with pytest.raises(BencodeDecodeError, match="overflow"):
+        run_pair(f)
+
+
+def test_read_value_eof():
+    async def f(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Any:
+        writer.write(b"li1e")
+        writer.write_eof()
+        return await read_value(reader)
+
+    with pytest.raises(asyncio.IncompleteReadError):
+        run_pair(f)
@@ -3,7 +3,16 @@ from typing import Any
 import pytest
 from typing_extensions import Buffer
 
-from bencode2 import BencodeDecodeError, bdecode
+from bencode2 import (
+    BencodeDecodeError,
+    bdecode,
+    bdecode_lazy,
+    bdecode_many,
+    bdecode_span,
+    bencode,
+    get_max_decode_depth,
+    set_max_decode_depth,
+)
 
 
 def test_non_bytes_input():
@@ -44,6 +53,8 @@ def test_non_bytes_input():
         b"l",
         b"lee",
         b"dee",
+        b"d1:a",  # dict end after key
+        b"ld1:a",
     ],
 )
 def test_bad_case(raw: bytes):
@@ -104,9 +115,241 @@ def test_decode_depth_limit():
         bdecode(deep)
 
 
+def test_decode_max_depth_setting():
+    assert get_max_decode_depth() == 4096
+
+    with pytest.raises(ValueError):
+        set_max_decode_depth(0)
+
+    # scalar values are counted too
+    set_max_decode_depth(3)
+    try:
+        assert bdecode(b"lli1eee") == [[1]]
+        assert bdecode(b"d1:ali1eee") == {b"a": [1]}
+        for raw in [b"llli1eeee", b"lllleeee", b"d1:ad1:bli1eeee"]:
+            with pytest.raises(BencodeDecodeError, match="maximum decode depth"):
+                bdecode(raw)
+            with pytest.raises(BencodeDecodeError, match="maximum decode depth"):
+                bdecode_lazy(raw)
+    finally:
+        set_max_decode_depth(4096)
+
+    # nesting is not limited by C stack or python recursion limit
+    set_max_decode_depth(100_000)
+    try:
+        v = bdecode(b"l" * 50_000 + b"e" * 50_000)
+    finally:
+        set_max_decode_depth(4096)
+
+    for _ in range(49_999):
+        v = v[0]
+    assert v == []
+
+
 def test_bytes_length_overflow():
     """A crafted length prefix that would overflow Py_ssize_t should be rejected."""
     # 20-digit number that exceeds PY_SSIZE_T_MAX
     payload = b"99999999999999999999:"
     with pytest.raises(BencodeDecodeError):
         bdecode(payload)
+
+
+def test_zero_copy():
+    raw = bytearray(b"d3:fooi42e3:key5:value4:spaml1:a1:bee")
+    d = bdecode(raw, zero_copy=True)
+
+    assert list(d.keys()) == [b"foo", b"key", b"spam"]
+    assert all(type(key) is bytes for key in d)
+    assert d[b"foo"] == 42
+
+    value = d[b"key"]
+    assert isinstance(value, memoryview)
+    assert value.readonly
+    assert value == b"value"
+    assert [v.tobytes() for v in d[b"spam"]] == [b"a", b"b"]
+
+    # views keep the buffer exported
+    with pytest.raises(BufferError):
+        raw.extend(b"x")
+
+    del d, value
+    raw.extend(b"x")
+
+
+def test_zero_copy_keep_source_alive():
+    v = bdecode(b"10:0123456789", zero_copy=True)
+    assert v.tobytes() == b"0123456789"
+
+
+@pytest.mark.parametrize("raw", [b"", b"1:", b"d1:b0:1:a0:e", b"l1:ae1:a"])
+def test_zero_copy_bad_case(raw: bytes):
+    with pytest.raises(BencodeDecodeError):
+        bdecode(raw, zero_copy=True)
+
+
+# large enough to be decoded by the two stage decoder
+large_value = {
+    b"empty": [[], {}, b""],
+    b"files": [
+        {b"length": i * 1_000_003, b"path": [b"dir", b"file-%d.bin" % i]}
+        for i in range(2000)
+    ],
+    b"ints": [0, -1, 2**63 - 1, -(2**63), 2**64, -(10**30), 10**18, -(10**18)],
+    b"nested": [[[i, {b"k": [i]}]] for i in range(100)],
+}
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        bencode(large_value),
+        bencode([large_value] * 3),
+        bencode(large_value)[:-1],
+        bencode(large_value) + b"e",
+        bencode(large_value).replace(b"4:path", b"4:patg", 1),
+        bencode(large_value).replace(b"i1000003e", b"i01000003e", 1),
+        bencode(large_value).replace(b"3:dir", b"3:di", 1),
+        b"l" + b"i1e" * 10000 + b"d1:ai1e",
+        b"l" * 5000 + b"i1e" * 10000 + b"e" * 5000,
+    ],
+)
+def test_decode_large_input(raw: bytes):
+    """Large input is decoded by another engine, result and error should be same."""
+    try:
+        # record a span to use the normal engine
+        expected: Any = bdecode_span(raw, b"\xff")[0]
+    except BencodeDecodeError as e:
+        with pytest.raises(BencodeDecodeError) as exc:
+            bdecode(raw)
+        assert str(exc.value) == str(e)
+        return
+
+    assert bdecode(raw) == expected
+    assert bdecode_many([raw]) == [expected]
+    assert bdecode(raw, zero_copy=True) == expected
+
+
+def test_decode_large_input_value():
+    assert bdecode(bencode(large_value)) == large_value
+
+
+# large enough to be split into subtrees
+parallel_list = bencode([large_value, b"x" * 300_000] * 3 + [1, b"x"])
+parallel_dict = bencode(
+    {b"%03d" % i: [large_value, b"x" * 300_000][i % 2] for i in range(6)}
+)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        parallel_list,
+        parallel_dict,
+        bencode([large_value, b"x" * 2_000_000]),
+        bencode({b"a": b"x" * 2_000_000}),
+        bencode([b"x" * 100] * 12_000),
+        parallel_list[:-1],
+        parallel_list + b"e",
+        parallel_list.replace(b"i1000003e", b"i01000003e", 1),
+        parallel_dict.replace(b"3:004", b"3:001", 1),
+        parallel_dict.replace(b"4:path", b"4:patg", 1),
+    ],
+)
+def test_decode_parallel(raw: bytes):
+    """Result and error of parallel decoding should be same as sequential decoding."""
+    try:
+        expected: Any = bdecode(raw)
+    except BencodeDecodeError as e:
+        with pytest.raises(BencodeDecodeError) as exc:
+            bdecode(raw, threads=4)
+        assert str(exc.value) == str(e)
+        return
+
+    for threads in [2, 16]:
+        assert bdecode(raw, threads=threads) == expected
+    assert bdecode(bytearray(raw), threads=3) == expected
+
+
+def test_decode_parallel_bad_threads():
+    with pytest.raises(ValueError):
+        bdecode(b"i1e", threads=0)
+
+
+def test_decode_many():
+    results = bdecode_many([b"i1e", b"i01e", bytearray(b"4:spam"), "s", b"", b"le"])
+
+    assert results[0] == 1
+    assert isinstance(results[1], BencodeDecodeError)
+    assert results[2] == b"spam"
+    assert isinstance(results[3], TypeError)
+    assert isinstance(results[4], BencodeDecodeError)
+    assert results[5] == []
+
+
+def test_decode_many_generator():
+    assert bdecode_many(bencode(i) for i in range(100)) == list(range(100))
+
+
+def test_decode_intern_repeated_bytes():
+    files = bdecode(
+        bencode(
+            {"files": [{"length": i, "path": [b"dir", b"file"]} for i in range(10)]}
+        )
+    )[b"files"]
+
+    keys = [list(f) for f in files]
+    assert all(k[0] is keys[0][0] and k[1] is keys[0][1] for k in keys)
+
+    paths = [f[b"path"] for f in files]
+    assert all(p[0] is paths[0][0] and p[1] is paths[0][1] for p in paths)
+
+
+@pytest.mark.parametrize(
+    ("raw", "message"),
+    [
+        (b"x", "unexpected token b'x'. index 0"),
+        (b"i1", "invalid int, failed to found end. index 1"),
+        (b"ie", "invalid int, found 'ie': 1"),
+        (b"i-e", "invalid int, '-' with no digits at 1"),
+        (b"i+1e", "malformed int b'+1'. index 1"),
+        (b"i1_0e", "malformed int b'1_0'. index 1"),
+        (b"i-0e", "-0 is not allowed in bencoding. index: 1"),
+        (b"i01e", "integer with leading zero is not allowed. index: 1"),
+        (b"1", "invalid bytes, failed find expected char ':'. index 0"),
+        (b"01:a", "malformed str/bytes length with leading 0. index 0"),
+        (b"1_0:aaaaaaaaaa", "malformed str/bytes length b'1_0'. index 0"),
+        (b"2:a", "malformed str/bytes length, buffer overflow. index 0"),
+        (b"9" * 30 + b":a", "malformed str/bytes length, buffer overflow. index 0"),
+        (b"li1e", "buffer overflow when decoding array, index 4"),
+        (b"d1:a", "buffer overflow when decoding bytes, index 4"),
+        (
+            b"di1ee",
+            "directory only allow str as keys, found unexpected char 'i', index 1",
+        ),
+        (b"d1:bi1e1:ai2ee", "directory keys is not sorted, index 0"),
+        (b"d1:ai1e1:ai2ee", "found duplicated keys in directory, index 0"),
+    ],
+)
+def test_py_decoder_error_message(raw: bytes, message: str):
+    from bencode2 import __decoder
+
+    for decode in [__decoder.bdecode, __decoder.bdecode_lazy]:
+        with pytest.raises(__decoder.BencodeDecodeError) as e:
+            decode(raw)
+        assert str(e.value) == message
+
+
+def test_py_decoder_iterative():
+    from bencode2 import __decoder
+
+    # longer than default limit of int string conversion
+    assert __decoder.bdecode(b"i-" + b"9" * 5000 + b"e") == -(10**5000 - 1)
+
+    # deep nesting raise decode error, not RecursionError
+    with pytest.raises(__decoder.BencodeDecodeError, match="maximum decode depth"):
+        __decoder.bdecode(b"l" * 5000)
+
+    v = __decoder.bdecode(b"l" * 4096 + b"e" * 4096)
+    for _ in range(4095):
+        v = v[0]
+    assert v == []
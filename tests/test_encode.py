@@ -3,14 +3,31 @@ from __future__ import annotations
 import collections
 import dataclasses
 import enum
+import gc
+import io
 import sys
+import threading
 import types
+import weakref
 from types import MappingProxyType
 from typing import Any, NamedTuple
 
 import pytest
 
-from bencode2 import COMPILED, BencodeEncodeError, bencode
+from bencode2 import (
+    COMPILED,
+    BencodeDecodeError,
+    BencodeEncodeError,
+    Raw,
+    bencode,
+    bencode_into,
+    bencode_many,
+    bencode_to,
+    bencoded_size,
+    buffer_stats,
+    configure_buffers,
+    trim_buffers,
+)
 
 
 @pytest.mark.parametrize(
@@ -189,6 +206,53 @@ def test_dataclasses():
         assert bencode(l2)
 
 
+def test_dataclasses_slots():
+    @dataclasses.dataclass(frozen=True, slots=True)
+    class Obj:
+        b: int
+        a: bytes
+        c: list[int] = dataclasses.field(default_factory=list)
+        d: int = dataclasses.field(init=False)
+
+    o = Obj(b=1, a=b"x", c=[1])
+    # encoded twice, with and without cached plan
+    for _ in range(2):
+        with pytest.raises(AttributeError):
+            bencode(o)
+
+    object.__setattr__(o, "d", 2)
+    for _ in range(2):
+        assert bencode(o) == b"d1:a1:x1:bi1e1:cli1ee1:di2ee"
+
+    class Sub(Obj):
+        pass
+
+    s = Sub(b=2, a=b"y")
+    object.__setattr__(s, "d", 3)
+    assert bencode([s, o]) == b"ld1:a1:y1:bi2e1:cle1:di3eed1:a1:x1:bi1e1:cli1ee1:di2eee"
+
+
+def test_dataclasses_plan_released():
+    for i in range(10):
+
+        @dataclasses.dataclass
+        class Obj:
+            value: int
+
+        # attributes with same name but different layout
+        if i % 2:
+            Obj = dataclasses.make_dataclass("Obj", [("other", int)])
+            assert bencode(Obj(i)) == b"d5:otheri%dee" % i
+        else:
+            assert bencode(Obj(i)) == b"d5:valuei%dee" % i
+
+        ref = weakref.ref(Obj)
+        del Obj
+        gc.collect()
+        # encode plan doesn't keep class alive
+        assert ref() is None
+
+
 def test_enum():
     class Enum(enum.Enum):
         v = "a"
@@ -241,3 +305,353 @@ def test_NamedTuple():
         v: str
 
     assert bencode(UserNamedTuple(v="s")) == b"l1:se"
+
+
+def test_encode_many():
+    d = {}
+    d["a"] = d
+
+    results = bencode_many([1, None, "a", d, {"a": 1, b"a": 2}, [b"spam"]])
+
+    assert results[0] == b"i1e"
+    assert isinstance(results[1], TypeError)
+    assert results[2] == b"1:a"
+    assert isinstance(results[3], BencodeEncodeError)
+    assert isinstance(results[4], BencodeEncodeError)
+    assert results[5] == b"l4:spame"
+
+
+def test_encode_many_generator():
+    assert bencode_many(i for i in range(100)) == [bencode(i) for i in range(100)]
+
+
+def test_encode_into():
+    buf = bytearray(32)
+
+    n = bencode_into({"a": [1, b"spam"]}, buf)
+    assert buf[:n] == b"d1:ali1e4:spamee"
+
+    m = bencode_into("eggs", buf, offset=n)
+    assert buf[: n + m] == b"d1:ali1e4:spamee4:eggs"
+
+    n = bencode_into(1, memoryview(buf)[4:])
+    assert buf[4 : 4 + n] == b"i1e"
+
+
+def test_encode_into_too_small():
+    buf = bytearray(4)
+    with pytest.raises(BencodeEncodeError, match="need 10 bytes"):
+        bencode_into(b"spam" * 2, buf)
+
+    with pytest.raises(BencodeEncodeError, match="need 6 bytes but only 2 available"):
+        bencode_into(b"spam", buf, offset=2)
+
+    with pytest.raises(ValueError):
+        bencode_into(b"", buf, offset=5)
+
+
+def test_encode_into_too_small_offset():
+    buf = bytearray(b"........")
+    with pytest.raises(BencodeEncodeError, match="need 33 bytes but only 6 available"):
+        bencode_into([b"x" * 6, b"y" * 20], buf, offset=2)
+    # data before offset is not changed
+    assert buf[:2] == b".."
+
+    # buffer can be reused after error
+    assert bencode_into(b"spam", buf, offset=2) == 6
+    assert buf == b"..4:spam"
+
+
+def test_encode_into_large():
+    value = [b"x" * 1000] * 100
+    buf = bytearray(200 * 1000)
+    n = bencode_into(value, buf, offset=10)
+    assert buf[10 : 10 + n] == bencode(value)
+
+
+def test_encode_into_readonly():
+    with pytest.raises(BufferError):
+        bencode_into(1, b"\x00" * 10)
+
+
+def test_encode_into_error():
+    buf = bytearray(10)
+    with pytest.raises(TypeError):
+        bencode_into(None, buf)
+    # context is reset after error
+    assert bencode_into(1, buf) == 3
+
+
+class ChunkRecorder:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, b):
+        self.chunks.append(b)
+
+
+def test_encode_to():
+    value = {"a": [1, b"spam"], "b": "x" * 100, "c": [{"d": i} for i in range(100)]}
+
+    w = io.BytesIO()
+    assert bencode_to(value, w) == len(bencode(value))
+    assert w.getvalue() == bencode(value)
+
+    r = ChunkRecorder()
+    assert bencode_to(value, r, chunk_size=16) == len(bencode(value))
+    assert b"".join(r.chunks) == bencode(value)
+    assert len(r.chunks) > 1
+    assert all(len(c) <= 120 for c in r.chunks)
+
+
+@pytest.mark.parametrize(
+    "large",
+    [b"x" * 1000, bytearray(b"x" * 1000), memoryview(b"x" * 1000)],
+    ids=["bytes", "bytearray", "memoryview"],
+)
+def test_encode_to_large_bytes_write_through(large):
+    r = ChunkRecorder()
+    bencode_to([1, large, 2], r, chunk_size=100)
+
+    assert b"".join(r.chunks) == b"li1e1000:" + b"x" * 1000 + b"i2ee"
+    assert any(c is large for c in r.chunks)
+
+
+def test_encode_to_error():
+    with pytest.raises(ValueError):
+        bencode_to(1, io.BytesIO(), chunk_size=0)
+
+    with pytest.raises(TypeError):
+        bencode_to([1, None], io.BytesIO())
+
+    class Broken:
+        def write(self, b):
+            raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        bencode_to(b"x" * 100, Broken(), chunk_size=10)
+
+    assert bencode(1) == b"i1e"
+
+
+def test_encode_raw():
+    info = {"name": "a", "length": 1, "piece length": 16384}
+    raw = Raw(bencode(info))
+
+    assert bencode(raw) == bencode(info)
+    assert bencode({"info": raw, "announce": "x"}) == bencode(
+        {"info": info, "announce": "x"}
+    )
+    assert bencode([raw, Raw(b"i1e")]) == b"l" + bencode(info) + b"i1ee"
+
+    # not re-sorted or re-checked
+    assert bencode([Raw(bytearray(b"d1:ai1e1:bi2ee"))]) == b"ld1:ai1e1:bi2eee"
+
+    @dataclasses.dataclass
+    class Torrent:
+        info: Raw
+
+    assert bencode(Torrent(raw)) == bencode({"info": info})
+
+
+def test_encode_raw_copy():
+    b = bytearray(b"i1e")
+    raw = Raw(b)
+    b[1:2] = b"2"
+
+    assert raw.value == b"i1e"
+    assert bencode(raw) == b"i1e"
+    assert raw == Raw(memoryview(b"i1e"))
+    assert raw != Raw(b"i2e")
+    assert hash(raw) == hash(Raw(b"i1e"))
+    assert repr(raw) == "Raw(b'i1e')"
+
+
+def test_encode_raw_write_through():
+    large = Raw(bencode(b"x" * 1000))
+    chunks: list[Any] = []
+
+    class W:
+        def write(self, b: Any) -> None:
+            chunks.append(bytes(b))
+
+    assert bencode_to([large], W(), chunk_size=100) == 1007
+    assert b"".join(chunks) == b"l" + large.value + b"e"
+    assert large.value in chunks
+
+
+@pytest.mark.parametrize("value", [b"", b"i01e", b"li1e", b"i1ei2e", b"d1:bi1e1:ai1ee"])
+def test_encode_raw_invalid(value: bytes):
+    with pytest.raises(BencodeDecodeError):
+        Raw(value)
+
+
+def test_encode_raw_bad_type():
+    with pytest.raises(TypeError):
+        Raw("i1e")  # type: ignore
+    with pytest.raises(TypeError):
+        Raw(1)  # type: ignore
+
+
+large_values = [
+    b"x" * 100_000,
+    {"info": {"pieces": b"x" * 100_000, "name": "é" * 10, "length": -(2**40)}},
+    [b"x" * 70_000, (True, False, 0, -1, 10**30), "a" * 10_000],
+    [b"x" * 70_000, collections.OrderedDict(a=1)],
+    {
+        "files": [{"path": [b"a", b"b"], "length": i} for i in range(5000)],
+        "p": b"x" * 100_000,
+    },
+    [Raw(bencode(b"x" * 100_000)), [[[]]]],
+]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        1,
+        -10,
+        True,
+        "",
+        "é",
+        b"abc",
+        [],
+        {},
+        {"a": [1, {"b": b"c"}], b"d": ()},
+        Raw(b"de"),
+        *large_values,
+    ],
+)
+def test_encoded_size(value: Any):
+    assert bencoded_size(value) == len(bencode(value))
+
+
+@pytest.mark.parametrize(
+    ["value", "error"],
+    [
+        ({"a": 1, b"a": 2}, BencodeEncodeError),
+        ([object()], TypeError),
+        ({1: 1}, TypeError),
+    ],
+)
+def test_encoded_size_error(value: Any, error: type[Exception]):
+    with pytest.raises(error):
+        bencoded_size(value)
+
+
+@pytest.mark.parametrize("value", large_values)
+def test_encode_large(value: Any):
+    # large output change how next value is encoded, encode a few times in different orders
+    expected = bencode(value)
+    for v in [value, value, [1], value, {"a": 1}, b"x", value]:
+        assert bencode(v) == bencode(v)
+    assert bencode(value) == expected
+    assert bencode([value, value]) == b"l" + expected + expected + b"e"
+
+
+def test_encode_large_error():
+    bencode(b"x" * 100_000)
+
+    with pytest.raises(BencodeEncodeError):
+        bencode({"a": b"x" * 100_000, b"a": 1})
+    with pytest.raises(TypeError):
+        bencode([b"x" * 100_000, object()])
+
+
+@pytest.fixture
+def buffer_config():
+    config = configure_buffers()
+    yield config
+    configure_buffers(**config)
+
+
+def test_configure_buffers(buffer_config: dict[str, int]):
+    assert buffer_config == {"pool_size": 3, "max_buffer_size": 20 * 1024 * 1024}
+
+    assert configure_buffers(pool_size=1) == {
+        "pool_size": 1,
+        "max_buffer_size": 20 * 1024 * 1024,
+    }
+    assert configure_buffers(max_buffer_size=4096) == {
+        "pool_size": 1,
+        "max_buffer_size": 4096,
+    }
+    assert bencode([b"x" * 100_000]) == b"l100000:" + b"x" * 100_000 + b"e"
+
+    for bad in [{"pool_size": -1}, {"max_buffer_size": 4095}]:
+        with pytest.raises(ValueError):
+            configure_buffers(**bad)
+    with pytest.raises(TypeError):
+        configure_buffers(pool_size=1.5)  # type: ignore
+    with pytest.raises(TypeError):
+        configure_buffers(1)  # type: ignore
+
+    assert configure_buffers() == {"pool_size": 1, "max_buffer_size": 4096}
+
+
+def test_buffer_stats(buffer_config: dict[str, int]):
+    trim_buffers()
+    stats = buffer_stats()
+    assert set(stats) == {"thread", "global"}
+    assert set(stats["thread"]) == {"hits", "misses", "contexts", "retained_bytes"}
+    assert stats["thread"]["contexts"] == 0
+    assert stats["thread"]["retained_bytes"] == 0
+
+    if not COMPILED:
+        return
+
+    configure_buffers(max_buffer_size=1024 * 1024)
+    # many small items are encoded in context buffer, not in a bytes object of exact size
+    bencode([1] * (2 * 1024 * 1024))
+    bencode(1)
+
+    stats = buffer_stats()["thread"]
+    # large buffer is shrunk instead of dropped
+    assert stats["contexts"] == 1
+    assert stats["retained_bytes"] == 1024 * 1024
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
+    assert buffer_stats()["global"]["retained_bytes"] >= 1024 * 1024
+
+    trim_buffers()
+    assert buffer_stats()["thread"]["retained_bytes"] == 0
+
+    configure_buffers(pool_size=0)
+    bencode(1)
+    assert buffer_stats()["thread"]["contexts"] == 0
+
+
+@pytest.mark.skipif(not COMPILED, reason="only run with binary module")
+def test_buffer_stats_threads(buffer_config: dict[str, int]):
+    before = buffer_stats()["global"]
+
+    started = threading.Event()
+    stop = threading.Event()
+
+    def work():
+        for _ in range(10):
+            bencode([1, 2])
+        bencode([1] * (1024 * 1024))
+        started.set()
+        stop.wait()
+        assert bencode([1, 2]) == b"li1ei2ee"
+
+    t = threading.Thread(target=work)
+    t.start()
+    started.wait()
+
+    stats = buffer_stats()["global"]
+    assert stats["threads"] == before["threads"] + 1
+    assert stats["hits"] >= before["hits"] + 9
+    assert stats["contexts"] >= 1
+    assert stats["retained_bytes"] >= 3 * 1024 * 1024
+
+    # pools of idle threads are emptied too
+    trim_buffers()
+    assert t.is_alive()
+    stats = buffer_stats()["global"]
+    assert stats["contexts"] == 0
+    assert stats["retained_bytes"] == 0
+
+    stop.set()
+    t.join()
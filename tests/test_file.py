@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, bdecode_file, bencode
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+)
+
+
+def test_decode_file():
+    assert bdecode_file(single_file_torrent) == bdecode(
+        single_file_torrent.read_bytes()
+    )
+    assert bdecode_file(str(single_file_torrent)) == bdecode(
+        single_file_torrent.read_bytes()
+    )
+
+
+def test_decode_file_threads(tmp_path: Path):
+    value = [{b"path": [b"file-%d" % i], b"length": i} for i in range(50_000)]
+    p = tmp_path.joinpath("large.bencode")
+    p.write_bytes(bencode(value))
+
+    assert bdecode_file(p, threads=4) == value
+
+
+def test_decode_file_zero_copy():
+    expected = bdecode(single_file_torrent.read_bytes())
+    value = bdecode_file(single_file_torrent, zero_copy=True)
+
+    assert isinstance(value[b"announce"], memoryview)
+    assert value[b"announce"] == expected[b"announce"]
+    assert value[b"info"][b"pieces"] == expected[b"info"][b"pieces"]
+
+
+def test_decode_file_lazy():
+    expected = bdecode(single_file_torrent.read_bytes())
+    value = bdecode_file(single_file_torrent, lazy=True)
+
+    assert value[b"info"][b"name"] == expected[b"info"][b"name"]
+    assert value == expected
+
+
+@pytest.mark.parametrize("raw", [b"", b"i1", b"i1ei2e", b"d1:bi1e1:ai2ee"])
+@pytest.mark.parametrize(
+    "mode", [{}, {"zero_copy": True}, {"lazy": True}, {"threads": 2}]
+)
+def test_decode_file_bad_case(tmp_path: Path, raw: bytes, mode: dict):
+    p = tmp_path.joinpath("bad.torrent")
+    p.write_bytes(raw)
+
+    with pytest.raises(BencodeDecodeError):
+        bdecode_file(p, **mode)
+
+
+def test_decode_file_not_found(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        bdecode_file(tmp_path.joinpath("missing.torrent"))
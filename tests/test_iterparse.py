@@ -0,0 +1,148 @@
+import io
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, iterparse
+
+single_file_torrent_path = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+)
+
+multiple_files_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/multiple-files.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def build(events: Any) -> Any:
+    """Build value from events, like `bdecode`."""
+    stack: list[Any] = []
+    keys: list[Any] = []
+    for event, value, _ in events:
+        if event == "start_list":
+            stack.append([])
+            keys.append(None)
+            continue
+        if event == "start_dict":
+            stack.append({})
+            keys.append(None)
+            continue
+        if event == "key":
+            keys[-1] = value
+            continue
+        if event == "end":
+            value = stack.pop()
+            keys.pop()
+        elif event == "bytes":
+            value = value.tobytes()
+
+        if not stack:
+            return value
+        if isinstance(stack[-1], list):
+            stack[-1].append(value)
+        else:
+            stack[-1][keys[-1]] = value
+
+
+def test_iterparse_events():
+    events = list(iterparse(b"d1:ali1e2:xye1:bdee"))
+    assert [
+        (e, v.tobytes() if isinstance(v, memoryview) else v, o) for e, v, o in events
+    ] == [
+        ("start_dict", None, 0),
+        ("key", b"a", 1),
+        ("start_list", None, 4),
+        ("int", 1, 5),
+        ("bytes", b"xy", 8),
+        ("end", None, 12),
+        ("key", b"b", 13),
+        ("start_dict", None, 16),
+        ("end", None, 17),
+        ("end", None, 18),
+    ]
+
+    assert list(iterparse(b"i-10e")) == [("int", -10, 0)]
+
+
+def test_iterparse_zero_copy():
+    raw = bytearray(b"l4:spam0:e")
+    events = list(iterparse(raw))
+
+    value = events[1][1]
+    assert isinstance(value, memoryview)
+    assert value.readonly
+    assert value == b"spam"
+
+    # views keep the buffer exported
+    with pytest.raises(BufferError):
+        raw.extend(b"x")
+
+    del events, value
+    raw.extend(b"x")
+
+
+def test_iterparse_torrent():
+    assert build(iterparse(multiple_files_torrent)) == bdecode(multiple_files_torrent)
+
+
+def test_iterparse_file(tmp_path: Path):
+    expected = bdecode(single_file_torrent_path.read_bytes())
+
+    assert build(iterparse(single_file_torrent_path)) == expected
+    assert build(iterparse(str(single_file_torrent_path))) == expected
+    with single_file_torrent_path.open("rb") as f:
+        assert build(iterparse(f)) == expected
+    assert build(iterparse(io.BytesIO(multiple_files_torrent))) == bdecode(
+        multiple_files_torrent
+    )
+
+    empty = tmp_path.joinpath("empty.torrent")
+    empty.write_bytes(b"")
+    with pytest.raises(BencodeDecodeError):
+        list(iterparse(empty))
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"i01e",
+        b"i-0e",
+        b"1a:",
+        b"l",
+        b"li1e",
+        b"i1ei2e",
+        b"d1:bi1e1:ai2ee",
+        b"d1:ai1e1:ai2ee",
+        b"di1ei2ee",
+        b"d1:a",
+        b"x",
+        b"l" * 5000 + b"e" * 5000,
+    ],
+)
+def test_iterparse_bad_case(raw: bytes):
+    it = iterparse(raw)
+    with pytest.raises(BencodeDecodeError):
+        list(it)
+
+    # iterator is finished after error
+    assert list(it) == []
+
+
+def test_iterparse_lazy_error():
+    it = iterparse(b"li1ei01ee")
+    assert next(it) == ("start_list", None, 0)
+    assert next(it) == ("int", 1, 1)
+    with pytest.raises(BencodeDecodeError):
+        next(it)
+
+
+def test_iterparse_non_bytes_input():
+    with pytest.raises(TypeError):
+        iterparse(1)  # type: ignore
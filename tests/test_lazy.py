@@ -0,0 +1,118 @@
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, bdecode_lazy
+
+multiple_files_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/multiple-files.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def test_lazy_torrent():
+    lazy = bdecode_lazy(multiple_files_torrent)
+    expected = bdecode(multiple_files_torrent)
+
+    assert isinstance(lazy, Mapping)
+    assert lazy == expected
+    assert list(lazy) == list(expected)
+    assert lazy[b"info"][b"name"] == expected[b"info"][b"name"]
+
+    files = lazy[b"info"][b"files"]
+    assert isinstance(files, Sequence)
+    assert len(files) == len(expected[b"info"][b"files"])
+    assert files[-1] == expected[b"info"][b"files"][-1]
+    assert files[1:3] == expected[b"info"][b"files"][1:3]
+    assert files == expected[b"info"][b"files"]
+
+    # cached after first access
+    assert lazy[b"info"] is lazy[b"info"]
+
+
+def test_lazy_mapping():
+    lazy = bdecode_lazy(b"d1:ai1e1:bli2ei3ee1:cd1:d0:ee")
+
+    assert len(lazy) == 3
+    assert b"a" in lazy
+    assert b"z" not in lazy
+    assert "a" not in lazy
+    assert lazy.get(b"z") is None
+    assert lazy.get(b"a") == 1
+    assert list(lazy.keys()) == [b"a", b"b", b"c"]
+    assert (b"a", 1) in lazy.items()
+    assert lazy[b"c"] == {b"d": b""}
+
+    with pytest.raises(KeyError):
+        lazy[b"z"]
+
+    with pytest.raises(KeyError):
+        lazy["a"]
+
+    with pytest.raises(TypeError):
+        hash(lazy)
+
+
+def test_lazy_sequence():
+    lazy = bdecode_lazy(b"li1e1:alee")
+
+    assert len(lazy) == 3
+    assert lazy[0] == 1
+    assert lazy[-2] == b"a"
+    assert lazy[2] == []
+    assert list(lazy) == [1, b"a", []]
+    assert b"a" in lazy
+    assert lazy.index(b"a") == 1
+    assert lazy != [1]
+
+    with pytest.raises(IndexError):
+        lazy[3]
+
+
+@pytest.mark.parametrize(["raw", "expected"], [(b"i1e", 1), (b"0:", b"")])
+def test_lazy_scalar(raw: bytes, expected):
+    assert bdecode_lazy(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"l",
+        b"i01e",
+        b"i1ei2e",
+        b"d1:b0:1:a0:e",
+        # error in deeply nested container is found before any access
+        b"d1:ald1:b0:1:a0:eee",
+    ],
+)
+def test_lazy_bad_case(raw: bytes):
+    with pytest.raises(BencodeDecodeError):
+        bdecode_lazy(raw)
+
+
+def test_lazy_depth_limit():
+    deep = b"l" * 5000 + b"e" * 5000
+    with pytest.raises((BencodeDecodeError, RecursionError)):
+        bdecode_lazy(deep)
+
+
+def test_lazy_many_items():
+    raw = b"l" + b"i1e" * 5000 + b"e"
+    assert len(bdecode_lazy(raw)) == 5000
+    assert bdecode(raw) == [1] * 5000
+
+
+def test_lazy_span():
+    raw = b"d1:ai1e1:bli1eee"
+    lazy = bdecode_lazy(raw)
+
+    assert lazy.span(b"a") == (4, 7)
+    assert lazy.span(b"b") == (10, 15)
+    assert raw[slice(*lazy.span(b"b"))] == b"li1ee"
+
+    with pytest.raises(KeyError):
+        lazy.span(b"c")
@@ -0,0 +1,159 @@
+import dataclasses
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from bencode2 import (
+    BencodeDecodeError,
+    BencodeEncodeError,
+    Decoder,
+    Encoder,
+    Raw,
+    bdecode,
+    bencode,
+    get_max_decode_depth,
+)
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def test_decoder_no_limit():
+    decoder = Decoder()
+    assert decoder.decode(single_file_torrent) == bdecode(single_file_torrent)
+    assert decoder.decode(bytearray(b"li1e1:ae")) == [1, b"a"]
+    assert decoder.decode(memoryview(b"xxi1e")[2:]) == 1
+
+    assert decoder.max_depth is None
+    assert decoder.max_items is None
+
+
+def test_decoder_reuse():
+    decoder = Decoder(max_depth=3, max_size=100, max_string=4, max_items=10)
+    assert decoder.max_depth == 3
+    assert decoder.max_size == 100
+    assert decoder.max_string == 4
+    assert decoder.max_items == 10
+    assert repr(decoder) == (
+        "Decoder(max_depth=3, max_size=100, max_string=4, max_items=10)"
+    )
+
+    for _ in range(3):
+        assert decoder.decode(b"d1:ali1e4:spame1:bi2ee") == {
+            b"a": [1, b"spam"],
+            b"b": 2,
+        }
+        with pytest.raises(BencodeDecodeError):
+            decoder.decode(b"5:spams")
+
+
+@pytest.mark.parametrize(
+    ["limits", "raw", "message"],
+    [
+        ({"max_size": 4}, b"4:spam", "max_size"),
+        ({"max_string": 3}, b"4:spam", "max_string"),
+        ({"max_string": 3}, b"d4:spami1ee", "max_string"),
+        ({"max_items": 3}, b"li1ei2ei3ee", "max_items"),
+        # dict keys are counted
+        ({"max_items": 2}, b"d1:ai1ee", "max_items"),
+        ({"max_depth": 2}, b"llleee", "depth"),
+        ({"max_depth": 2}, b"lli1eee", "depth"),
+    ],
+)
+def test_decoder_limits(limits: dict[str, int], raw: bytes, message: str):
+    with pytest.raises(BencodeDecodeError, match=message):
+        Decoder(**limits).decode(raw)
+
+
+def test_decoder_limits_boundary():
+    assert Decoder(max_size=6).decode(b"4:spam") == b"spam"
+    assert Decoder(max_string=4).decode(b"d4:spam0:e") == {b"spam": b""}
+    assert Decoder(max_items=4).decode(b"li1ei2ei3ee") == [1, 2, 3]
+    assert Decoder(max_depth=3).decode(b"lli1eee") == [[1]]
+
+
+def test_decoder_fail_fast():
+    # limit is crossed before the invalid data at the end
+    raw = b"l" + b"i1e" * 100 + b"x"
+    with pytest.raises(BencodeDecodeError, match="max_items"):
+        Decoder(max_items=10).decode(raw)
+
+    # large input use the same limits
+    with pytest.raises(BencodeDecodeError, match="max_string"):
+        Decoder(max_string=10000).decode(single_file_torrent)
+    with pytest.raises(BencodeDecodeError, match="max_items"):
+        Decoder(max_items=20).decode(single_file_torrent)
+
+
+def test_decoder_depth_is_capped():
+    depth = get_max_decode_depth()
+    raw = b"l" * (depth + 1) + b"e" * (depth + 1)
+    with pytest.raises(BencodeDecodeError):
+        Decoder(max_depth=depth + 10).decode(raw)
+
+
+@pytest.mark.parametrize(
+    "raw", [b"", b"i01e", b"l", b"d1:bi1e1:ai2ee", b"i1ei2e", b"x"]
+)
+def test_decoder_bad_case(raw: bytes):
+    with pytest.raises(BencodeDecodeError):
+        Decoder().decode(raw)
+    with pytest.raises(BencodeDecodeError):
+        Decoder(max_items=100).decode(raw)
+
+
+def test_encoder_no_limit():
+    encoder = Encoder()
+    value = bdecode(single_file_torrent)
+    assert encoder.encode(value) == bencode(value)
+    assert repr(encoder) == "Encoder(max_depth=None, max_size=None)"
+
+
+def test_encoder_limits():
+    @dataclasses.dataclass
+    class Item:
+        value: Any
+
+    encoder = Encoder(max_depth=2, max_size=20)
+    assert encoder.max_depth == 2
+    assert encoder.max_size == 20
+
+    assert encoder.encode([[1]]) == b"lli1eee"
+    assert encoder.encode({"a": Item(1)}) == b"d1:ad5:valuei1eee"
+    assert encoder.encode(b"a" * 17) == b"17:" + b"a" * 17
+
+    for value in [[[[1]]], {"a": {"b": {}}}, Item(Item(Item(1))), [[()]]]:
+        with pytest.raises(BencodeEncodeError, match="max_depth"):
+            encoder.encode(value)
+
+    for value in [b"a" * 18, [b"a" * 10] * 2, Raw(b"20:" + b"a" * 20)]:
+        with pytest.raises(BencodeEncodeError, match="max_size"):
+            encoder.encode(value)
+
+    # context is not changed by limits of last call
+    assert bencode([[[b"a" * 100]]]) == b"lll100:" + b"a" * 100 + b"eee"
+    assert encoder.encode([1]) == b"li1ee"
+
+
+def test_encoder_large_limit():
+    value = [b"a" * 1000] * 1000
+    assert Encoder(max_size=10**7).encode(value) == bencode(value)
+    with pytest.raises(BencodeEncodeError, match="max_size"):
+        Encoder(max_size=10**5).encode(value)
+
+
+@pytest.mark.parametrize("cls", [Decoder, Encoder])
+def test_bad_limit(cls: Any):
+    with pytest.raises(ValueError):
+        cls(max_depth=0)
+    with pytest.raises(ValueError):
+        cls(max_size=-1)
+    with pytest.raises(TypeError):
+        cls(max_depth=1.5)
+    with pytest.raises(TypeError):
+        cls(1)
@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, bdecode_path, bdecode_paths
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+multiple_files_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/multiple-files.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def test_path_torrent():
+    torrent = bdecode(single_file_torrent)
+
+    assert (
+        bdecode_path(single_file_torrent, [b"info", b"name"])
+        == torrent[b"info"][b"name"]
+    )
+    assert bdecode_path(single_file_torrent, (b"info",)) == torrent[b"info"]
+    assert bdecode_path(single_file_torrent, []) == torrent
+    assert (
+        bdecode_path(single_file_torrent, [b"announce-list", 1, 0])
+        == torrent[b"announce-list"][1][0]
+    )
+
+
+def test_paths_torrent():
+    torrent = bdecode(multiple_files_torrent)
+    files = torrent[b"info"][b"files"]
+
+    assert bdecode_paths(
+        multiple_files_torrent,
+        [
+            [b"info", b"piece length"],
+            [b"info", b"files", 1, b"path"],
+            [b"info", b"name"],
+            [b"info", b"files", 0, b"length"],
+            [b"info", b"files", len(files) - 1],
+            [b"info", b"name"],
+            [b"info", b"files", len(files)],
+            [b"info", b"missing"],
+        ],
+    ) == [
+        torrent[b"info"][b"piece length"],
+        files[1][b"path"],
+        torrent[b"info"][b"name"],
+        files[0][b"length"],
+        files[-1],
+        torrent[b"info"][b"name"],
+        None,
+        None,
+    ]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        [b"c"],
+        [b"a", b"b"],  # scalar value
+        [0],  # list index in dict
+        [b"l", b"x"],  # dict key in list
+        [b"l", 5],
+        [b"l", -1],
+        [b"d", b"z"],
+    ],
+)
+def test_path_missing(path: list[bytes | int]):
+    assert bdecode_path(b"d1:ai1e1:dd1:xi1ee1:lli1ei2eee", path) is None
+
+
+def test_paths_empty():
+    assert bdecode_paths(b"i1e", []) == []
+
+
+def test_path_stop_early():
+    # data after the found value is not checked
+    assert bdecode_path(b"d1:ai1e1:cxxx", [b"a"]) == 1
+    assert bdecode_path(b"d1:bi1e1:ai2ee", [b"b"]) == 1
+
+    # skipped values are checked
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(b"d1:bi1e1:ai2ee", [b"c"])
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(b"d1:ai01e1:bi1ee", [b"b"])
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(b"d1:ai1e1:bi1", [b"b"])
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(b"d1:a", [b"b"])
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(b"li1e", [1])
+
+
+@pytest.mark.parametrize("raw", [b"", b"x", b"i01e"])
+def test_path_bad_case(raw: bytes):
+    with pytest.raises(BencodeDecodeError):
+        bdecode_path(raw, [])
+
+
+def test_path_bad_type():
+    with pytest.raises(TypeError):
+        bdecode_path(b"de", [b"info", "name"])  # type: ignore
+
+    with pytest.raises(TypeError):
+        bdecode_path(b"de", [True])
+
+    with pytest.raises(TypeError):
+        bdecode_path("de", [])  # type: ignore
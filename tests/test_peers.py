@@ -0,0 +1,98 @@
+import dataclasses
+from typing import Any
+
+import pytest
+
+from bencode2 import bdecode, bencode, pack_peers, unpack_peers
+
+
+def test_pack_peers():
+    assert pack_peers([("1.2.3.4", 6881), ("255.0.0.1", 1)]) == (
+        b"\x01\x02\x03\x04\x1a\xe1\xff\x00\x00\x01\x00\x01"
+    )
+    assert (
+        pack_peers(iter([("2001:db8::1", 65535)]))
+        == b"\x20\x01\x0d\xb8" + b"\x00" * 11 + b"\x01\xff\xff"
+    )
+    assert pack_peers([]) == b""
+
+
+@pytest.mark.parametrize(
+    "peers",
+    [
+        [("1.2.3.4", 6881), ("10.0.0.1", 0)],
+        [("2001:db8::1", 6881), ("::1", 80), ("fe80::1:2", 65535)],
+    ],
+)
+def test_peers_round_trip(peers: list[tuple[str, int]]):
+    ipv6 = ":" in peers[0][0]
+    packed = pack_peers(peers)
+    assert len(packed) == len(peers) * (18 if ipv6 else 6)
+
+    assert unpack_peers(packed, ipv6=ipv6) == peers
+    assert unpack_peers(bytearray(packed), ipv6=ipv6) == peers
+    assert unpack_peers(memoryview(b"xx" + packed)[2:], ipv6=ipv6) == peers
+
+
+def test_unpack_peers():
+    assert unpack_peers(b"\x7f\x00\x00\x01\x00\x50") == [("127.0.0.1", 80)]
+    assert unpack_peers(b"") == []
+    assert unpack_peers(b"", ipv6=True) == []
+
+
+def test_peers_encode():
+    @dataclasses.dataclass
+    class Response:
+        interval: int
+        peers: bytes
+        peers6: bytes
+
+    peers = [("1.2.3.4", 6881)]
+    peers6 = [("::1", 6881)]
+
+    raw = bencode(Response(1800, pack_peers(peers), pack_peers(peers6)))
+    assert raw == bencode(
+        {
+            "interval": 1800,
+            "peers": b"\x01\x02\x03\x04\x1a\xe1",
+            "peers6": b"\x00" * 15 + b"\x01\x1a\xe1",
+        }
+    )
+
+    value = bdecode(raw, zero_copy=True)
+    assert unpack_peers(value[b"peers"]) == peers
+    assert unpack_peers(value[b"peers6"], ipv6=True) == peers6
+
+
+@pytest.mark.parametrize(
+    ["peers", "error"],
+    [
+        ([("1.2.3", 1)], ValueError),
+        ([("1.2.3.4.5", 1)], ValueError),
+        ([("1.2.3.4\x00", 1)], ValueError),
+        ([("::1::", 1)], ValueError),
+        ([("1.2.3.4", 1), ("::1", 1)], ValueError),
+        ([("1.2.3.4", -1)], ValueError),
+        ([("1.2.3.4", 65536)], ValueError),
+        ([("1.2.3.4", 2**100)], ValueError),
+        ([("1.2.3.4", "1")], TypeError),
+        ([("1.2.3.4", 1.0)], TypeError),
+        ([(b"1.2.3.4", 1)], TypeError),
+        ([["1.2.3.4", 1]], TypeError),
+        ([("1.2.3.4", 1, 2)], TypeError),
+        ([None], TypeError),
+        (None, TypeError),
+    ],
+)
+def test_pack_peers_bad_case(peers: Any, error: type[Exception]):
+    with pytest.raises(error):
+        pack_peers(peers)
+
+
+def test_unpack_peers_bad_case():
+    with pytest.raises(ValueError):
+        unpack_peers(b"\x00" * 7)
+    with pytest.raises(ValueError):
+        unpack_peers(b"\x00" * 6, ipv6=True)
+    with pytest.raises(TypeError):
+        unpack_peers("1.2.3.4")  # type: ignore
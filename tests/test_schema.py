@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import dataclasses
+import gc
+import weakref
+from typing import Any, Optional
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, bencode, set_max_decode_depth
+
+
+@dataclasses.dataclass(frozen=True)
+class File:
+    length: int
+    path: list[bytes]
+
+
+@dataclasses.dataclass
+class Info:
+    name: str
+    files: list[File]
+    private: bool = False
+    meta: dict[bytes, Any] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass(slots=True)
+class Node:
+    value: int
+    children: list[Node] = dataclasses.field(default_factory=list)
+
+
+def test_decode_dataclass():
+    info = Info(
+        name="ubuntu",
+        files=[File(1, [b"a", b"b"]), File(2, [b"c"])],
+        private=True,
+        meta={b"x": [1, b"y"]},
+    )
+
+    assert bdecode(bencode(info), type=Info) == info
+
+
+def test_decode_dataclass_default_and_extra_keys():
+    raw = bencode({"name": "n", "files": [], "unknown": {"a": [1, 2]}, "zzz": 1})
+    assert bdecode(raw, type=Info) == Info(name="n", files=[])
+
+
+def test_decode_recursive_dataclass():
+    node = Node(1, [Node(2), Node(3, [Node(4)])])
+    assert bdecode(bencode(node), type=Node) == node
+
+
+@pytest.mark.parametrize(
+    ("tp", "value"),
+    [
+        (list[int], [1, 2, 3]),
+        (dict[bytes, list[bytes]], {b"a": [b"b"]}),
+        (dict[str, int], {"a": 1, "b": 2}),
+        (Optional[int], 1),  # noqa: UP045
+        (int | None, 1),
+        (Any, {b"a": 1}),
+        (list, [1, b"a"]),
+        (bool, True),
+        (str, "中文"),
+    ],
+)
+def test_decode_typed(tp: Any, value: Any):
+    assert bdecode(bencode(value), type=tp) == value
+
+
+def test_decode_typed_zero_copy():
+    v = bdecode(bencode(File(1, [b"a"])), type=File, zero_copy=True)
+    assert isinstance(v.path[0], memoryview)
+    assert v.path[0] == b"a"
+
+
+@pytest.mark.parametrize(
+    ("tp", "raw"),
+    [
+        (int, b"1:a"),
+        (bytes, b"i1e"),
+        (str, b"2:\xff\xfe"),
+        (bool, b"i2e"),
+        (list[int], b"li1e1:ae"),
+        (dict[bytes, int], b"li1ee"),
+        (File, b"d6:lengthi1ee"),
+        (File, b"d6:length1:14:pathlee"),
+        (File, b"d4:pathle6:lengthi1ee"),
+        (Info, b"d5:fileslee"),
+        (int, b"x"),
+    ],
+)
+def test_decode_typed_bad_case(tp: Any, raw: bytes):
+    with pytest.raises(BencodeDecodeError):
+        bdecode(raw, type=tp)
+
+
+def test_decode_unsupported_type():
+    with pytest.raises(TypeError):
+        bdecode(b"i1e", type=float)
+
+    with pytest.raises(TypeError):
+        bdecode(b"de", type=dict[int, int])
+
+
+def test_dataclasses_plan_released():
+    for i in range(10):
+        Inner = dataclasses.make_dataclass("Inner", [("value", int)])
+        Obj = dataclasses.make_dataclass("Obj", [("inner", Inner)])
+
+        raw = b"d5:innerd5:valuei%deee" % i
+        assert bdecode(raw, type=Obj) == Obj(Inner(i))
+        assert bdecode(raw, type=Obj) == Obj(Inner(i))
+        assert bdecode(b"l" + raw + b"e", type=list[Obj]) == [Obj(Inner(i))]
+        assert bdecode(raw, type=Obj | None) == Obj(Inner(i))
+        # plans of other types are not affected
+        assert bdecode(b"d6:lengthi1e4:pathlee", type=File) == File(1, [])
+
+        refs = [weakref.ref(Obj), weakref.ref(Inner)]
+        del Obj, Inner
+        gc.collect()
+        # decode plan doesn't keep class alive
+        assert [r() for r in refs] == [None, None]
+
+
+def test_decode_typed_deep():
+    raw = b"d8:childrenl" * 25_000 + b"e5:valuei1ee" * 25_000
+
+    with pytest.raises(BencodeDecodeError, match="maximum decode depth"):
+        bdecode(raw, type=Node)
+
+    # typed nesting is not limited by C stack or python recursion limit
+    set_max_decode_depth(100_000)
+    try:
+        v = bdecode(raw, type=Node)
+    finally:
+        set_max_decode_depth(4096)
+
+    for _ in range(24_999):
+        v = v.children[0]
+    assert v == Node(1)
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import pytest
+
+from bencode2 import BencodeDecodeError, StreamDecoder, bdecode, bencode
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def test_stream_single_chunk():
+    d = StreamDecoder()
+    assert d.feed(b"i1e4:spamle0:d1:ai1ee") == [1, b"spam", [], b"", {b"a": 1}]
+    d.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_stream_split(chunk_size: int):
+    data = (
+        bencode({"a": [1, 2, b"spam"], "b": {"c": -10}})
+        + b"i123456789e"
+        + b"10:0123456789"
+        + b"0:"
+        + b"lli1eee"
+    )
+
+    d = StreamDecoder()
+    values = []
+    for i in range(0, len(data), chunk_size):
+        values.extend(d.feed(data[i : i + chunk_size]))
+    d.close()
+
+    assert values == [
+        {b"a": [1, 2, b"spam"], b"b": {b"c": -10}},
+        123456789,
+        b"0123456789",
+        b"",
+        [[1]],
+    ]
+
+
+def test_stream_value_available_early():
+    d = StreamDecoder()
+    assert d.feed(b"d4:spam") == []
+    assert d.feed(bytearray(b"4:eggse3:")) == [{b"spam": b"eggs"}]
+    assert d.feed(memoryview(b"abc")) == [b"abc"]
+    d.close()
+
+
+def test_stream_torrent():
+    d = StreamDecoder()
+    values = []
+    for i in range(0, len(single_file_torrent), 1000):
+        values.extend(d.feed(single_file_torrent[i : i + 1000]))
+    d.close()
+
+    assert values == [bdecode(single_file_torrent)]
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"x",
+        b"e",
+        b"lx",
+        b"1a:",
+        b"i01e",
+        b"d1:bi1e1:ai2ee",
+        b"l" * 5000,
+    ],
+)
+def test_stream_bad_case(raw: bytes):
+    d = StreamDecoder()
+    with pytest.raises(BencodeDecodeError):
+        d.feed(raw)
+
+    # decoder is reset after error
+    assert d.feed(b"i1e") == [1]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100])
+def test_stream_length_overflow(chunk_size: int):
+    data = b"l" + b"1" + b"0" * 40 + b":"
+    d = StreamDecoder()
+    with pytest.raises(BencodeDecodeError, match="bytes length overflow"):
+        for i in range(0, len(data), chunk_size):
+            d.feed(data[i : i + chunk_size])
+
+    # large length that fits, wait for more data
+    d = StreamDecoder()
+    assert d.feed(b"9223372036854775:") == []
+
+
+def test_stream_incomplete():
+    d = StreamDecoder()
+    assert d.feed(b"i1el4:sp") == [1]
+    with pytest.raises(BencodeDecodeError):
+        d.close()
+
+
+def test_stream_non_bytes_input():
+    with pytest.raises(TypeError):
+        StreamDecoder().feed("s")  # type: ignore
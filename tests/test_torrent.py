@@ -1,6 +1,8 @@
 import hashlib
 from pathlib import Path
 
+import pytest
+
 import bencode2
 
 
@@ -17,3 +19,137 @@ def test_get_torrent_info_hash():
             hashlib.sha1(bencode2.bencode(data[b"info"])).hexdigest()
             == "a7838b75c42b612da3b6cc99beed4ecb2d04cff2"
         )
+
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+def test_info_hash():
+    assert (
+        bencode2.info_hash(single_file_torrent).hex()
+        == "a7838b75c42b612da3b6cc99beed4ecb2d04cff2"
+    )
+
+    info = bencode2.bencode(bencode2.bdecode(single_file_torrent)[b"info"])
+    assert (
+        bencode2.info_hash(bytearray(single_file_torrent), "sha256")
+        == hashlib.sha256(info).digest()
+    )
+
+
+def test_info_hash_missing_info():
+    with pytest.raises(bencode2.BencodeDecodeError, match="no 'info'"):
+        bencode2.info_hash(b"d8:announce0:e")
+
+
+@pytest.mark.parametrize("raw", [b"li1ee", b"4:info", b"i1e"])
+def test_info_hash_not_dict(raw: bytes):
+    with pytest.raises(bencode2.BencodeDecodeError, match="must be a dict"):
+        bencode2.info_hash(raw)
+
+
+def test_bdecode_span():
+    data, span = bencode2.bdecode_span(single_file_torrent, b"info")
+
+    assert data == bencode2.bdecode(single_file_torrent)
+    assert span is not None
+    start, end = span
+    assert single_file_torrent[start:end] == bencode2.bencode(data[b"info"])
+
+
+@pytest.mark.parametrize(
+    ["raw", "key", "expected"],
+    [
+        (b"d1:ai1e1:bli1eee", b"b", (10, 15)),
+        (b"d1:ai1e1:bli1eee", b"c", None),
+        # only top-level dict is checked
+        (b"d1:ad1:bi1eee", b"b", None),
+        (b"l1:be", b"b", None),
+    ],
+)
+def test_bdecode_span_case(raw: bytes, key: bytes, expected):
+    assert bencode2.bdecode_span(raw, key)[1] == expected
+
+
+def test_hash_array_pieces():
+    pieces = bencode2.bdecode(single_file_torrent)[b"info"][b"pieces"]
+    hashes = bencode2.HashArray(pieces)
+
+    assert len(hashes) == len(pieces) // 20
+    assert hashes[0] == pieces[:20]
+    assert hashes[-1] == pieces[-20:]
+    assert [h.tobytes() for h in hashes] == [
+        pieces[i : i + 20] for i in range(0, len(pieces), 20)
+    ]
+    assert hashes[0].readonly
+
+    with pytest.raises(IndexError):
+        hashes[len(hashes)]
+
+
+def test_hash_array_zero_copy():
+    raw = bytearray(b"a" * 20 + b"b" * 20)
+    hashes = bencode2.HashArray(raw)
+
+    # views keep the buffer exported
+    first = hashes[0]
+    with pytest.raises(BufferError):
+        raw.extend(b"x")
+
+    assert first == b"a" * 20
+    with pytest.raises(TypeError):
+        first[0] = 1  # type: ignore
+
+
+def test_hash_array_search():
+    hashes = bencode2.HashArray(b"x" + b"a" * 31 + b"b" * 32 + b"a" * 32, 32)
+
+    assert b"a" * 32 in hashes
+    assert b"a" * 31 not in hashes
+    assert 1 not in hashes
+    assert hashes.index(b"a" * 32) == 2
+    assert hashes.index(b"b" * 32) == 1
+    assert hashes.count(b"a" * 32) == 1
+    assert hashes[1:].index(b"a" * 32) == 1
+    assert hashes[2:].index(b"a" * 32) == 0
+
+    with pytest.raises(ValueError):
+        hashes.index(b"b" * 32, 2)
+    with pytest.raises(ValueError):
+        hashes[:2].index(b"a" * 32)
+
+
+def test_hash_array_slice():
+    hashes = bencode2.HashArray(bytes(range(100)), 10)
+
+    assert hashes[2:4] == bencode2.HashArray(bytes(range(20, 40)), 10)
+    assert hashes[::3].tobytes() == b"".join(hashes[i] for i in range(0, 10, 3))
+    assert len(hashes[5:2]) == 0
+    assert hashes != bencode2.HashArray(bytes(range(100)), 20)
+
+
+def test_hash_array_mismatches():
+    expected = bytes(range(256)) * 200
+    actual = bytearray(expected)
+    actual[0] ^= 1
+    actual[20 * 1500 + 19] ^= 1
+
+    hashes = bencode2.HashArray(expected)
+    assert hashes.mismatches(actual) == [0, 1500]
+    assert hashes.mismatches(bencode2.HashArray(expected)) == []
+
+    with pytest.raises(ValueError):
+        hashes.mismatches(actual[:-20])
+    with pytest.raises(ValueError):
+        hashes.mismatches(bencode2.HashArray(expected, 32))
+
+
+@pytest.mark.parametrize(["data", "width"], [(b"x" * 21, 20), (b"", 0)])
+def test_hash_array_bad_shape(data: bytes, width: int):
+    with pytest.raises(ValueError):
+        bencode2.HashArray(data, width)
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from bencode2 import BencodeDecodeError, bdecode, bencode, bstats, bvalidate
+
+single_file_torrent = (
+    Path(__file__)
+    .joinpath("../fixtures/ubuntu-22.04.2-desktop-amd64.iso.torrent.bin")
+    .resolve()
+    .read_bytes()
+)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"i1e",
+        b"0:",
+        b"le",
+        b"de",
+        bytearray(b"d1:ali1ei2ee1:b3:xyze"),
+        memoryview(b"xxli1ee")[2:],
+        single_file_torrent,
+    ],
+)
+def test_validate(raw: Any):
+    assert bvalidate(raw) is None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        b"",
+        b"i01e",
+        b"i-0e",
+        b"ie",
+        b"01:a",
+        b"1:",
+        b"li1e",
+        b"i1ei2e",
+        b"d1:bi1e1:ai2ee",
+        b"d1:ai1e1:ai2ee",
+        b"di1ei2ee",
+        b"d1:a",
+        b"l" * 5000 + b"e" * 5000,
+    ],
+)
+def test_validate_bad_case(raw: bytes):
+    with pytest.raises(BencodeDecodeError) as e:
+        bvalidate(raw)
+
+    # same error as decoding
+    with pytest.raises(BencodeDecodeError) as expected:
+        bdecode(raw)
+    assert str(e.value) == str(expected.value)
+
+    with pytest.raises(BencodeDecodeError):
+        bstats(raw)
+
+
+def test_validate_non_bytes_input():
+    with pytest.raises(TypeError):
+        bvalidate("s")  # type: ignore
+
+    with pytest.raises(TypeError):
+        bstats(1)  # type: ignore
+
+
+def test_stats():
+    assert bstats(b"d1:ali1ei2ee1:b3:xyze") == {
+        "ints": 2,
+        "strings": 3,
+        "lists": 1,
+        "dicts": 1,
+        "max_depth": 3,
+        "string_bytes": 5,
+        "max_string_length": 3,
+    }
+
+    assert bstats(b"i1e")["max_depth"] == 1
+    assert bstats(b"lle0:e")["max_depth"] == 2
+
+
+def _count(value: Any, depth: int, stats: dict[str, int]) -> None:
+    stats["max_depth"] = max(stats["max_depth"], depth)
+    if isinstance(value, int):
+        stats["ints"] += 1
+    elif isinstance(value, bytes):
+        stats["strings"] += 1
+        stats["string_bytes"] += len(value)
+        stats["max_string_length"] = max(stats["max_string_length"], len(value))
+    elif isinstance(value, list):
+        stats["lists"] += 1
+        for v in value:
+            _count(v, depth + 1, stats)
+    else:
+        stats["dicts"] += 1
+        for k, v in value.items():
+            _count(k, depth + 1, stats)
+            _count(v, depth + 1, stats)
+
+
+def test_stats_torrent():
+    expected = dict.fromkeys(bstats(b"i1e"), 0)
+    _count(bdecode(single_file_torrent), 1, expected)
+
+    assert bstats(single_file_torrent) == expected
+
+
+def test_validate_threads():
+    values = [single_file_torrent, bencode([single_file_torrent] * 10)] * 8
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(bvalidate, values)) == [None] * len(values)